@@ -0,0 +1,406 @@
+import contextlib
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from utils.logger import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory file locks, so packs can't be shared between processes
+    fcntl = None
+
+DB_PATH = "data/artifacts.sqlite"
+
+# === Config ===
+ROOT = "data"
+BACKEND = os.getenv("ARTIFACT_BACKEND", "packed" if fcntl else "sharded")  # 🗂️ "packed" (append-only file per stage) or "sharded" (hash-sharded files)
+SHARD_CHARS = 2  # Hex chars of sha1(lead_key) naming the shard dir: 256 dirs, ~400 files each at 100k leads
+PAGE_SIZE = 500  # Index rows fetched per query by the iterators
+KEY_BATCH = 500  # Keys per IN (...) lookup, under SQLite's bound-parameter limit
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+]
+# Per-lead output directories under ROOT and their file extension; .json artifacts are returned parsed
+STAGES = {
+    "website_content": ".json",
+    "match_results": ".json",
+    "emails": ".txt",
+    "replies": ".txt",
+    "analyzed_replies": ".json",
+}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    stage TEXT NOT NULL,
+    lead_key TEXT NOT NULL,
+    pack_offset INTEGER,  -- packed backend only: where the bytes start in the stage's pack file
+    size INTEGER,
+    digest TEXT,  -- sha256 of the bytes, so callers can fingerprint an artifact without reading it
+    updated_at REAL,
+    PRIMARY KEY (stage, lead_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _encode(stage: str, value) -> bytes:
+    if STAGES[stage] == ".json":
+        return json.dumps(value, indent=2, ensure_ascii=False).encode("utf-8")
+    return value.encode("utf-8")
+
+
+def _decode(stage: str, data: bytes):
+    return json.loads(data) if STAGES[stage] == ".json" else data.decode("utf-8")
+
+
+# === Backends: where an artifact's bytes live ===
+class ShardedFiles:
+    """One file per artifact at <root>/<stage>/<shard>/<lead_key><ext>, so no directory grows past a few hundred entries."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._made = set()  # shard dirs known to exist, so writes skip makedirs
+
+    def path(self, stage: str, lead_key: str) -> str:
+        shard = hashlib.sha1(lead_key.encode("utf-8")).hexdigest()[:SHARD_CHARS]
+        return os.path.join(self.root, stage, shard, lead_key + STAGES[stage])
+
+    def write(self, stage: str, lead_key: str, data: bytes) -> Optional[int]:
+        path = self.path(stage, lead_key)
+        folder = os.path.dirname(path)
+        if folder not in self._made:
+            os.makedirs(folder, exist_ok=True)
+            self._made.add(folder)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)  # readers never see a half-written file
+        return None
+
+    def read(self, stage: str, lead_key: str, offset: Optional[int], size: int) -> bytes:
+        with open(self.path(stage, lead_key), "rb") as f:
+            return f.read()
+
+    def delete(self, stage: str, lead_key: str) -> None:
+        path = self.path(stage, lead_key)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        with contextlib.suppress(OSError):  # only succeeds once the shard is empty
+            os.rmdir(os.path.dirname(path))
+            self._made.discard(os.path.dirname(path))
+
+    def close(self) -> None:
+        pass
+
+
+class PackedFile:
+    """Artifacts appended to <root>/<stage>.pack; the index holds each one's offset and size.
+
+    Rewriting an artifact appends a new copy, so superseded bytes stay in the
+    pack until it is rebuilt with convert_backend("packed"). Appends hold an
+    exclusive flock, so the UI and a CLI run can write the same pack.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._files = {}
+
+    def _file(self, stage: str):
+        if stage not in self._files:
+            self._files[stage] = open(os.path.join(self.root, f"{stage}.pack"), "a+b")
+        return self._files[stage]
+
+    def write(self, stage: str, lead_key: str, data: bytes) -> Optional[int]:
+        f = self._file(stage)
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            # The size under the lock, not this handle's idea of the end: another process may have appended since
+            offset = os.fstat(f.fileno()).st_size
+            f.write(data)
+            f.flush()
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return offset
+
+    def read(self, stage: str, lead_key: str, offset: Optional[int], size: int) -> bytes:
+        f = self._file(stage)
+        f.seek(offset)
+        return f.read(size)
+
+    def delete(self, stage: str, lead_key: str) -> None:
+        pass  # dropping the index row is enough
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+BACKENDS = {"sharded": ShardedFiles, "packed": PackedFile}
+
+
+class ArtifactStore:
+    """Per-lead stage outputs (crawled content, matches, emails, replies, analyses).
+
+    An SQLite index maps (stage, lead_key) to the artifact's size, content
+    digest, update time and, for the packed backend, its offset. Lookups,
+    existence checks and listings go through the index, never through
+    os.listdir or os.path.exists on a directory holding one file per lead.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, root: str = ROOT, backend: str = BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown artifact backend {backend!r} (expected one of {sorted(BACKENDS)})")
+        if backend == "packed" and not fcntl:
+            raise ValueError("The packed artifact backend needs fcntl file locks; use ARTIFACT_BACKEND=sharded")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'backend'").fetchone()
+        if row and row[0] != backend:
+            raise ValueError(f"{db_path} holds {row[0]!r} artifacts; convert them with "
+                             f"`python main.py migrate-artifacts --backend {backend}`")
+        with self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('backend', ?)", (backend,))
+        self.root = root
+        self.backend_name = backend
+        self.backend = BACKENDS[backend](root)
+        self.stats = {"reads": 0, "writes": 0, "imported": 0}
+
+    # === Writes ===
+    def put(self, stage: str, lead_key: str, value, updated_at: Optional[float] = None) -> None:
+        """Store a lead's artifact (a dict for .json stages, text otherwise), replacing any previous one."""
+        data = _encode(stage, value)
+        with self._lock:
+            self._write(stage, lead_key, data, updated_at or time.time())
+            self._conn.commit()
+
+    def _write(self, stage: str, lead_key: str, data: bytes, updated_at: float) -> None:
+        offset = self.backend.write(stage, lead_key, data)
+        self._conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?)",
+                           (stage, lead_key, offset, len(data), hashlib.sha256(data).hexdigest(), updated_at))
+        self.stats["writes"] += 1
+
+    def delete(self, stage: str, lead_key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM artifacts WHERE stage = ? AND lead_key = ?", (stage, lead_key))
+            self.backend.delete(stage, lead_key)
+
+    # === Reads ===
+    def _row(self, stage: str, lead_key: str) -> Optional[Tuple]:
+        return self._conn.execute(
+            "SELECT pack_offset, size, digest, updated_at FROM artifacts WHERE stage = ? AND lead_key = ?",
+            (stage, lead_key)
+        ).fetchone()
+
+    def get(self, stage: str, lead_key: str, default=None):
+        """The lead's artifact, parsed for .json stages; `default` if there is none."""
+        with self._lock:
+            row = self._row(stage, lead_key)
+            if row is None:
+                return default
+            data = self.backend.read(stage, lead_key, row[0], row[1])
+            self.stats["reads"] += 1
+        return _decode(stage, data)
+
+    def has(self, stage: str, lead_key: str) -> bool:
+        with self._lock:
+            return self._row(stage, lead_key) is not None
+
+    def digest(self, stage: str, lead_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._row(stage, lead_key)
+        return row[2] if row else None
+
+    def digests(self, stage: str) -> Dict[str, str]:
+        """{lead_key: sha256 of the artifact} for a whole stage, in one query."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT lead_key, digest FROM artifacts WHERE stage = ?", (stage,)))
+
+    def updated_at(self, stage: str, lead_key: str) -> Optional[float]:
+        with self._lock:
+            row = self._row(stage, lead_key)
+        return row[3] if row else None
+
+    def count(self, stage: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM artifacts WHERE stage = ?", (stage,)).fetchone()[0]
+
+    def keys(self, stage: str, limit: Optional[int] = None) -> Iterator[str]:
+        """Lead keys with an artifact for `stage`, in key order, fetched PAGE_SIZE at a time."""
+        after, remaining = "", limit
+        while remaining is None or remaining > 0:
+            size = PAGE_SIZE if remaining is None else min(PAGE_SIZE, remaining)
+            with self._lock:
+                page = [row[0] for row in self._conn.execute(
+                    "SELECT lead_key FROM artifacts WHERE stage = ? AND lead_key > ? ORDER BY lead_key LIMIT ?",
+                    (stage, after, size)
+                )]
+            if not page:
+                return
+            yield from page
+            after = page[-1]
+            if remaining is not None:
+                remaining -= len(page)
+
+    def items(self, stage: str, lead_keys: Optional[Iterable[str]] = None,
+              limit: Optional[int] = None) -> Iterator[Tuple[str, object]]:
+        """(lead_key, artifact) in key order: every one for `stage` (at most `limit`), or those of `lead_keys`."""
+        if lead_keys is None:
+            keys = self.keys(stage, limit)
+        else:
+            keys = self._existing(stage, sorted(set(lead_keys)))
+        for key in keys:
+            value = self.get(stage, key)
+            if value is not None:
+                yield key, value
+
+    def _existing(self, stage: str, keys: list) -> Iterator[str]:
+        for start in range(0, len(keys), KEY_BATCH):
+            batch = keys[start:start + KEY_BATCH]
+            with self._lock:
+                found = {row[0] for row in self._conn.execute(
+                    f"SELECT lead_key FROM artifacts WHERE stage = ? AND lead_key IN ({','.join('?' * len(batch))})",
+                    [stage, *batch]
+                )}
+            yield from (key for key in batch if key in found)
+
+    def random_key(self, stage: str) -> Optional[str]:
+        """A uniformly random lead key with an artifact for `stage`, read off the index."""
+        count = self.count(stage)
+        if not count:
+            return None
+        with self._lock:
+            return self._conn.execute(
+                "SELECT lead_key FROM artifacts WHERE stage = ? ORDER BY lead_key LIMIT 1 OFFSET ?",
+                (stage, random.randrange(count))
+            ).fetchone()[0]
+
+    # === Migration ===
+    def import_flat_files(self, stages: Optional[Iterable[str]] = None) -> int:
+        """Copy the one-file-per-lead outputs written before this store (<root>/<stage>/<key><ext>) into it.
+
+        Each file keeps its bytes and mtime (as updated_at), so content
+        fingerprints and "analysis newer than reply" checks carry over. The
+        source files are left in place; ones already imported and not modified
+        since are skipped, so running it again only picks up changes.
+        """
+        imported = 0
+        for stage in stages or STAGES:
+            folder = os.path.join(self.root, stage)
+            if not os.path.isdir(folder):
+                continue
+            with os.scandir(folder) as entries:
+                flat = [e for e in entries if e.is_file() and e.name.endswith(STAGES[stage])]
+            with self._lock, self._conn:
+                stored = dict(self._conn.execute("SELECT lead_key, updated_at FROM artifacts WHERE stage = ?", (stage,)))
+                for entry in flat:
+                    lead_key, mtime = entry.name[:-len(STAGES[stage])], entry.stat().st_mtime
+                    if stored.get(lead_key, -1) >= mtime:
+                        continue
+                    with open(entry.path, "rb") as f:
+                        data = f.read()
+                    self._write(stage, lead_key, data, mtime)
+                    imported += 1
+        self.stats["imported"] += imported
+        return imported
+
+    def convert_backend(self, backend: str) -> "ArtifactStore":
+        """Rewrite every artifact into `backend`; returns the store to use from now on (this one is closed).
+
+        Converting "packed" to "packed" rebuilds the packs without superseded copies.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown artifact backend {backend!r} (expected one of {sorted(BACKENDS)})")
+        if backend == "packed" and not fcntl:
+            raise ValueError("The packed artifact backend needs fcntl file locks; use ARTIFACT_BACKEND=sharded")
+        if backend == self.backend_name == "sharded":
+            return self
+        target = BACKENDS[backend](self.root)
+        stale_packs = {stage for stage in STAGES if os.path.exists(os.path.join(self.root, f"{stage}.pack"))}
+        if backend == "packed":  # write to fresh packs, swapped in once every artifact is copied
+            target.root = os.path.join(self.root, ".packing")
+            os.makedirs(target.root, exist_ok=True)
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT stage, lead_key, pack_offset, size FROM artifacts").fetchall()
+            for stage, lead_key, offset, size in rows:
+                offset = target.write(stage, lead_key, self.backend.read(stage, lead_key, offset, size))
+                self._conn.execute("UPDATE artifacts SET pack_offset = ? WHERE stage = ? AND lead_key = ?",
+                                   (offset, stage, lead_key))
+            self._conn.execute("UPDATE meta SET value = ? WHERE name = 'backend'", (backend,))
+            old = self.backend
+            old.close()
+            target.close()
+            if self.backend_name == "sharded" and backend != "sharded":
+                for stage, lead_key, _, _ in rows:
+                    old.delete(stage, lead_key)
+            for stage in stale_packs:
+                os.remove(os.path.join(self.root, f"{stage}.pack"))
+            if backend == "packed":
+                for name in os.listdir(target.root):
+                    os.replace(os.path.join(target.root, name), os.path.join(self.root, name))
+                os.rmdir(target.root)
+        logger.info(f"🗂️ Converted {len(rows)} artifacts from {self.backend_name} to {backend}.")
+        db_path = self._conn.execute("PRAGMA database_list").fetchone()[2]
+        self.close()
+        return ArtifactStore(db_path, self.root, backend)
+
+    def close(self) -> None:
+        self.backend.close()
+        self._conn.close()
+
+
+def stored_backend(db_path: str = DB_PATH) -> Optional[str]:
+    """The backend an existing index was written with, or None for a new store."""
+    if not os.path.exists(db_path):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'backend'").fetchone()
+    except sqlite3.OperationalError:  # created but never initialised
+        row = None
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def migrate(backend: Optional[str] = None, db_path: str = DB_PATH, root: str = ROOT) -> Dict[str, int]:
+    """Copy flat per-lead files into the store, then convert it to `backend` if given.
+
+    Returns {stage: artifacts now stored}.
+    """
+    store = ArtifactStore(db_path, root, stored_backend(db_path) or backend or BACKEND)
+    imported = store.import_flat_files()
+    logger.info(f"📥 Copied {imported} per-lead files into the {store.backend_name} artifact store.")
+    if backend and (backend != store.backend_name or backend == "packed"):
+        store = store.convert_backend(backend)
+    counts = {stage: store.count(stage) for stage in STAGES}
+    store.close()
+    return counts
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Process-wide ArtifactStore, opened on first use.
+
+    Per-lead files from before the store are not read here; import them with
+    `python main.py migrate-artifacts`.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                os.makedirs(ROOT, exist_ok=True)
+                _store = ArtifactStore(DB_PATH, ROOT, BACKEND)
+    return _store
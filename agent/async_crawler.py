@@ -0,0 +1,400 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import httpx
+
+from agent import html_extract
+from agent.link_discovery import extract_links, parse_robots_sitemaps, parse_sitemap, select_pages
+from agent.path_memory import classify_outcome, domain_of
+from agent.web_crawler import (
+    TARGET_PAGES, LIMIT, MIN_CONTENT_LENGTH, CRAWL_STRATEGY, MAX_SITEMAPS, MAX_DOWNLOAD_BYTES,
+    HTML_TYPES, SITEMAP_TYPES, html_to_text, lead_key_for, load_crawl_targets, log_crawl_stores,
+    open_crawl_cache, open_path_memory, save_site_content
+)
+from utils.logger import logger
+
+# === Config ===
+MAX_CONCURRENCY = 64        # Global cap on in-flight requests
+PER_HOST_CONCURRENCY = 4    # Max in-flight requests to a single host
+PER_HOST_RATE = 10.0        # Max requests per second to a single host (0 = unlimited)
+LEAD_CONCURRENCY = 16       # Sites crawled at the same time
+REQUEST_TIMEOUT = 8
+PARSE_WORKERS = os.cpu_count() or 1  # Processes for HTML parsing (0 = parse inline on the event loop)
+PARSE_QUEUE_SIZE = 64       # Fetched pages waiting to be parsed; fetchers block when it's full
+USER_AGENT = "Mozilla/5.0 (compatible; B2BSalesAgent/1.0)"
+
+
+class HostLimiter:
+    """Per-host politeness: caps in-flight requests and spaces them out."""
+
+    def __init__(self, concurrency=PER_HOST_CONCURRENCY, rate=PER_HOST_RATE):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+
+    async def wait_turn(self):
+        if not self.interval:
+            return
+        # Reserve the next slot synchronously so concurrent callers queue up in order
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncCrawler:
+    """Crawl engine sharing one pooled HTTP client across all sites.
+
+    Fetching and parsing are separate stages: fetched HTML goes onto a bounded
+    queue that parse workers drain into a process pool, so CPU-heavy pages never
+    stall network I/O and a full queue pushes back on the fetchers.
+    """
+
+    def __init__(self, client=None, max_concurrency=MAX_CONCURRENCY,
+                 per_host_concurrency=PER_HOST_CONCURRENCY, per_host_rate=PER_HOST_RATE,
+                 timeout=REQUEST_TIMEOUT, cache=None, memory=None,
+                 parse_workers=PARSE_WORKERS, parse_queue_size=PARSE_QUEUE_SIZE):
+        self._client = client
+        self.cache = cache
+        self.memory = memory
+        self._owns_client = client is None
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rate = per_host_rate
+        self.timeout = timeout
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._hosts = {}
+        self.parse_workers = parse_workers
+        self.parse_queue_size = parse_queue_size
+        self._pool = None
+        self._parse_queue = None
+        self._parse_tasks = []
+        self.stats = {"requests": 0, "pages": 0, "bytes": 0, "errors": 0, "cancelled": 0}
+        self.stage_stats = {
+            "fetches": 0, "fetch_time": 0.0,
+            "parses": 0, "parse_time": 0.0,
+            "queue_depth": 0, "max_queue_depth": 0,
+            "enqueue_wait": 0.0,  # fetchers blocked on a full queue → parsing is the bottleneck
+            "queue_latency": 0.0,  # time pages sat in the queue before a worker picked them up
+        }
+
+    async def __aenter__(self):
+        if self.parse_workers:
+            self._pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+            self._parse_queue = asyncio.Queue(maxsize=self.parse_queue_size)
+            self._parse_tasks = [asyncio.create_task(self._parse_worker()) for _ in range(self.parse_workers)]
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self
+
+    async def __aexit__(self, *exc):
+        for task in self._parse_tasks:
+            task.cancel()
+        await asyncio.gather(*self._parse_tasks, return_exceptions=True)
+        self._parse_tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # === Parse stage ===
+    async def _parse_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            html, result, enqueued_at = await self._parse_queue.get()
+            self.stage_stats["queue_depth"] = self._parse_queue.qsize()
+            try:
+                if result.cancelled():
+                    continue  # the probe that wanted this page was already cancelled
+                self.stage_stats["queue_latency"] += time.perf_counter() - enqueued_at
+                start = time.perf_counter()
+                text = await loop.run_in_executor(self._pool, html_extract.extract_text, html,
+                                                  html_extract.EXTRACTOR)
+                self.stage_stats["parses"] += 1
+                self.stage_stats["parse_time"] += time.perf_counter() - start
+                if not result.done():
+                    result.set_result(text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not result.done():
+                    result.set_exception(e)
+            finally:
+                self._parse_queue.task_done()
+
+    async def parse(self, html):
+        """Extract page text via the parse stage (inline when parse_workers is 0)."""
+        if not html:
+            return ""
+        if self._parse_queue is None:
+            start = time.perf_counter()
+            text = html_to_text(html)
+            self.stage_stats["parses"] += 1
+            self.stage_stats["parse_time"] += time.perf_counter() - start
+            return text
+
+        result = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self._parse_queue.put((html, result, time.perf_counter()))
+        self.stage_stats["enqueue_wait"] += time.perf_counter() - start
+        depth = self._parse_queue.qsize()
+        self.stage_stats["queue_depth"] = depth
+        self.stage_stats["max_queue_depth"] = max(self.stage_stats["max_queue_depth"], depth)
+        return await result
+
+    def bottleneck(self):
+        """Rough read of which stage is holding the crawl back."""
+        s = self.stage_stats
+        if s["enqueue_wait"] > 0.1 * s["fetch_time"] or s["max_queue_depth"] >= self.parse_queue_size:
+            return "parse"
+        return "fetch"
+
+    def _limiter_for(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = HostLimiter(self.per_host_concurrency, self.per_host_rate)
+        return self._hosts[host]
+
+    async def fetch_page(self, url, content_types=HTML_TYPES):
+        """Async counterpart of web_crawler.fetch_page, sharing the same crawl cache."""
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            self.cache.stats["fresh"] += 1
+            return 200, entry["body"]
+
+        headers = self.cache.conditional_headers(entry) if self.cache else None
+        limiter = self._limiter_for(url)
+        # Host slot first so a site waiting on its politeness delay doesn't hold a global slot
+        async with limiter.semaphore:
+            await limiter.wait_turn()
+            async with self._global:
+                start = time.perf_counter()
+                result = await self._get(url, headers, content_types)
+                self.stage_stats["fetches"] += 1
+                self.stage_stats["fetch_time"] += time.perf_counter() - start
+        if isinstance(result, str):
+            return result, ""
+
+        status, resp_headers, body = result
+        # Cache writes run off the event loop so a commit never stalls the in-flight fetches
+        if status == 304 and entry:
+            await asyncio.to_thread(self.cache.touch, url)
+            return 200, entry["body"]
+        if body is not None:
+            if self.cache:
+                await asyncio.to_thread(self.cache.store, url, resp_headers, body)
+            return 200, body
+        return status, ""
+
+    async def fetch_text(self, url):
+        _, html = await self.fetch_page(url)
+        return await self.parse(html)
+
+    async def _get(self, url, headers, content_types):
+        """Stream the response, capped at MAX_DOWNLOAD_BYTES.
+
+        Returns (status, headers, body) with body None for unwanted content types,
+        or "timeout" / "error" if the request failed.
+        """
+        self.stats["requests"] += 1
+        try:
+            async with self._client.stream("GET", url, headers=headers) as resp:
+                content_type = resp.headers.get("Content-Type", "")
+                if resp.status_code != 200 or not any(t in content_type for t in content_types):
+                    return resp.status_code, resp.headers, None
+                chunks, size = [], 0
+                async for chunk in resp.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size >= MAX_DOWNLOAD_BYTES:
+                        break
+                self.stats["bytes"] += size
+                body = b"".join(chunks)[:MAX_DOWNLOAD_BYTES].decode(resp.encoding or "utf-8", errors="replace")
+                return resp.status_code, resp.headers, body
+        except asyncio.CancelledError:
+            self.stats["cancelled"] += 1
+            raise
+        except httpx.TimeoutException:
+            self.stats["errors"] += 1
+            return "timeout"
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"❌ Failed to fetch {url}: {e}")
+            return "error"
+
+    async def _probe(self, base_url, domain, page_type, path, url=None):
+        """Fetch `url` (default base_url + path) and record the outcome under `path`.
+
+        A failure anywhere in the probe is logged and counts as an empty page,
+        so one bad page can't take down the other probes or the crawl.
+        """
+        url = url or urljoin(base_url, path)
+        try:
+            status, html = await self.fetch_page(url)
+            content = await self.parse(html)
+            if self.memory:  # off the event loop, like the cache writes
+                await asyncio.to_thread(self.memory.record, domain, page_type, path,
+                                        classify_outcome(status, content, MIN_CONTENT_LENGTH))
+            return content
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Probe of {url} failed: {e}")
+            return ""
+
+    async def _first_valid(self, probes):
+        """Run all probes at once; the first valid page wins, the rest are cancelled."""
+        tasks = [asyncio.create_task(probe) for probe in probes]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                content = await next_done
+                if content and len(content) > MIN_CONTENT_LENGTH:
+                    return content
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return None
+
+    async def _crawl_page_type(self, base_url, page_type):
+        domain = domain_of(base_url)
+        paths = TARGET_PAGES[page_type]
+        if not self.memory:
+            return await self._first_valid([self._probe(base_url, domain, page_type, p) for p in paths])
+
+        ordered = self.memory.candidates(domain, page_type, paths)
+        known_good = self.memory.known_good(domain, page_type)
+        issued = 0
+        if ordered and ordered[0] == known_good:
+            # Try last crawl's winner alone before fanning out
+            issued, ordered = 1, ordered[1:]
+            content = await self._first_valid([self._probe(base_url, domain, page_type, known_good)])
+            if content:
+                await asyncio.to_thread(self.memory.record_savings, len(paths), issued, known_good_hit=True)
+                return content
+
+        content = await self._first_valid([self._probe(base_url, domain, page_type, p) for p in ordered])
+        await asyncio.to_thread(self.memory.record_savings, len(paths), issued + len(ordered))
+        return content
+
+    async def crawl_website(self, base_url, page_types=None, count_pages=True):
+        page_types = list(page_types or TARGET_PAGES)
+        found = await asyncio.gather(*[self._crawl_page_type(base_url, page_type) for page_type in page_types])
+        result = {page_type: content for page_type, content in zip(page_types, found) if content}
+        if count_pages:
+            self.stats["pages"] += len(result)
+        return result
+
+    async def fetch_sitemap_links(self, base_url):
+        _, robots = await self.fetch_page(urljoin(base_url, "/robots.txt"), SITEMAP_TYPES)
+        sitemaps = [urljoin(base_url, url) for url in parse_robots_sitemaps(robots)] or [urljoin(base_url, "/sitemap.xml")]
+        bodies = await asyncio.gather(*[self.fetch_page(url, SITEMAP_TYPES) for url in sitemaps[:MAX_SITEMAPS]])
+        return [
+            (url, "", "sitemap")
+            for _, xml in bodies for url in parse_sitemap(xml) if domain_of(url) == domain_of(base_url)
+        ]
+
+    async def discover_website(self, base_url):
+        """Async counterpart of web_crawler.discover_website."""
+        domain = domain_of(base_url)
+        if self.memory and all(self.memory.known_good(domain, page_type) for page_type in TARGET_PAGES):
+            return await self.crawl_website(base_url)
+
+        result = {}
+        try:
+            status, home_html = await self.fetch_page(urljoin(base_url, "/"))
+            home_text = await self.parse(home_html)
+            if self.memory:
+                await asyncio.to_thread(self.memory.record, domain, "home", "/",
+                                        classify_outcome(status, home_text, MIN_CONTENT_LENGTH))
+        except Exception as e:  # an empty homepage: fall back to guessing paths, as for a 404
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Homepage of {base_url} failed: {e}")
+            home_html, home_text = "", ""
+        if len(home_text) > MIN_CONTENT_LENGTH:
+            result["home"] = home_text
+
+        links = extract_links(home_html, base_url) if home_html else []
+        pages = select_pages(links, TARGET_PAGES)
+        if any(page_type not in pages for page_type in TARGET_PAGES if page_type != "home"):
+            pages = select_pages(links + await self.fetch_sitemap_links(base_url), TARGET_PAGES)
+
+        pending = [(page_type, url) for page_type, url in pages.items() if page_type not in result]
+        found = await asyncio.gather(*[
+            # The discovered URL as is (query string, other host); path memory is keyed on its path
+            self._probe(base_url, domain, page_type, urlparse(url).path or "/", url) for page_type, url in pending
+        ])
+        for (page_type, _), content in zip(pending, found):
+            if len(content) > MIN_CONTENT_LENGTH:
+                result[page_type] = content
+
+        missing = [page_type for page_type in TARGET_PAGES if page_type not in result]
+        if missing:
+            result.update(await self.crawl_website(base_url, missing, count_pages=False))
+        self.stats["pages"] += len(result)
+        return result
+
+    async def crawl_site(self, base_url):
+        if CRAWL_STRATEGY == "discover":
+            return await self.discover_website(base_url)
+        return await self.crawl_website(base_url)
+
+
+async def crawl_leads_async(targets, crawler, lead_concurrency=LEAD_CONCURRENCY):
+    """Crawl (company, url) targets with at most lead_concurrency sites in flight.
+
+    Returns the lead keys whose content was saved.
+    """
+    lead_slots = asyncio.Semaphore(lead_concurrency)
+
+    async def crawl_one(company, url):
+        async with lead_slots:
+            print(f"\n🌐 Crawling: {company} ({url})")
+            try:
+                site_content = await crawler.crawl_site(url)
+                return save_site_content(company, site_content, crawler.cache)
+            except Exception as e:  # one bad site must not sink the batch
+                crawler.stats["errors"] += 1
+                logger.error(f"❌ Crawl of {company} ({url}) failed: {e}")
+                return False
+
+    saved = await asyncio.gather(*[crawl_one(*target) for target in targets])
+    return [lead_key_for(company) for (company, _), ok in zip(targets, saved) if ok]
+
+
+async def _run(limit, lead_keys=None):
+    cache = open_crawl_cache()
+    memory = open_path_memory()
+    targets = load_crawl_targets(limit, cache, lead_keys)
+    start = time.perf_counter()
+    async with AsyncCrawler(cache=cache, memory=memory) as crawler:
+        crawled = await crawl_leads_async(targets, crawler)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"🕸️ Crawled {len(targets)} sites in {elapsed:.1f}s — "
+        f"{crawler.stats['pages']} pages, {crawler.stats['requests']} requests"
+    )
+    logger.info(f"⚙️ Stages: {crawler.stage_stats} — bottleneck looks like: {crawler.bottleneck()}")
+    log_crawl_stores(cache, memory)
+    return crawled
+
+
+def run_async_crawl(limit=LIMIT, lead_keys=None):
+    return asyncio.run(_run(limit, lead_keys))
+
+
+if __name__ == "__main__":
+    run_async_crawl()
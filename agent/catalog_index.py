@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.logger import logger
+
+# === Config ===
+INDEX_PATH = "data/catalog_index.npz"
+EMBEDDING_BACKEND = "hashing"  # "hashing" (local TF-IDF, no API calls) or "openai"
+EMBEDDING_MODEL = "text-embedding-3-small"
+HASH_DIM = 4096  # Buckets for the hashing backend
+TOP_K = 15
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "our", "the", "to", "we", "with", "you", "your", "this", "that", "all", "more", "us",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower().replace("_", " ")) if t not in STOPWORDS]
+
+
+def product_text(product: Dict) -> str:
+    """Text a product is indexed under: description, keywords, target industries and product types."""
+    parts = [
+        product.get("brand", ""),
+        product.get("product_name", ""),
+        product.get("description", ""),
+        " ".join(product.get("keywords", [])),
+        " ".join(product.get("target_industries", [])),
+        " ".join(product.get("target_product_types", [])),
+    ]
+    return " ".join(p for p in parts if p and p != "nan")
+
+
+def catalog_hash(products: List[Dict]) -> str:
+    return hashlib.sha256(json.dumps(products, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+# === Backends: list of texts -> L2-normalized float32 matrix ===
+def _hashed_counts(texts: List[str]) -> np.ndarray:
+    matrix = np.zeros((len(texts), HASH_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for gram in grams:
+            matrix[row, zlib.crc32(gram.encode("utf-8")) % HASH_DIM] += 1.0
+    return matrix
+
+
+def _embed_openai(texts: List[str]) -> np.ndarray:
+    import openai
+    vectors = []
+    for start in range(0, len(texts), 256):
+        response = openai.embeddings.create(model=EMBEDDING_MODEL, input=texts[start:start + 256])
+        vectors.extend(item.embedding for item in response.data)
+    return _normalize(np.array(vectors, dtype=np.float32))
+
+
+class CatalogIndex:
+    """Vector index over catalog products, persisted to INDEX_PATH."""
+
+    def __init__(self, vectors: np.ndarray, idf: np.ndarray, backend: str, digest: str):
+        self.vectors = vectors
+        self.idf = idf
+        self.backend = backend
+        self.digest = digest
+
+    @classmethod
+    def build(cls, products: List[Dict], backend: str = EMBEDDING_BACKEND) -> "CatalogIndex":
+        texts = [product_text(p) for p in products]
+        if backend == "openai":
+            return cls(_embed_openai(texts), np.ones(0, dtype=np.float32), backend, catalog_hash(products))
+
+        counts = _hashed_counts(texts)
+        doc_freq = (counts > 0).sum(axis=0)
+        idf = (np.log((len(texts) + 1) / (doc_freq + 1)) + 1).astype(np.float32)
+        tf = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0)
+        return cls(_normalize(tf * idf).astype(np.float32), idf, backend, catalog_hash(products))
+
+    def save(self, path: str = INDEX_PATH) -> None:
+        np.savez_compressed(path, vectors=self.vectors, idf=self.idf,
+                            meta=np.array(json.dumps({"backend": self.backend, "digest": self.digest})))
+
+    @classmethod
+    def load(cls, path: str = INDEX_PATH) -> "CatalogIndex":
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        return cls(data["vectors"], data["idf"], meta["backend"], meta["digest"])
+
+    @classmethod
+    def load_or_build(cls, products: List[Dict], path: str = INDEX_PATH,
+                      backend: str = EMBEDDING_BACKEND) -> "CatalogIndex":
+        """Reuse the persisted index unless the catalog or backend changed."""
+        if os.path.exists(path):
+            index = cls.load(path)
+            if index.digest == catalog_hash(products) and index.backend == backend:
+                return index
+        logger.info(f"🧮 Building catalog index over {len(products)} products ({backend})")
+        index = cls.build(products, backend)
+        index.save(path)
+        return index
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        if self.backend == "openai":
+            return _embed_openai(texts)
+        counts = _hashed_counts(texts)
+        tf = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0)
+        return _normalize(tf * self.idf).astype(np.float32)
+
+    def search_many(self, texts: List[str], k: int = TOP_K) -> List[List[Tuple[int, float]]]:
+        """Top-k (product_index, cosine score) per query text."""
+        if not texts:
+            return []
+        scores = self.embed_queries(texts) @ self.vectors.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, ids in enumerate(top):
+            ids = ids[np.argsort(-scores[row, ids])]
+            results.append([(int(i), float(scores[row, i])) for i in ids])
+        return results
+
+    def search(self, text: str, k: int = TOP_K) -> List[Tuple[int, float]]:
+        return self.search_many([text], k)[0]
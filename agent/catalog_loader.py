@@ -1,37 +1,36 @@
-
-import os
-import json
-import pandas as pd
+from agent.ingest import CHUNK_SIZE, iter_records
+from agent.lead_store import get_lead_store
 
 # Define the paths
-CATALOG_PATH = "data/product_info.xlsx"
-PROCESSED_DIR = "data"
-OUTPUT_FILE = os.path.join(PROCESSED_DIR, "catalog_parsed.json")
+CATALOG_PATH = "data/product_info.xlsx"  # .xlsx, .csv or .parquet
 
-def load_product_catalog(catalog_path):
-    df = pd.read_excel(catalog_path)
+# (field, spreadsheet column, kind)
+CATALOG_FIELDS = [
+    ("brand", "brand_name", "text"),
+    ("product_name", "product_name", "text"),
+    ("description", "description", "text"),
+    ("target_industries", "target_industries", "list"),
+    ("target_product_types", "target_product_types", "list"),
+    ("keywords", "keywords", "list"),
+]
 
-    products = []
-    for _, row in df.iterrows():
-        product = {
-            "brand": str(row.get("brand_name", "")).strip(),
-            "product_name": str(row.get("product_name", "")).strip(),
-            "description": str(row.get("description", "")).strip(),
-            "target_industries": [i.strip() for i in str(row.get("target_industries", "")).split(",")],
-            "target_product_types": [i.strip() for i in str(row.get("target_product_types", "")).split(",")],
-            "keywords": [k.strip() for k in str(row.get("keywords", "")).split(",")]
-        }
-        products.append(product)
+def iter_product_chunks(catalog_path, chunk_size=CHUNK_SIZE):
+    """Stream the catalog as lists of product dicts, chunk_size rows at a time."""
+    return iter_records(catalog_path, CATALOG_FIELDS, chunk_size)
 
-    return products
+def load_product_catalog(catalog_path):
+    return [product for chunk in iter_product_chunks(catalog_path) for product in chunk]
 
 def save_parsed_catalog(products):
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(products, f, indent=2)
-    print(f"✅ Parsed catalog saved to: {OUTPUT_FILE}")
+    count = get_lead_store().replace_products([products])
+    print(f"✅ Parsed catalog saved to the lead store: {count} products")
+
+def ingest_catalog(catalog_path=CATALOG_PATH, store=None):
+    """Stream the catalog into the lead store, replacing the previous one; returns the product count."""
+    count = (store or get_lead_store()).replace_products(iter_product_chunks(catalog_path))
+    print(f"✅ Ingested {count} products from {catalog_path} into the lead store.")
+    return count
 
 # Optional main trigger to test
 if __name__ == "__main__":
-    parsed = load_product_catalog(CATALOG_PATH)
-    save_parsed_catalog(parsed)
+    ingest_catalog()
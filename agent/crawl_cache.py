@@ -0,0 +1,181 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+DB_PATH = "data/crawl_cache.sqlite"
+CACHE_TTL = 24 * 3600  # Seconds a cached page is served without revalidating
+# WAL + NORMAL: a commit appends to the log without an fsync, and readers never block the writer
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def site_content_hash(site_content: Dict[str, str]) -> str:
+    """Stable hash of a crawled site's {page_type: text} dict."""
+    return content_hash(json.dumps(site_content, sort_keys=True, ensure_ascii=False))
+
+
+class CrawlCache:
+    """Persistent HTTP cache for crawled pages plus per-lead content hashes.
+
+    Pages younger than `ttl` are served straight from the cache; older ones are
+    revalidated with If-None-Match / If-Modified-Since so unchanged pages cost a 304.
+    `stage_inputs` maps a stage to a hash of what it reads besides the site (catalog,
+    prompt settings); a stage record is only current while that matches too.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, ttl: float = CACHE_TTL, stage_inputs: Optional[Dict[str, str]] = None):
+        self.ttl = ttl
+        self.stage_inputs = stage_inputs or {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL,
+            content_hash TEXT,
+            body BLOB
+        );
+        CREATE TABLE IF NOT EXISTS site_state (
+            lead_key TEXT PRIMARY KEY,
+            content_hash TEXT,
+            checked_at REAL,
+            changed_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS stage_state (
+            lead_key TEXT,
+            stage TEXT,
+            content_hash TEXT,
+            updated_at REAL,
+            PRIMARY KEY (lead_key, stage)
+        );
+        """)
+        self.stats = {"fresh": 0, "not_modified": 0, "fetched": 0}
+
+    # === Page cache ===
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, fetched_at, content_hash, body FROM http_cache WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if not row:
+            return None
+        etag, last_modified, fetched_at, digest, body = row
+        return {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+            "content_hash": digest,
+            "body": zlib.decompress(body).decode("utf-8"),
+        }
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, headers, body: str) -> None:
+        """Save a 200 response; `headers` is any mapping with .get()."""
+        self.stats["fetched"] += 1
+        with self._lock:
+            self._conn.execute("""
+            INSERT OR REPLACE INTO http_cache (url, etag, last_modified, fetched_at, content_hash, body)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                url,
+                headers.get("ETag"),
+                headers.get("Last-Modified"),
+                time.time(),
+                content_hash(body),
+                zlib.compress(body.encode("utf-8")),
+            ))
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark a cached page as revalidated (server answered 304)."""
+        self.stats["not_modified"] += 1
+        with self._lock:
+            self._conn.execute("UPDATE http_cache SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    # === Per-lead change tracking ===
+    def get_site_hash(self, lead_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM site_state WHERE lead_key = ?", (lead_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_site_content(self, lead_key: str, site_content: Dict[str, str]) -> bool:
+        """Store the site's content hash; return True if it differs from the last crawl."""
+        digest = site_content_hash(site_content)
+        previous = self.get_site_hash(lead_key)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+            INSERT INTO site_state (lead_key, content_hash, checked_at, changed_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(lead_key) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                checked_at = excluded.checked_at,
+                changed_at = CASE WHEN site_state.content_hash = excluded.content_hash
+                                  THEN site_state.changed_at ELSE excluded.changed_at END
+            """, (lead_key, digest, now, now))
+            self._conn.commit()
+        return digest != previous
+
+    def _stage_hash(self, lead_key: str, stage: str, inputs: str) -> Optional[str]:
+        """Site content hash, folded with the stage's shared inputs and this lead's own `inputs`."""
+        site_hash = self.get_site_hash(lead_key)
+        if site_hash is None:
+            return None
+        extra = [self.stage_inputs.get(stage, ""), inputs]
+        return content_hash("|".join([site_hash, *extra])) if any(extra) else site_hash
+
+    def stage_is_current(self, lead_key: str, stage: str, inputs: str = "") -> bool:
+        """True if `stage` already ran for this lead against its current site content and inputs."""
+        stage_hash = self._stage_hash(lead_key, stage, inputs)
+        if stage_hash is None:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM stage_state WHERE lead_key = ? AND stage = ?",
+                (lead_key, stage)
+            ).fetchone()
+        return bool(row) and row[0] == stage_hash
+
+    def mark_stage_done(self, lead_key: str, stage: str, inputs: str = "") -> None:
+        stage_hash = self._stage_hash(lead_key, stage, inputs)
+        if stage_hash is None:
+            return
+        with self._lock:
+            self._conn.execute("""
+            INSERT OR REPLACE INTO stage_state (lead_key, stage, content_hash, updated_at)
+            VALUES (?, ?, ?, ?)
+            """, (lead_key, stage, stage_hash, time.time()))
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
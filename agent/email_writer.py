@@ -1,20 +1,34 @@
 import os
 import json
 import openai
+from agent.artifact_store import get_artifact_store
+from agent.crawl_cache import CrawlCache, content_hash
+from agent.lead_profile import PROFILE_VERSION, get_profile, profile_text
+from agent.lead_store import lead_key_for
 from utils.prompts import SALES_EMAIL_PROMPT
+from utils import llm_batch, llm_client
+from utils.prompt_budget import count_tokens, fit_pages, fit_sections
 from utils.logger import logger
 from dotenv import load_dotenv
 
 # === Config ===
-MATCH_RESULTS_DIR = "data/match_results"
-OUTPUT_DIR = "data/emails"
+MATCH_RESULTS = "match_results"  # Artifact store stages read and written here
+STAGE = "emails"
 COMPANY_INFO_FILE = "data/company_info.md"
-WEBSITE_CONTENT_DIR = "data/website_content"
+WEBSITE_CONTENT = "website_content"
 USE_GPT = True  # 🔄 Set to False to use offline generation
 LIMIT = 20       # 🔁 Limit number of companies for testing
+SKIP_UNCHANGED = True  # ⏩ Keep existing emails for leads whose website content hasn't changed
+USE_BATCH_API = False  # 🌙 Overnight runs: generate all emails as one OpenAI Batch API job (half price, up to 24h)
+EMAIL_MODEL = "gpt-4o"
+SYSTEM_PROMPT = "You are a professional B2B sales assistant."
+GPT_ERROR_EMAIL = "[GPT ERROR] Could not generate email."
+OFFLINE_EMAIL = "[OFFLINE MODE]\n\nDear [Company],\n\nWe thought your business might benefit from some of our packaging solutions. Let us know if you’d like to explore this further.\n\nBest regards,\n[Your Name]"
+STREAM = True  # 📺 Stream each email token by token (the Streamlit UI renders it live)
+# ✂️ Max prompt tokens per section; website text is shared fairly across the crawled pages
+PROMPT_BUDGETS = {"company_info": 1500, "matched_products": 400, "lead_website": 1500}
 
 # === Setup ===
-os.makedirs(OUTPUT_DIR, exist_ok=True)
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
@@ -24,84 +38,169 @@ def load_text(path):
         return f.read()
 
 
-def load_match_results():
-    files = sorted(os.listdir(MATCH_RESULTS_DIR))
-    jsons = []
-    for f in files:
-        if f.endswith(".json"):
-            with open(os.path.join(MATCH_RESULTS_DIR, f), "r", encoding="utf-8") as f_json:
-                jsons.append(json.load(f_json))
-    return jsons[:LIMIT]
+def load_match_results(lead_keys=None):
+    """Match results for the first LIMIT leads, or for exactly `lead_keys` when given."""
+    items = get_artifact_store().items(MATCH_RESULTS, lead_keys, limit=LIMIT if lead_keys is None else None)
+    return [result for _, result in items]
 
 
-def load_website_content(company_name):
-    safe_name = company_name.lower().replace(" ", "_").replace("/", "_")
-    path = os.path.join(WEBSITE_CONTENT_DIR, f"{safe_name}.json")
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as f:
-            return "\n".join(json.load(f).values())
+def load_website_content(company_name, budget=None):
+    """Crawled site text, fitted into `budget` tokens across its pages when given."""
+    pages = get_artifact_store().get(WEBSITE_CONTENT, lead_key_for(company_name))
+    if pages is not None:
+        if budget is not None:
+            pages = fit_pages(pages, budget, EMAIL_MODEL)
+        return "\n".join(pages.values())
     return "No website content available."
 
 
 def build_prompt(company_data, company_info):
     company_name = company_data["company_name"]
 
-    matched = company_data.get("matched_products") or company_data.get("matches", {}).get("gpt4o", [])
+    matches = company_data.get("matches", {})
+    matched = company_data.get("matched_products") or matches.get("gpt4o") or matches.get("local", [])
     product_list = "\n".join([
         f"- {p['brand']} {p['product_name']}: {p.get('reason', '')}" for p in matched
     ]) or "No relevant products found."
 
-    lead_website = load_website_content(company_name)
-
-    # Fill prompt from prompts.py
-    return SALES_EMAIL_PROMPT.format(
-        lead_company=company_name,
-        lead_website=lead_website,
-        company_info=company_info + "\n\nRelevant Products:\n" + product_list
-    )
+    safe_name = lead_key_for(company_name)
+    profile = get_profile(safe_name, company=company_name)
+    sections = fit_sections({
+        "company_info": company_info,
+        "matched_products": product_list,
+        "lead_website": profile_text(profile) if profile else load_website_content(company_name, PROMPT_BUDGETS.get("lead_website")),
+    }, PROMPT_BUDGETS, EMAIL_MODEL)
+    logger.debug(f"🧾 {company_name} prompt sections (tokens): "
+                 f"{ {name: count_tokens(text, EMAIL_MODEL) for name, text in sections.items()} }")
+
+    # Fill prompt from prompts.py (static company block first, per-lead text last)
+    return SALES_EMAIL_PROMPT.format(lead_company=company_name, **sections)
+
+
+def email_request(prompt):
+    """chat.completions params for one email (shared by the interactive and batch paths)."""
+    return {
+        "model": EMAIL_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "cache": True,  # Same lead + same prompt → reuse the email already paid for
+        "temperature": 0.7,
+        "max_tokens": 500,
+    }
 
 
 def generate_email(prompt):
     if USE_GPT:
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a professional B2B sales assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
-            #stop=["\n\n", "---"]
-            #return response["choices"][0]["message"]["content"]
-            return response.choices[0].message.content.strip()
-            print("🔢 Prompt tokens used:", response.usage.prompt_tokens)
-            print("🧠 Completion tokens used:", response.usage.completion_tokens)
+            return llm_client.chat(**email_request(prompt)).strip()
         except Exception as e:
             logger.error(f"❌ GPT generation failed: {e}")
-            return "[GPT ERROR] Could not generate email."
+            return GPT_ERROR_EMAIL
     else:
-        return "[OFFLINE MODE]\n\nDear [Company],\n\nWe thought your business might benefit from some of our packaging solutions. Let us know if you’d like to explore this further.\n\nBest regards,\n[Your Name]"
+        return OFFLINE_EMAIL
+
+
+def stream_email(prompt, on_token=None):
+    """generate_email() over a streamed completion; on_token(text_so_far) runs after every delta."""
+    if not USE_GPT:
+        return generate_email(prompt)
+    text = ""
+    try:
+        for delta in llm_client.stream_chat(**email_request(prompt)):
+            text += delta
+            if on_token:
+                on_token(text)
+        return text.strip()
+    except Exception as e:
+        logger.error(f"❌ GPT generation failed: {e}")
+        return GPT_ERROR_EMAIL
 
 
 def write_email(company_name, content):
-    safe_name = company_name.lower().replace(" ", "_").replace("/", "_")
-    output_path = os.path.join(OUTPUT_DIR, f"{safe_name}.txt")
-    with open(output_path, "w", encoding="utf-8") as f_out:
-        f_out.write(content)
-    print(f"📧 Email saved for {company_name} → {output_path}")
+    safe_name = lead_key_for(company_name)
+    get_artifact_store().put(STAGE, safe_name, content)
+    print(f"📧 Email saved for {company_name} → {STAGE}/{safe_name}")
 
 
-def main():
-    company_info = load_text(COMPANY_INFO_FILE)
-    match_results = load_match_results()
+def prompt_version():
+    """Hash of the prompt template and settings that shape an email."""
+    settings = [SALES_EMAIL_PROMPT, SYSTEM_PROMPT, EMAIL_MODEL, USE_GPT, PROMPT_BUDGETS, PROFILE_VERSION]
+    return content_hash(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str))
+
 
-    for entry in match_results:
+def open_stage_cache():
+    """CrawlCache whose email records also cover company info and prompt_version(); None with SKIP_UNCHANGED off."""
+    if not SKIP_UNCHANGED:
+        return None
+    return CrawlCache(stage_inputs={"email": content_hash(load_text(COMPANY_INFO_FILE) + prompt_version())})
+
+
+def match_digest(safe_name):
+    """Per-lead email input on top of the site: the match result it was written from."""
+    return get_artifact_store().digest(MATCH_RESULTS, safe_name) or ""
+
+
+def load_email_jobs(cache=None, lead_keys=None):
+    """Return (company, safe_name, prompt) for leads that need an email (all of `lead_keys` when given)."""
+    company_info = load_text(COMPANY_INFO_FILE)
+    artifacts = get_artifact_store()
+    jobs = []
+    for entry in load_match_results(lead_keys):
         company = entry["company_name"]
-        prompt = build_prompt(entry, company_info)
-        email = generate_email(prompt)
-        write_email(company, email)
+        safe_name = lead_key_for(company)
+        if lead_keys is None and cache and artifacts.has(STAGE, safe_name) and cache.stage_is_current(safe_name, "email", match_digest(safe_name)):
+            print(f"⏩ Skipping {company}, website, matches and prompt unchanged since last email.")
+            continue
+        jobs.append((company, safe_name, build_prompt(entry, company_info)))
+    return jobs
+
+
+def save_email(company, safe_name, email, cache=None):
+    write_email(company, email)
+    if cache and email != GPT_ERROR_EMAIL:  # failed leads are retried on the next run
+        cache.mark_stage_done(safe_name, "email", match_digest(safe_name))
+
+
+def iter_emails(on_token=None, lead_keys=None):
+    """Generate emails lead by lead, yielding (company, email) as soon as each one is saved.
+
+    With STREAM on, on_token(company, text_so_far) is called for every streamed delta.
+    """
+    cache = open_stage_cache()
+    for company, safe_name, prompt in load_email_jobs(cache, lead_keys):
+        if STREAM:
+            email = stream_email(prompt, on_token and (lambda text: on_token(company, text)))
+        else:
+            email = generate_email(prompt)
+        save_email(company, safe_name, email, cache)
+        yield company, email
+    llm_client.log_cache_stats()
+
+
+def main(client=None, poll_interval=llm_batch.POLL_INTERVAL, lead_keys=None):
+    """Write an email per matched lead; `client`/`poll_interval` only apply with USE_BATCH_API.
+
+    Returns the lead keys that got an email (failed generations are left out).
+    """
+    if not (USE_BATCH_API and USE_GPT):
+        return [
+            lead_key_for(company) for company, email in iter_emails(lead_keys=lead_keys) if email != GPT_ERROR_EMAIL
+        ]
+
+    cache = open_stage_cache()
+    jobs = load_email_jobs(cache, lead_keys)
+    requests = {safe_name: email_request(prompt) for _, safe_name, prompt in jobs}
+    outputs = llm_batch.run_batch(requests, "email", client=client, poll_interval=poll_interval)
+    written = []
+    for company, safe_name, _ in jobs:
+        email = (outputs.get(safe_name) or GPT_ERROR_EMAIL).strip()
+        save_email(company, safe_name, email, cache)
+        if email != GPT_ERROR_EMAIL:
+            written.append(safe_name)
+    llm_client.log_cache_stats()
+    return written
 
 
 if __name__ == "__main__":
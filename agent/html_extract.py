@@ -0,0 +1,128 @@
+import re
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:  # lxml is optional; fall back to the stdlib html.parser
+    lxml = None
+
+# === Config ===
+EXTRACTOR = "auto"        # "auto" (lxml if installed), "lxml", "bs4" or "legacy"
+MAX_PAGE_CHARS = 20000    # Cap on extracted text per page
+MIN_DEDUPE_CHARS = 20     # Shorter blocks are never treated as repeated boilerplate
+
+# Elements that never carry useful page copy
+BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "template", "svg", "iframe", "form", "button",
+    "nav", "header", "footer", "aside",
+]
+# id/class values that mark cookie banners, popups and similar overlays
+BOILERPLATE_ATTR_RE = re.compile(r"cookie|consent|gdpr|popup|modal|newsletter", re.IGNORECASE)
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "br",
+]
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _to_blocks(text: str) -> List[str]:
+    blocks = []
+    for line in text.split("\n"):
+        line = WHITESPACE_RE.sub(" ", line).strip()
+        if line:
+            blocks.append(line)
+    return blocks
+
+
+def _cap(blocks: List[str]) -> List[str]:
+    capped, total = [], 0
+    for block in blocks:
+        if total + len(block) > MAX_PAGE_CHARS:
+            break
+        capped.append(block)
+        total += len(block) + 1
+    return capped
+
+
+# === Extractors: html -> list of text blocks ===
+def extract_blocks_legacy(html: str) -> List[str]:
+    """The original extractor: every text node on the page, boilerplate included."""
+    soup = BeautifulSoup(html, "html.parser")
+    return [soup.get_text(separator=" ", strip=True)]
+
+
+def extract_blocks_bs4(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    for el in soup.find_all(BOILERPLATE_TAGS):
+        el.decompose()
+    for el in soup.find_all(attrs={"id": BOILERPLATE_ATTR_RE}) + soup.find_all(class_=BOILERPLATE_ATTR_RE):
+        if not el.decomposed:
+            el.decompose()
+    for el in soup.find_all(BLOCK_TAGS):
+        el.insert_before("\n")
+        el.insert_after("\n")
+    return _cap(_to_blocks(soup.get_text()))
+
+
+def extract_blocks_lxml(html: str) -> List[str]:
+    try:
+        root = lxml.html.fromstring(html)
+    except ValueError:  # str input with an XML encoding declaration
+        root = lxml.html.fromstring(html.encode("utf-8"))
+    except ParserError:  # empty document
+        return []
+
+    doomed = root.xpath("|".join(f"//{tag}" for tag in BOILERPLATE_TAGS))
+    doomed += [
+        el for el in root.xpath("//*[@id or @class]")
+        if BOILERPLATE_ATTR_RE.search(f"{el.get('id', '')} {el.get('class', '')}")
+    ]
+    for el in doomed:
+        if el.getparent() is not None:
+            el.drop_tree()
+    for el in root.iter(*BLOCK_TAGS):
+        el.text = "\n" + (el.text or "")
+        el.tail = "\n" + (el.tail or "")
+    return _cap(_to_blocks(root.text_content()))
+
+
+EXTRACTORS = {
+    "legacy": extract_blocks_legacy,
+    "bs4": extract_blocks_bs4,
+    "lxml": extract_blocks_lxml,
+}
+
+
+def get_extractor(name: str = None):
+    name = name or EXTRACTOR
+    if name == "auto":
+        name = "lxml" if lxml is not None else "bs4"
+    if name == "lxml" and lxml is None:
+        raise ImportError("lxml is not installed; use EXTRACTOR = 'bs4'")
+    return EXTRACTORS[name]
+
+
+def extract_text(html: str, extractor: str = None) -> str:
+    """Page text with one block per line."""
+    return "\n".join(get_extractor(extractor)(html))
+
+
+def dedupe_site_text(site_content: Dict[str, str]) -> Dict[str, str]:
+    """Drop blocks already seen on an earlier page of the same site (repeated banners, CTAs...)."""
+    seen = set()
+    deduped = {}
+    for page_type, text in site_content.items():
+        kept = []
+        for block in text.split("\n"):
+            key = block.lower()
+            if len(block) >= MIN_DEDUPE_CHARS:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.append(block)
+        if kept:
+            deduped[page_type] = "\n".join(kept)
+    return deduped
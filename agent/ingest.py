@@ -0,0 +1,125 @@
+import csv
+import json
+import math
+import os
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# === Config ===
+CHUNK_SIZE = 5000  # 📦 Rows read, normalized and written at a time; bounds memory for any file size
+
+# (output field, source column, kind) where kind is "text" or "list" (comma-separated)
+FieldSpec = Sequence[Tuple[str, str, str]]
+
+
+# === Readers: yield {column: [values]} chunks ===
+def _chunk_columns(header: List, rows: List[Sequence]) -> Dict[str, list]:
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    return {str(name).strip(): list(values) for name, values in zip(header, columns) if name is not None}
+
+
+def _iter_rows_in_chunks(header, rows, chunk_size) -> Iterator[Dict[str, list]]:
+    chunk, yielded = [], False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _chunk_columns(header, chunk)
+            chunk, yielded = [], True
+    if chunk or not yielded:  # a header-only file still yields its (empty) columns
+        yield _chunk_columns(header, chunk)
+
+
+def _iter_xlsx(path: str, chunk_size: int) -> Iterator[Dict[str, list]]:
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        rows = (row for row in rows if any(value is not None for value in row))
+        yield from _iter_rows_in_chunks(header, rows, chunk_size)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(path: str, chunk_size: int) -> Iterator[Dict[str, list]]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows = (row + [None] * (len(header) - len(row)) for row in reader if any(row))
+        yield from _iter_rows_in_chunks(header, rows, chunk_size)
+
+
+def _iter_parquet(path: str, chunk_size: int) -> Iterator[Dict[str, list]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet ingestion needs pyarrow (pip install pyarrow)") from e
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pydict()
+
+
+READERS = {".xlsx": _iter_xlsx, ".xlsm": _iter_xlsx, ".csv": _iter_csv, ".parquet": _iter_parquet}
+
+
+def iter_column_chunks(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, list]]:
+    """Stream a spreadsheet as {column: [values]} chunks of at most chunk_size rows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported file type {ext!r} (expected one of {sorted(READERS)})")
+    return READERS[ext](path, chunk_size)
+
+
+def read_header(path: str) -> List[str]:
+    """Column names of a spreadsheet without reading its rows."""
+    for chunk in iter_column_chunks(path, chunk_size=1):
+        return list(chunk)
+    return []
+
+
+# === Normalization: one pass per column, not per row ===
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def text_column(values: list) -> List[str]:
+    return ["" if _is_missing(v) else str(v).strip() for v in values]
+
+
+def list_column(values: list) -> List[List[str]]:
+    return [[part.strip() for part in text.split(",") if part.strip()] for text in text_column(values)]
+
+
+def normalize_chunk(chunk: Dict[str, list], fields: FieldSpec) -> List[Dict]:
+    """Records with `fields` from a column chunk; missing columns and cells become "" / []."""
+    size = len(next(iter(chunk.values()), []))
+    columns = []
+    for _, source, kind in fields:
+        values = chunk.get(source, [None] * size)
+        columns.append(list_column(values) if kind == "list" else text_column(values))
+    names = [name for name, _, _ in fields]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def iter_records(path: str, fields: FieldSpec, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """Normalized records from a spreadsheet, chunk_size at a time."""
+    for chunk in iter_column_chunks(path, chunk_size):
+        yield normalize_chunk(chunk, fields)
+
+
+# === Parsed files from before the lead store ===
+def read_records(path: str) -> Iterator[Dict]:
+    """Stream records from a parsed .jsonl file, or from the older .json array next to it."""
+    legacy_path = os.path.splitext(path)[0] + ".json"
+    if not os.path.exists(path) and path.endswith(".jsonl") and os.path.exists(legacy_path):
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
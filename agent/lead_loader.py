@@ -1,35 +1,38 @@
-import os
-import json
-import pandas as pd
+from agent.ingest import CHUNK_SIZE, iter_records
+from agent.lead_store import get_lead_store
 
 # Define paths
-LEADS_PATH = "data/leads_info.xlsx"
-PROCESSED_DIR = "data"
-OUTPUT_FILE = os.path.join(PROCESSED_DIR, "leads_parsed.json")
+LEADS_PATH = "data/leads_info.xlsx"  # .xlsx, .csv or .parquet
 
-def load_leads(leads_path):
-    df = pd.read_excel(leads_path)
+# (field, spreadsheet column, kind)
+LEAD_FIELDS = [
+    ("company_name", "company_name", "text"),
+    ("website", "website", "text"),
+    ("contact_name", "contact_name", "text"),
+    ("contact_email", "contact_email", "text"),
+    ("notes", "notes", "text"),
+]
 
-    leads = []
-    for _, row in df.iterrows():
-        lead = {
-            "company_name": str(row.get("company_name", "")).strip(),
-            "website": str(row.get("website", "")).strip(),
-            "contact_name": str(row.get("contact_name", "")).strip(),
-            "contact_email": str(row.get("contact_email", "")).strip(),
-            "notes": str(row.get("notes", "")).strip()
-        }
-        leads.append(lead)
+def iter_lead_chunks(leads_path, chunk_size=CHUNK_SIZE):
+    """Stream the lead list as lists of lead dicts, chunk_size rows at a time."""
+    return iter_records(leads_path, LEAD_FIELDS, chunk_size)
 
-    return leads
+def load_leads(leads_path):
+    return [lead for chunk in iter_lead_chunks(leads_path) for lead in chunk]
 
 def save_parsed_leads(leads):
-    os.makedirs(PROCESSED_DIR, exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(leads, f, indent=2)
-    print(f"✅ Parsed leads saved to: {OUTPUT_FILE}")
+    counts = get_lead_store().upsert_leads([leads], prune=True)
+    print(f"✅ Parsed leads saved to the lead store: {counts}")
+
+def ingest_leads(leads_path=LEADS_PATH, store=None):
+    """Stream the lead list into the lead store chunk by chunk; leads no longer in it are removed.
+
+    Returns the number of leads in the file.
+    """
+    counts = (store or get_lead_store()).upsert_leads(iter_lead_chunks(leads_path), prune=True)
+    print(f"✅ Ingested {leads_path} into the lead store: {counts}")
+    return counts["inserted"] + counts["updated"] + counts["unchanged"]
 
 # Optional test trigger
 if __name__ == "__main__":
-    parsed_leads = load_leads(LEADS_PATH)
-    save_parsed_leads(parsed_leads)
+    ingest_leads()
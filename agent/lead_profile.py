@@ -0,0 +1,222 @@
+import json
+import math
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from agent.artifact_store import get_artifact_store
+from agent.catalog_index import catalog_hash, tokenize
+from agent.crawl_cache import site_content_hash
+from agent.lead_store import get_lead_store
+from utils import llm_client
+from utils.logger import logger
+from utils.prompt_budget import count_tokens, truncate_to_tokens
+from utils.prompts import LEAD_PROFILE_PROMPT
+
+# === Config ===
+DB_PATH = "data/lead_profiles.sqlite"
+USE_PROFILES = True  # 🪪 Stages read the lead profile instead of raw site text
+PROFILE_MODE = "local"  # "local" (extractive summary from catalog terms, no API calls) or "gpt"
+PROFILE_MODEL = "gpt-4o-mini"
+SUMMARY_TOKENS = 250  # Budget for the profile summary
+MAX_TERMS = 5  # Industries / product types / keywords kept per profile
+MIN_SENTENCE_WORDS, MAX_SENTENCE_WORDS = 6, 60
+MIN_PROSE_RATIO = 0.5  # Share of lowercase words a sentence needs; Title Case runs are nav menus, not copy
+PROFILE_VERSION = 1  # Bump when profile extraction changes so stored profiles are rebuilt
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def _phrase(term: str) -> str:
+    return " ".join(tokenize(term))
+
+
+class LeadProfiler:
+    """Builds lead profiles (summary, industry, product types, keywords) from crawled site text.
+
+    Industries, product types and keywords are detected by matching the catalog's
+    own vocabulary, so profiles line up with what the matcher can recommend.
+    """
+
+    def __init__(self, products: List[Dict]):
+        self.catalog_hash = catalog_hash(products)
+        self.vocab = {}
+        for field in ("target_industries", "target_product_types", "keywords"):
+            phrases = {_phrase(term) for p in products for term in p.get(field) or [] if term and term != "nan"}
+            self.vocab[field] = sorted(p for p in phrases if p)
+        self.all_phrases = set().union(*self.vocab.values())
+
+    def _count_phrases(self, tokens: List[str], phrases: List[str]) -> Counter:
+        text = " " + " ".join(tokens) + " "
+        return Counter({p: text.count(f" {p} ") for p in phrases if f" {p} " in text})
+
+    def detect(self, text: str) -> Dict[str, List[str]]:
+        tokens = tokenize(text)
+        token_counts = Counter(tokens)
+        found = {}
+        for field, phrases in self.vocab.items():
+            counts = self._count_phrases(tokens, phrases)
+            if field == "target_industries":
+                # Industry labels ("retail-packaged-goods") rarely appear verbatim; accept all words present
+                for phrase in phrases:
+                    words = phrase.split()
+                    if phrase not in counts and len(words) > 1 and all(token_counts[w] for w in words):
+                        counts[phrase] = sum(math.log1p(token_counts[w]) for w in words) / len(words)
+            found[field] = [p for p, _ in counts.most_common(MAX_TERMS)]
+        return found
+
+    def summarize(self, website_data: Dict[str, str], budget: int = SUMMARY_TOKENS) -> str:
+        """Extractive summary: the sentences densest in catalog terms (plus each page's opener), in site order."""
+        candidates, seen = [], set()
+        for page_rank, text in enumerate(website_data.values()):
+            for position, sentence in enumerate(s.strip() for s in SENTENCE_RE.split(text or "")):
+                words = sentence.split()
+                if not MIN_SENTENCE_WORDS <= len(words) <= MAX_SENTENCE_WORDS or sentence in seen:
+                    continue
+                if sum(w[0].islower() for w in words) / len(words) < MIN_PROSE_RATIO:
+                    continue
+                seen.add(sentence)
+                tokens = tokenize(sentence)
+                hits = len(self._count_phrases(tokens, self.all_phrases))
+                score = hits + (1.0 if position == 0 else 0.0) - 0.1 * page_rank
+                candidates.append((score, len(candidates), sentence))
+        chosen, used = [], 0
+        for score, order, sentence in sorted(candidates, key=lambda c: (-c[0], c[1])):
+            cost = count_tokens(sentence)
+            if used + cost > budget:
+                continue
+            chosen.append((order, sentence))
+            used += cost
+        if not chosen:  # no prose at all (parked/spam domains): show the head so the reader can tell
+            return truncate_to_tokens(" ".join(website_data.values()), budget // 2)
+        return " ".join(sentence for _, sentence in sorted(chosen))
+
+    def build_local(self, website_data: Dict[str, str]) -> Dict:
+        found = self.detect(" ".join(website_data.values()))
+        return {
+            "summary": self.summarize(website_data),
+            "industry": found["target_industries"][0] if found["target_industries"] else None,
+            "industries": found["target_industries"],
+            "product_types": found["target_product_types"],
+            "keywords": found["keywords"],
+        }
+
+    def build_gpt(self, company: str, website_data: Dict[str, str]) -> Dict:
+        """LLM-written summary; falls back to the local profile if the call or its JSON fails."""
+        local = self.build_local(website_data)
+        prompt = LEAD_PROFILE_PROMPT.format(
+            company=company,
+            industries=", ".join(self.vocab["target_industries"]),
+            product_types=", ".join(self.vocab["target_product_types"]),
+            website_text=" ".join(website_data.values())[:12000],
+            summary_tokens=SUMMARY_TOKENS,
+        )
+        try:
+            raw = llm_client.chat(model=PROFILE_MODEL, messages=[{"role": "user", "content": prompt}],
+                                  temperature=0, response_format={"type": "json_object"})
+            profile = json.loads(raw)
+        except Exception as e:
+            logger.warning(f"⚠️ GPT profile failed for {company}, using local profile: {e}")
+            return local
+        return {
+            "summary": profile.get("summary") or local["summary"],
+            "industry": profile.get("industry") or local["industry"],
+            "industries": local["industries"],
+            "product_types": profile.get("product_types") or local["product_types"],
+            "keywords": local["keywords"],
+        }
+
+
+class LeadProfileStore:
+    """SQLite store of lead profiles, valid for one site content hash and catalog hash."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS lead_profiles (
+            lead_key TEXT PRIMARY KEY,
+            content_hash TEXT,
+            catalog_hash TEXT,
+            mode TEXT,
+            profile TEXT,
+            updated_at REAL
+        );
+        """)
+        self.stats = {"hits": 0, "built": 0}
+
+    def get(self, lead_key: str, content_hash: str, catalog_digest: str, mode: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT profile FROM lead_profiles WHERE lead_key = ? AND content_hash = ? AND catalog_hash = ? AND mode = ?",
+                (lead_key, content_hash, catalog_digest, mode)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, lead_key: str, content_hash: str, catalog_digest: str, mode: str, profile: Dict) -> None:
+        with self._lock:
+            self._conn.execute("""
+            INSERT OR REPLACE INTO lead_profiles (lead_key, content_hash, catalog_hash, mode, profile, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (lead_key, content_hash, catalog_digest, mode, json.dumps(profile, ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_profiler = None
+_store = None
+
+
+def _shared():
+    global _profiler, _store
+    if _profiler is None:
+        _profiler = LeadProfiler(get_lead_store().products())
+        _store = LeadProfileStore()
+    return _profiler, _store
+
+
+def load_website_data(lead_key: str) -> Optional[Dict[str, str]]:
+    return get_artifact_store().get("website_content", lead_key)
+
+
+def get_profile(lead_key: str, website_data: Optional[Dict[str, str]] = None, company: str = "") -> Optional[Dict]:
+    """The lead's profile, built at most once per site content hash; None without crawled content."""
+    if not USE_PROFILES:
+        return None
+    website_data = website_data if website_data is not None else load_website_data(lead_key)
+    if not website_data:
+        return None
+    profiler, store = _shared()
+    digest = site_content_hash(website_data)
+    mode = f"{PROFILE_MODE}:v{PROFILE_VERSION}"
+    profile = store.get(lead_key, digest, profiler.catalog_hash, mode)
+    if profile is not None:
+        store.stats["hits"] += 1
+        return profile
+    if PROFILE_MODE == "gpt":
+        profile = profiler.build_gpt(company or lead_key, website_data)
+    else:
+        profile = profiler.build_local(website_data)
+    store.put(lead_key, digest, profiler.catalog_hash, mode, profile)
+    store.stats["built"] += 1
+    return profile
+
+
+def profile_text(profile: Optional[Dict]) -> str:
+    """Compact prompt text for a profile."""
+    if not profile:
+        return "No website content available."
+    lines = []
+    if profile.get("industry"):
+        lines.append(f"Industry: {profile['industry']}")
+    if profile.get("product_types"):
+        lines.append(f"Product types: {', '.join(profile['product_types'])}")
+    if profile.get("keywords"):
+        lines.append(f"Keywords: {', '.join(profile['keywords'])}")
+    lines.append(f"Summary: {profile.get('summary') or 'n/a'}")
+    return "\n".join(lines)
@@ -0,0 +1,354 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parseaddr
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from agent.ingest import read_records
+from utils.logger import logger
+
+DB_PATH = "data/leads.sqlite"
+
+# === Config ===
+PAGE_SIZE = 500  # 📄 Rows fetched per query by the iterators; a stage's memory is bounded by this
+KEY_BATCH = 500  # Keys per IN (...) lookup, under SQLite's bound-parameter limit
+LEGACY_LEADS = "data/leads_parsed.jsonl"  # Seeds an empty store (falls back to the older .json)
+LEGACY_CATALOG = "data/catalog_parsed.jsonl"
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 10000",
+    "PRAGMA foreign_keys = ON",
+]
+SUBJECT_TAG = re.compile(r"\[LeadID: ([^\]]+)\]")  # Added to outbound subjects by integrations/email_sender.py
+MESSAGE_ID = re.compile(r"<[^<>\s]+>")
+LEAD_FIELDS = ["company_name", "website", "contact_name", "contact_email", "notes"]
+PRODUCT_FIELDS = ["brand", "product_name", "description", "target_industries", "target_product_types", "keywords"]
+LIST_FIELDS = {"target_industries", "target_product_types", "keywords"}  # Stored as JSON arrays
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY,
+    lead_key TEXT NOT NULL UNIQUE,
+    company_name TEXT NOT NULL,
+    website TEXT,
+    domain TEXT,
+    contact_name TEXT,
+    contact_email TEXT,
+    notes TEXT,
+    row_hash TEXT,
+    updated_at REAL
+);
+-- Not unique: one buyer can cover several companies (and the sample list reuses a single address)
+CREATE INDEX IF NOT EXISTS idx_leads_email ON leads (contact_email COLLATE NOCASE) WHERE contact_email != '';
+CREATE INDEX IF NOT EXISTS idx_leads_domain ON leads (domain);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    brand TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    description TEXT,
+    target_industries TEXT,
+    target_product_types TEXT,
+    keywords TEXT,
+    UNIQUE (brand, product_name)
+);
+-- Outbound Message-IDs, so a reply's In-Reply-To/References header finds its lead in one lookup
+CREATE TABLE IF NOT EXISTS sent_messages (
+    message_id TEXT PRIMARY KEY,
+    lead_id INTEGER NOT NULL REFERENCES leads (id) ON DELETE CASCADE,
+    sent_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_sent_messages_lead ON sent_messages (lead_id, sent_at);
+"""
+UPSERT_LEAD = """
+INSERT INTO leads (lead_key, company_name, website, contact_name, contact_email, notes, domain, row_hash, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(lead_key) DO UPDATE SET
+    company_name = excluded.company_name, website = excluded.website,
+    contact_name = excluded.contact_name, contact_email = excluded.contact_email,
+    notes = excluded.notes, domain = excluded.domain,
+    row_hash = excluded.row_hash, updated_at = excluded.updated_at
+"""
+
+
+def lead_key_for(company: str) -> str:
+    return company.lower().replace(" ", "_").replace("/", "_")
+
+
+def website_domain(website: str) -> str:
+    """Host of a lead's website, lowercased and without "www." (string ops; urlparse dominated ingestion)."""
+    host = (website or "").strip().lower().split("://", 1)[-1]
+    host = host.split("/", 1)[0].split("?", 1)[0].rsplit("@", 1)[-1].split(":", 1)[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def message_ids_in(header: Optional[str]) -> List[str]:
+    """The <...> Message-IDs in an In-Reply-To or References header, in header order."""
+    return MESSAGE_ID.findall(header or "")
+
+
+def _row_hash(lead: Dict) -> str:
+    return hashlib.sha256("\x1f".join(str(lead.get(field, "")) for field in LEAD_FIELDS).encode("utf-8")).hexdigest()
+
+
+def _lead(row: sqlite3.Row) -> Dict:
+    return {"id": row["id"], "lead_key": row["lead_key"], **{field: row[field] for field in LEAD_FIELDS}}
+
+
+def _product(row: sqlite3.Row) -> Dict:
+    return {field: json.loads(row[field] or "[]") if field in LIST_FIELDS else row[field] for field in PRODUCT_FIELDS}
+
+
+class LeadStore:
+    """Leads and catalog products in indexed SQLite tables.
+
+    Leads get a stable integer id and a unique lead_key (the company's safe
+    name); re-ingesting a list updates rows in place, so ids and everything
+    keyed on them survive. Readers page through rows with
+    keyset pagination instead of loading a whole parsed file. The lead_key is
+    the canonical lead id used by artifacts and conversations; company, domain,
+    contact email and outbound Message-IDs all resolve to it through indexes.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            self._conn.execute(pragma)
+        self._conn.executescript(SCHEMA)
+        self.stats = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+
+    # === Writes ===
+    def upsert_leads(self, chunks: Iterable[List[Dict]], prune: bool = False) -> Dict[str, int]:
+        """Insert or update leads chunk by chunk (one transaction per chunk).
+
+        Rows for the same company (same lead_key) update one lead. With
+        `prune`, leads missing from `chunks` are deleted afterwards (the
+        chunks are the whole list). Returns this call's counts.
+        """
+        counts = dict.fromkeys(self.stats, 0)
+        if prune:
+            with self._lock, self._conn:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_leads (lead_key TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM seen_leads")
+        for chunk in chunks:
+            rows = {}
+            for lead in chunk:  # a later row for the same company wins, as with per-row upserts
+                if lead.get("company_name"):
+                    key = lead_key_for(lead["company_name"])
+                    rows[key] = (key, *[lead.get(field, "") for field in LEAD_FIELDS],
+                                 website_domain(lead.get("website")), _row_hash(lead), time.time())
+            with self._lock, self._conn:
+                for name, value in self._upsert_rows(list(rows.values())).items():
+                    counts[name] += value
+                if prune:
+                    self._conn.executemany("INSERT OR IGNORE INTO seen_leads VALUES (?)", [(key,) for key in rows])
+        if prune:
+            with self._lock, self._conn:
+                counts["removed"] = self._conn.execute(
+                    "DELETE FROM leads WHERE lead_key NOT IN (SELECT lead_key FROM seen_leads)"
+                ).rowcount
+        for name, value in counts.items():
+            self.stats[name] += value
+        return counts
+
+    def _existing_hashes(self, keys: List[str]) -> Dict[str, str]:
+        hashes = {}
+        for start in range(0, len(keys), KEY_BATCH):
+            batch = keys[start:start + KEY_BATCH]
+            hashes.update(self._conn.execute(
+                f"SELECT lead_key, row_hash FROM leads WHERE lead_key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return hashes
+
+    def _upsert_rows(self, rows: List[tuple]) -> Dict[str, int]:
+        """Write the changed rows of a chunk; runs inside the caller's transaction."""
+        existing = self._existing_hashes([row[0] for row in rows])
+        changed = [row for row in rows if existing.get(row[0]) != row[-2]]
+        updated = sum(row[0] in existing for row in changed)
+        self._conn.executemany(UPSERT_LEAD, changed)
+        return {"inserted": len(changed) - updated, "updated": updated, "unchanged": len(rows) - len(changed)}
+
+    def replace_products(self, chunks: Iterable[List[Dict]]) -> int:
+        """Make the catalog exactly these products; ids of products kept by (brand, name) don't change."""
+        seen = set()
+        with self._lock, self._conn:
+            for chunk in chunks:
+                for product in chunk:
+                    values = [json.dumps(product.get(f) or [], ensure_ascii=False) if f in LIST_FIELDS
+                              else product.get(f, "") for f in PRODUCT_FIELDS]
+                    self._conn.execute("""
+                    INSERT INTO products (brand, product_name, description, target_industries, target_product_types, keywords)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(brand, product_name) DO UPDATE SET
+                        description = excluded.description, target_industries = excluded.target_industries,
+                        target_product_types = excluded.target_product_types, keywords = excluded.keywords
+                    """, values)
+                    seen.add((values[0], values[1]))
+            stale = [(row["id"],) for row in self._conn.execute("SELECT id, brand, product_name FROM products")
+                     if (row["brand"], row["product_name"]) not in seen]
+            self._conn.executemany("DELETE FROM products WHERE id = ?", stale)
+        return len(seen)
+
+    # === Reads ===
+    def lead_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def get_lead(self, lead_key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM leads WHERE lead_key = ?", (lead_key,)).fetchone()
+        return _lead(row) if row else None
+
+    def get_lead_by_id(self, lead_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+        return _lead(row) if row else None
+
+    def leads_for_domain(self, domain: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM leads WHERE domain = ? ORDER BY id", (domain.lower(),)).fetchall()
+        return [_lead(row) for row in rows]
+
+    def iter_leads(self, limit: Optional[int] = None, after_id: int = 0, page_size: int = PAGE_SIZE) -> Iterator[Dict]:
+        """Leads in id (= ingestion) order, fetched page_size rows per query."""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM leads WHERE id > ? ORDER BY id LIMIT ?", (after_id, size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _lead(row)
+            after_id = rows[-1]["id"]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def iter_leads_by_key(self, lead_keys: Iterable[str]) -> Iterator[Dict]:
+        """The leads with these keys, in id order within each KEY_BATCH; unknown keys are ignored."""
+        keys = sorted(set(lead_keys))
+        for start in range(0, len(keys), KEY_BATCH):
+            batch = keys[start:start + KEY_BATCH]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM leads WHERE lead_key IN ({','.join('?' * len(batch))}) ORDER BY id", batch
+                ).fetchall()
+            for row in rows:
+                yield _lead(row)
+
+    # === Identity: company, domain, email and Message-ID → lead ===
+    def lead_for_company(self, company: str) -> Optional[Dict]:
+        return self.get_lead(lead_key_for(company))
+
+    def leads_for_email(self, email: str) -> List[Dict]:
+        """Leads with this contact email, most recently emailed first (then in id order)."""
+        with self._lock:
+            rows = self._conn.execute("""
+            SELECT leads.* FROM leads
+            WHERE contact_email = ? COLLATE NOCASE AND contact_email != ''
+            ORDER BY (SELECT MAX(sent_at) FROM sent_messages WHERE lead_id = leads.id) DESC, id
+            """, (email.strip(),)).fetchall()
+        return [_lead(row) for row in rows]
+
+    def record_message(self, lead_key: str, message_id: str, sent_at: Optional[float] = None) -> bool:
+        """Remember the Message-ID of an email sent to a lead; False if the lead is unknown."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT OR REPLACE INTO sent_messages (message_id, lead_id, sent_at) "
+                "SELECT ?, id, ? FROM leads WHERE lead_key = ?",
+                (message_id.strip(), sent_at or time.time(), lead_key)
+            ).rowcount > 0
+
+    def lead_for_message(self, message_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT leads.* FROM sent_messages JOIN leads ON leads.id = sent_messages.lead_id "
+                "WHERE message_id = ?", (message_id.strip(),)
+            ).fetchone()
+        return _lead(row) if row else None
+
+    def resolve_reply(self, from_header: str, message_ids: Sequence[str] = (), subject: str = "") -> Optional[Dict]:
+        """The lead an inbound email belongs to, or None if it can't be told apart.
+
+        Tried in order, each an indexed lookup: the Message-IDs it replies to
+        (In-Reply-To first, then References newest first), the [LeadID: ...] tag
+        of our subject line, the sender's contact email (the most recently
+        emailed lead when several share it) and finally the sender's domain
+        when exactly one lead's website is on it.
+        """
+        for message_id in message_ids:
+            lead = self.lead_for_message(message_id)
+            if lead:
+                return lead
+        tag = SUBJECT_TAG.search(subject or "")
+        lead = tag and self.get_lead(tag.group(1).strip())
+        if lead:
+            return lead
+        email = parseaddr(from_header or "")[1].lower()
+        if "@" not in email:
+            return None
+        by_email = self.leads_for_email(email)
+        if by_email:
+            return by_email[0]
+        by_domain = self.leads_for_domain(website_domain(email.rsplit("@", 1)[1]))
+        return by_domain[0] if len(by_domain) == 1 else None
+
+    def products(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM products ORDER BY id").fetchall()
+        return [_product(row) for row in rows]
+
+    def product_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _legacy_exists(path: str) -> bool:
+    return os.path.exists(path) or os.path.exists(os.path.splitext(path)[0] + ".json")
+
+
+def _chunked(records: Iterable[Dict], size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed_from_parsed(store: LeadStore) -> None:
+    """Import the parsed JSON/JSONL files written before the store existed, if the store is empty."""
+    if not store.lead_count() and _legacy_exists(LEGACY_LEADS):
+        counts = store.upsert_leads(_chunked(read_records(LEGACY_LEADS)))
+        logger.info(f"📥 Imported parsed leads into the lead store: {counts}")
+    if not store.product_count() and _legacy_exists(LEGACY_CATALOG):
+        count = store.replace_products(_chunked(read_records(LEGACY_CATALOG)))
+        logger.info(f"📥 Imported {count} parsed products into the lead store.")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_lead_store() -> LeadStore:
+    """Process-wide LeadStore, opened (and seeded from parsed files) on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = LeadStore(DB_PATH)
+                seed_from_parsed(store)
+                _store = store
+    return _store
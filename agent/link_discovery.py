@@ -0,0 +1,102 @@
+import re
+from typing import Dict, List, Tuple
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+from agent.path_memory import domain_of
+
+# Where site-wide navigation usually lives; links found here are trusted more
+NAV_CONTAINERS = ["nav", "header", "footer"]
+HOME_PATHS = {"", "/", "/home", "/index", "/index.html", "/index.php"}
+MAX_SITEMAP_URLS = 500
+SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".xml", ".css", ".js")
+
+LOC_RE = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+SLUG_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def extract_links(html: str, base_url: str) -> List[Tuple[str, str, str]]:
+    """Return (url, anchor_text, region) for same-site links; region is "nav" or "body"."""
+    soup = BeautifulSoup(html, "html.parser")
+    domain = domain_of(base_url)
+    nav_anchors = {id(a) for container in soup.find_all(NAV_CONTAINERS) for a in container.find_all("a")}
+
+    links, seen = [], set()
+    for a in soup.find_all("a", href=True):
+        href = a["href"].strip()
+        if not href or href.startswith(("#", "mailto:", "tel:", "javascript:")):
+            continue
+        url = urljoin(base_url, href).split("#")[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or domain_of(url) != domain:
+            continue
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS) or url in seen:
+            continue
+        seen.add(url)
+        region = "nav" if id(a) in nav_anchors else "body"
+        links.append((url, a.get_text(" ", strip=True), region))
+    return links
+
+
+def parse_robots_sitemaps(robots_txt: str) -> List[str]:
+    return [
+        line.split(":", 1)[1].strip()
+        for line in robots_txt.splitlines()
+        if line.lower().startswith("sitemap:")
+    ]
+
+
+def parse_sitemap(xml: str) -> List[str]:
+    """Return <loc> URLs from a sitemap or sitemap index (not followed recursively)."""
+    return LOC_RE.findall(xml)[:MAX_SITEMAP_URLS]
+
+
+def _slug_tokens(text: str) -> List[str]:
+    return [t for t in SLUG_SPLIT_RE.split(text.lower()) if t]
+
+
+def classify_link(url: str, anchor_text: str, target_pages: Dict[str, List[str]]):
+    """Return (page_type, score) for a link, or (None, 0) if it matches no page type."""
+    path = urlparse(url).path.rstrip("/").lower()
+    if path in HOME_PATHS:
+        return "home", 3
+
+    segments = [s for s in path.split("/") if s]
+    last = re.sub(r"\.(html?|php|aspx?)$", "", segments[-1]) if segments else ""
+    anchor = " ".join(_slug_tokens(anchor_text))
+    best_type, best_score = None, 0
+    for page_type, keywords in target_pages.items():
+        if page_type == "home":
+            continue
+        for keyword in keywords:
+            keyword = keyword.strip("/").lower()
+            words = " ".join(_slug_tokens(keyword))
+            if last == keyword:
+                score = 3  # exact slug match, e.g. /about-us
+            elif keyword in segments:
+                score = 2  # parent segment, e.g. /products/boxes
+            elif words and words == anchor:
+                score = 2  # anchor text "About Us" on an oddly named URL
+            elif words and (words in anchor or words in " ".join(_slug_tokens(last))):
+                score = 1
+            else:
+                continue
+            if score > best_score:
+                best_type, best_score = page_type, score
+    return best_type, best_score
+
+
+def select_pages(links, target_pages: Dict[str, List[str]]) -> Dict[str, str]:
+    """Pick the best URL per page type from (url, anchor_text, region) links."""
+    best = {}
+    for url, anchor_text, region in links:
+        page_type, score = classify_link(url, anchor_text, target_pages)
+        if not page_type:
+            continue
+        depth = len([s for s in urlparse(url).path.split("/") if s])
+        # Prefer nav links, then stronger matches, then shallower URLs
+        rank = (region == "nav", score, -depth)
+        if page_type not in best or rank > best[page_type][0]:
+            best[page_type] = (rank, url)
+    return {page_type: url for page_type, (_, url) in best.items()}
@@ -1,41 +1,455 @@
-import os
+import json
+import queue
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from utils.logger import logger
 
 DB_PATH = "data/memory_store.sqlite"
 
-# Ensure DB exists with required table
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS memory (
-        lead_id TEXT PRIMARY KEY,
-        messages TEXT,
-        turned_to_manual INTEGER DEFAULT 0,
-        turned_to_manual_at TEXT,
-        last_transaction_type TEXT
+# === Config ===
+POOL_SIZE = 8  # Connections shared by all threads; WAL lets readers run alongside the single writer
+BUSY_TIMEOUT_MS = 10000  # How long a writer waits for the write lock before "database is locked"
+CACHE_SIZE_KB = 16384  # Page cache per connection
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # WAL + NORMAL: no fsync per commit, still crash-safe
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KB}",
+    "PRAGMA temp_store = MEMORY",
+]
+PAGE_SIZE = 50  # Default page for get_messages() and query_leads()
+HISTORY_MESSAGES = 20  # 💬 Most recent messages loaded into reply-analysis prompts
+AWAITING_REPLY_DAYS = 3  # ⏳ Default age for awaiting_reply()
+# PRAGMA user_version: 1 = messages moved out of memory.messages into their own table,
+# 2 = memory timestamps stored as Unix seconds (REAL), status indexes and per-status counters
+SCHEMA_VERSION = 2
+MEMORY_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    lead_id TEXT PRIMARY KEY,
+    turned_to_manual INTEGER DEFAULT 0,
+    turned_to_manual_at REAL,
+    last_transaction_type TEXT,
+    last_transaction_at REAL
+)"""
+SCHEMA = MEMORY_TABLE.format(name="memory") + """;
+CREATE TABLE IF NOT EXISTS messages (
+    lead_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    sender TEXT,
+    content TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (lead_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS lead_status_counts (
+    last_transaction_type TEXT NOT NULL,
+    turned_to_manual INTEGER NOT NULL,
+    leads INTEGER NOT NULL,
+    PRIMARY KEY (last_transaction_type, turned_to_manual)
+) WITHOUT ROWID;
+"""
+# Created after migrations, which may rebuild the memory table. lead_id closes each index so
+# pages ordered by (last_transaction_at, lead_id) are read straight off the index.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_memory_type_at ON memory (last_transaction_type, last_transaction_at, lead_id);
+CREATE INDEX IF NOT EXISTS idx_memory_manual_at ON memory (turned_to_manual, last_transaction_at, lead_id);
+CREATE INDEX IF NOT EXISTS idx_memory_at ON memory (last_transaction_at, lead_id);
+CREATE TRIGGER IF NOT EXISTS memory_counts_insert AFTER INSERT ON memory BEGIN
+    INSERT INTO lead_status_counts VALUES (COALESCE(NEW.last_transaction_type, ''), COALESCE(NEW.turned_to_manual, 0), 1)
+    ON CONFLICT DO UPDATE SET leads = leads + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS memory_counts_delete AFTER DELETE ON memory BEGIN
+    UPDATE lead_status_counts SET leads = leads - 1
+    WHERE last_transaction_type = COALESCE(OLD.last_transaction_type, '') AND turned_to_manual = COALESCE(OLD.turned_to_manual, 0);
+END;
+CREATE TRIGGER IF NOT EXISTS memory_counts_update AFTER UPDATE OF last_transaction_type, turned_to_manual ON memory
+WHEN COALESCE(OLD.last_transaction_type, '') != COALESCE(NEW.last_transaction_type, '')
+  OR COALESCE(OLD.turned_to_manual, 0) != COALESCE(NEW.turned_to_manual, 0)
+BEGIN
+    UPDATE lead_status_counts SET leads = leads - 1
+    WHERE last_transaction_type = COALESCE(OLD.last_transaction_type, '') AND turned_to_manual = COALESCE(OLD.turned_to_manual, 0);
+    INSERT INTO lead_status_counts VALUES (COALESCE(NEW.last_transaction_type, ''), COALESCE(NEW.turned_to_manual, 0), 1)
+    ON CONFLICT DO UPDATE SET leads = leads + 1;
+END;
+"""
+
+Moment = Union[datetime, float, int, str, None]
+
+
+def _epoch(value: Moment) -> Optional[float]:
+    """Unix seconds for a datetime, number or ISO string; naive values are UTC (as utcnow() writes them)."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _when(seconds: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(seconds, timezone.utc) if seconds is not None else None
+
+
+def _state_row(lead_id: str, metadata: Optional[Dict]) -> Tuple:
+    metadata = metadata or {}
+    return (
+        lead_id,
+        int(metadata.get("turned_to_manual", 0)),
+        _epoch(metadata.get("turned_to_manual_at")),
+        metadata.get("last_transaction_type"),
+        _epoch(metadata.get("last_transaction_at")) or time.time(),
     )
+
+
+STATE_COLUMNS = "lead_id, turned_to_manual, turned_to_manual_at, last_transaction_type, last_transaction_at"
+
+
+def _lead_state(row: Tuple) -> Dict:
+    return {
+        "lead_id": row[0],
+        "turned_to_manual": bool(row[1]),
+        "turned_to_manual_at": _when(row[2]),
+        "last_transaction_type": row[3],
+        "last_transaction_at": _when(row[4]),
+    }
+
+
+def _message_row(lead_id: str, seq: int, message: Dict) -> Tuple:
+    return (lead_id, seq, message.get("sender") or message.get("role"), message.get("content"), message.get("timestamp"))
+
+
+def _message(row: Tuple) -> Dict:
+    return {"sender": row[0], "content": row[1], "timestamp": row[2]}
+
+
+def _migrate_messages(conn: sqlite3.Connection) -> None:
+    """v1: move JSON threads from the old memory.messages column into the messages table."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(memory)")]
+    if "messages" not in columns:
+        return
+    migrated = 0
+    for lead_id, raw in conn.execute("SELECT lead_id, messages FROM memory WHERE messages IS NOT NULL").fetchall():
+        thread = json.loads(raw) if raw else []
+        conn.executemany(
+            "INSERT OR IGNORE INTO messages (lead_id, seq, sender, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+            [_message_row(lead_id, seq, m) for seq, m in enumerate(thread, start=1)]
+        )
+        migrated += len(thread)
+    conn.execute("UPDATE memory SET messages = NULL")
+    logger.info(f"🗄️ Migrated {migrated} messages from memory.messages into the messages table")
+
+
+def _lenient_epoch(value: Moment) -> Optional[float]:
+    try:
+        return _epoch(value)
+    except ValueError:  # hand-written timestamps in old rows: keep the lead, drop the time
+        return None
+
+
+def _migrate_state(conn: sqlite3.Connection) -> None:
+    """v2: rebuild memory with REAL timestamps (last_transaction_at from the newest message) and fill the counters."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(memory)")]
+    if "last_transaction_at" not in columns:
+        conn.create_function("to_epoch", 1, _lenient_epoch)
+        conn.execute(MEMORY_TABLE.format(name="memory_v2"))
+        conn.execute(f"""
+        INSERT INTO memory_v2 ({STATE_COLUMNS})
+        SELECT lead_id, turned_to_manual, to_epoch(turned_to_manual_at), last_transaction_type,
+               (SELECT to_epoch(MAX(timestamp)) FROM messages WHERE messages.lead_id = memory.lead_id)
+        FROM memory
+        """)
+        conn.execute("DROP TABLE memory")
+        conn.execute("ALTER TABLE memory_v2 RENAME TO memory")
+        logger.info("🗄️ Migrated memory timestamps to Unix seconds")
+    conn.execute("DELETE FROM lead_status_counts")
+    conn.execute("""
+    INSERT INTO lead_status_counts
+    SELECT COALESCE(last_transaction_type, ''), COALESCE(turned_to_manual, 0), COUNT(*) FROM memory GROUP BY 1, 2
     """)
-    conn.commit()
-    conn.close()
 
-init_db()
 
+MIGRATIONS = {1: _migrate_messages, 2: _migrate_state}
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Bring an existing database up to SCHEMA_VERSION, one step per version, in a single transaction."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for step in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[step](conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class MemoryStore:
+    """Conversation memory in SQLite, served from a pool of persistent WAL-mode connections.
+
+    The schema is created on first use rather than at import. Every write runs
+    in a BEGIN IMMEDIATE transaction, so concurrent writers queue on the busy
+    timeout instead of failing on a read-to-write lock upgrade; wrap several
+    writes in `transaction()` to commit them together.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, pool_size: int = POOL_SIZE):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._local = threading.local()  # connection of the transaction this thread is inside, if any
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               timeout=BUSY_TIMEOUT_MS / 1000)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    _migrate(conn)
+                    conn.executescript(INDEXES)
+                    self._initialized = True
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection (the thread's open transaction, if there is one)."""
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            yield active
+            return
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+            conn = self._connect() if can_create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed store calls in one write transaction (one commit for the batch)."""
+        if getattr(self._local, "conn", None) is not None:  # nested: join the outer transaction
+            yield self._local.conn
+            return
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.conn = conn
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._local.conn = None
+
+    def close(self) -> None:
+        with self._lock:
+            while not self._pool.empty():
+                self._pool.get_nowait().close()
+            self._created = 0
 
-def get_conversation(lead_id: str) -> List[Dict]:
-    """Return conversation history for a lead_id."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT messages FROM memory WHERE lead_id = ?", (lead_id,))
-    row = cursor.fetchone()
-    conn.close()
+    # === Conversations ===
+    def get_conversation(self, lead_id: str, last_n: Optional[int] = None) -> List[Dict]:
+        """Return conversation history for a lead_id (only the last `last_n` messages if given)."""
+        with self.connection() as conn:
+            if last_n is None:
+                rows = conn.execute(
+                    "SELECT sender, content, timestamp FROM messages WHERE lead_id = ? ORDER BY seq", (lead_id,)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT sender, content, timestamp FROM messages WHERE lead_id = ? ORDER BY seq DESC LIMIT ?",
+                    (lead_id, last_n)
+                ).fetchall()[::-1]
+        return [_message(row) for row in rows]
 
-    if row and row[0]:
-        import json
-        return json.loads(row[0])
-    return []
+    def get_messages(self, lead_id: str, offset: int = 0, limit: int = PAGE_SIZE) -> List[Dict]:
+        """One page of a lead's thread, oldest first."""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT sender, content, timestamp FROM messages WHERE lead_id = ? ORDER BY seq LIMIT ? OFFSET ?",
+                (lead_id, limit, offset)
+            ).fetchall()
+        return [_message(row) for row in rows]
+
+    def message_count(self, lead_id: str) -> int:
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM messages WHERE lead_id = ?", (lead_id,)).fetchone()[0]
+
+    def _set_state(self, conn: sqlite3.Connection, lead_id: str, metadata: Optional[Dict]) -> None:
+        if metadata is None:
+            conn.execute("INSERT OR IGNORE INTO memory (lead_id) VALUES (?)", (lead_id,))
+            return
+        conn.execute(f"""
+        INSERT INTO memory ({STATE_COLUMNS})
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(lead_id) DO UPDATE SET
+            turned_to_manual = excluded.turned_to_manual,
+            turned_to_manual_at = excluded.turned_to_manual_at,
+            last_transaction_type = excluded.last_transaction_type,
+            last_transaction_at = excluded.last_transaction_at
+        """, _state_row(lead_id, metadata))
+
+    def append_messages(self, lead_id: str, messages: List[Dict], metadata: Optional[Dict] = None) -> None:
+        """Append new messages to a lead's thread and, if given, replace its status flags.
+
+        Costs the same however long the thread already is: only the new rows are written.
+        """
+        with self.transaction() as conn:
+            last_seq = conn.execute("SELECT MAX(seq) FROM messages WHERE lead_id = ?", (lead_id,)).fetchone()[0] or 0
+            conn.executemany(
+                "INSERT INTO messages (lead_id, seq, sender, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                [_message_row(lead_id, seq, m) for seq, m in enumerate(messages, start=last_seq + 1)]
+            )
+            self._set_state(conn, lead_id, metadata)
+
+    def update_conversation(self, lead_id: str, messages: List[Dict], metadata: Optional[Dict] = None) -> None:
+        """Update the memory for a lead: thread + status flags.
+
+        Replaces the whole stored thread; use append_messages() to add turns.
+        """
+        self.update_many([(lead_id, messages, metadata)])
+
+    def update_many(self, updates: Iterable[Tuple[str, List[Dict], Optional[Dict]]]) -> None:
+        """update_conversation() for many (lead_id, messages, metadata) in a single transaction."""
+        with self.transaction() as conn:
+            for lead_id, messages, metadata in updates:
+                conn.execute("DELETE FROM messages WHERE lead_id = ?", (lead_id,))
+                conn.executemany(
+                    "INSERT INTO messages (lead_id, seq, sender, content, timestamp) VALUES (?, ?, ?, ?, ?)",
+                    [_message_row(lead_id, seq, m) for seq, m in enumerate(messages, start=1)]
+                )
+                self._set_state(conn, lead_id, metadata or {})
+
+    def mark_as_manual(self, lead_id: str) -> None:
+        """Set turned_to_manual = True with current timestamp."""
+        with self.transaction() as conn:
+            conn.execute("""
+            UPDATE memory
+            SET turned_to_manual = 1,
+                turned_to_manual_at = ?
+            WHERE lead_id = ?
+            """, (time.time(), lead_id))
+
+    def get_manual_leads(self) -> List[str]:
+        """Return all lead_ids that were handed off to manual."""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT lead_id FROM memory WHERE turned_to_manual = 1")]
+
+    # === Lead state ===
+    def lead_state(self, lead_id: str) -> Optional[Dict]:
+        with self.connection() as conn:
+            row = conn.execute(f"SELECT {STATE_COLUMNS} FROM memory WHERE lead_id = ?", (lead_id,)).fetchone()
+        return _lead_state(row) if row else None
+
+    def query_leads(
+        self,
+        last_transaction_type: Optional[str] = None,
+        turned_to_manual: Optional[bool] = None,
+        before: Moment = None,
+        after: Moment = None,
+        limit: int = PAGE_SIZE,
+        offset: int = 0,
+        newest_first: bool = False
+    ) -> List[Dict]:
+        """One page of lead states matching the filters, ordered by last_transaction_at.
+
+        `before`/`after` bound last_transaction_at. Every filter combination is
+        served by an index that also provides the order, so a page costs the
+        same at 1M leads as at 100.
+        """
+        clauses, params = [], []
+        if last_transaction_type is not None:
+            clauses.append("last_transaction_type = ?")
+            params.append(last_transaction_type)
+        if turned_to_manual is not None:
+            clauses.append("turned_to_manual = ?")
+            params.append(int(turned_to_manual))
+        if before is not None:
+            clauses.append("last_transaction_at < ?")
+            params.append(_epoch(before))
+        if after is not None:
+            clauses.append("last_transaction_at >= ?")
+            params.append(_epoch(after))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if newest_first else "ASC"
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {STATE_COLUMNS} FROM memory {where} "
+                f"ORDER BY last_transaction_at {direction}, lead_id {direction} LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [_lead_state(row) for row in rows]
+
+    def awaiting_reply(self, older_than_days: float = AWAITING_REPLY_DAYS, limit: int = PAGE_SIZE,
+                       offset: int = 0) -> List[Dict]:
+        """Leads we emailed (and didn't hand off) with no reply for `older_than_days`, oldest first."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        return self.query_leads("sent_email", turned_to_manual=False, before=cutoff, limit=limit, offset=offset)
+
+    def status_counts(self) -> Dict:
+        """Lead counts by last_transaction_type and manual hand-off, read from trigger-maintained counters."""
+        with self.connection() as conn:
+            rows = conn.execute("SELECT last_transaction_type, turned_to_manual, leads FROM lead_status_counts").fetchall()
+        counts = {"total": 0, "manual": 0, "by_type": {}}
+        for transaction_type, manual, leads in rows:
+            counts["total"] += leads
+            counts["manual"] += leads if manual else 0
+            key = transaction_type or None
+            counts["by_type"][key] = counts["by_type"].get(key, 0) + leads
+        return counts
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> MemoryStore:
+    """Process-wide store behind the module-level functions (created on first use)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MemoryStore(DB_PATH)
+    return _store
+
+
+def init_db():
+    """Create the memory table now instead of on first use."""
+    with get_store().connection():
+        pass
+
+
+def get_conversation(lead_id: str, last_n: Optional[int] = None) -> List[Dict]:
+    """Return conversation history for a lead_id (only the last `last_n` messages if given)."""
+    return get_store().get_conversation(lead_id, last_n)
+
+
+def append_messages(lead_id: str, messages: List[Dict], metadata: Optional[Dict] = None) -> None:
+    """Append new messages to a lead's thread and, if given, replace its status flags."""
+    get_store().append_messages(lead_id, messages, metadata)
 
 
 def update_conversation(
@@ -44,56 +458,29 @@ def update_conversation(
     metadata: Optional[Dict] = None
 ) -> None:
     """Update the memory for a lead: thread + status flags."""
-    metadata = metadata or {}
-    turned_to_manual = int(metadata.get("turned_to_manual", 0))
-    turned_to_manual_at = metadata.get("turned_to_manual_at")
-    last_transaction_type = metadata.get("last_transaction_type")
-
-    import json
-    serialized = json.dumps(messages)
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    INSERT INTO memory (lead_id, messages, turned_to_manual, turned_to_manual_at, last_transaction_type)
-    VALUES (?, ?, ?, ?, ?)
-    ON CONFLICT(lead_id) DO UPDATE SET
-        messages = excluded.messages,
-        turned_to_manual = excluded.turned_to_manual,
-        turned_to_manual_at = excluded.turned_to_manual_at,
-        last_transaction_type = excluded.last_transaction_type
-    """, (
-        lead_id,
-        serialized,
-        turned_to_manual,
-        turned_to_manual_at,
-        last_transaction_type
-    ))
-
-    conn.commit()
-    conn.close()
+    get_store().update_conversation(lead_id, messages, metadata)
 
 
 def mark_as_manual(lead_id: str) -> None:
     """Set turned_to_manual = True with current timestamp."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-    UPDATE memory
-    SET turned_to_manual = 1,
-        turned_to_manual_at = ?
-    WHERE lead_id = ?
-    """, (datetime.utcnow().isoformat(), lead_id))
-    conn.commit()
-    conn.close()
+    get_store().mark_as_manual(lead_id)
 
 
 def get_manual_leads() -> List[str]:
     """Return all lead_ids that were handed off to manual."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT lead_id FROM memory WHERE turned_to_manual = 1")
-    result = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return result
+    return get_store().get_manual_leads()
+
+
+def query_leads(**filters) -> List[Dict]:
+    """One page of lead states; see MemoryStore.query_leads() for the filters."""
+    return get_store().query_leads(**filters)
+
+
+def awaiting_reply(older_than_days: float = AWAITING_REPLY_DAYS, limit: int = PAGE_SIZE, offset: int = 0) -> List[Dict]:
+    """Leads emailed more than `older_than_days` ago that haven't replied or been handed off."""
+    return get_store().awaiting_reply(older_than_days, limit, offset)
+
+
+def status_counts() -> Dict:
+    """Lead counts for the dashboard: total, manual and by last_transaction_type."""
+    return get_store().status_counts()
@@ -0,0 +1,153 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from agent.crawl_cache import DB_PATH, PRAGMAS
+
+DEAD_PATH_TTL = 30 * 24 * 3600  # Re-probe dead paths after this many seconds
+MIN_CONTENT_LENGTH = 100
+
+# Outcomes that mark a path as dead for a domain
+DEAD_OUTCOMES = ("not_found", "timeout", "thin")
+
+
+def domain_of(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def classify_outcome(status, text: str, min_length: int = MIN_CONTENT_LENGTH) -> str:
+    """Map a fetch result to hit / not_found / timeout / thin / error."""
+    if status == "timeout":
+        return "timeout"
+    if status in (404, 410):
+        return "not_found"
+    if status == 200:
+        return "hit" if text and len(text) > min_length else "thin"
+    return "error"
+
+
+class PathMemory:
+    """Per-domain memory of dead and known-good crawl paths plus global path hit rates."""
+
+    def __init__(self, db_path: str = DB_PATH, dead_ttl: float = DEAD_PATH_TTL):
+        self.dead_ttl = dead_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in PRAGMAS:  # same file as the crawl cache, same WAL settings
+            self._conn.execute(pragma)
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS dead_paths (
+            domain TEXT,
+            path TEXT,
+            reason TEXT,
+            recorded_at REAL,
+            PRIMARY KEY (domain, path)
+        );
+        CREATE TABLE IF NOT EXISTS good_paths (
+            domain TEXT,
+            page_type TEXT,
+            path TEXT,
+            recorded_at REAL,
+            PRIMARY KEY (domain, page_type)
+        );
+        CREATE TABLE IF NOT EXISTS path_stats (
+            page_type TEXT,
+            path TEXT,
+            attempts INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,
+            PRIMARY KEY (page_type, path)
+        );
+        CREATE TABLE IF NOT EXISTS path_metrics (
+            name TEXT PRIMARY KEY,
+            value INTEGER DEFAULT 0
+        );
+        """)
+        self.stats = {"probes": 0, "dead_skipped": 0, "known_good_hits": 0, "requests_saved": 0}
+
+    def known_good(self, domain: str, page_type: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path FROM good_paths WHERE domain = ? AND page_type = ?", (domain, page_type)
+            ).fetchone()
+        return row[0] if row else None
+
+    def dead_paths(self, domain: str) -> set:
+        cutoff = time.time() - self.dead_ttl
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM dead_paths WHERE domain = ? AND recorded_at > ?", (domain, cutoff)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def hit_rates(self, page_type: str) -> Dict[str, float]:
+        """Smoothed global hit rate per path; unseen paths sit at the 0.5 prior."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, attempts, hits FROM path_stats WHERE page_type = ?", (page_type,)
+            ).fetchall()
+        return {path: (hits + 1) / (attempts + 2) for path, attempts, hits in rows}
+
+    def candidates(self, domain: str, page_type: str, paths: List[str]) -> List[str]:
+        """Order `paths` for a domain: known-good first, dead paths dropped, rest by hit rate."""
+        dead = self.dead_paths(domain)
+        rates = self.hit_rates(page_type)
+        alive = [p for p in paths if p not in dead]
+        self.stats["dead_skipped"] += len(paths) - len(alive)
+
+        ordered = sorted(alive, key=lambda p: -rates.get(p, 0.5))  # stable, keeps TARGET_PAGES order on ties
+        good = self.known_good(domain, page_type)
+        if good and good not in dead:
+            # May be a discovered path that isn't in the guess list at all
+            ordered = [good] + [p for p in ordered if p != good]
+        return ordered
+
+    def record(self, domain: str, page_type: str, path: str, outcome: str) -> None:
+        self.stats["probes"] += 1
+        now = time.time()
+        hit = outcome == "hit"
+        with self._lock:
+            self._conn.execute("""
+            INSERT INTO path_stats (page_type, path, attempts, hits) VALUES (?, ?, 1, ?)
+            ON CONFLICT(page_type, path) DO UPDATE SET
+                attempts = attempts + 1,
+                hits = hits + excluded.hits
+            """, (page_type, path, int(hit)))
+            if hit:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO good_paths (domain, page_type, path, recorded_at) VALUES (?, ?, ?, ?)",
+                    (domain, page_type, path, now)
+                )
+                self._conn.execute("DELETE FROM dead_paths WHERE domain = ? AND path = ?", (domain, path))
+            elif outcome in DEAD_OUTCOMES:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO dead_paths (domain, path, reason, recorded_at) VALUES (?, ?, ?, ?)",
+                    (domain, path, outcome, now)
+                )
+                self._conn.execute(
+                    "DELETE FROM good_paths WHERE domain = ? AND page_type = ? AND path = ?",
+                    (domain, page_type, path)
+                )
+            self._conn.commit()
+
+    def record_savings(self, baseline: int, actual: int, known_good_hit: bool = False) -> None:
+        """Track requests avoided versus probing the unordered TARGET_PAGES list."""
+        saved = max(baseline - actual, 0)
+        self.stats["requests_saved"] += saved
+        self.stats["known_good_hits"] += int(known_good_hit)
+        with self._lock:
+            for name, value in (("requests_saved", saved), ("known_good_hits", int(known_good_hit))):
+                self._conn.execute("""
+                INSERT INTO path_metrics (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+                """, (name, value))
+            self._conn.commit()
+
+    def totals(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, value FROM path_metrics").fetchall())
+
+    def close(self) -> None:
+        self._conn.close()
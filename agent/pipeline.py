@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional
+
+from agent import email_writer, product_matcher
+from agent.artifact_store import get_artifact_store
+from agent.catalog_index import catalog_hash
+from agent.catalog_loader import ingest_catalog
+from agent.crawl_cache import CACHE_TTL
+from agent.lead_loader import ingest_leads
+from agent.lead_store import get_lead_store
+from integrations import reply_analyzer
+from integrations.email_sender import send_all_emails
+from integrations.reply_simulator import run_simulator
+from utils.logger import logger
+
+# === Config ===
+DB_PATH = "data/pipeline_state.sqlite"
+CATALOG_SOURCE = "data/product_info.xlsx"  # .xlsx, .csv or .parquet
+LEADS_SOURCE = "data/leads_info.xlsx"
+STAGES = ["catalog", "leads", "crawl", "match", "email", "send", "simulate", "analyze"]  # Dependency order
+DEFAULT_STAGES = ["catalog", "leads", "crawl", "match", "email", "analyze"]  # 📤 send/simulate only run when asked for
+FILE_KEY = "*"  # Ledger key for the whole-file loader stages
+RECRAWL_INTERVAL = CACHE_TTL  # 🔄 Seconds before an unchanged website is crawled again (revalidated, so mostly 304s)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_runs (
+    lead_key TEXT,
+    stage TEXT,
+    fingerprint TEXT,
+    updated_at REAL,
+    PRIMARY KEY (stage, lead_key)
+) WITHOUT ROWID;
+"""
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of any JSON-serialisable inputs."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def file_hash(path: str) -> Optional[str]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class StageLedger:
+    """Input fingerprint each stage last completed with, per lead.
+
+    A lead is rerun by a stage only when the fingerprint of its current inputs
+    differs from the recorded one, so unchanged leads cost a dict lookup.
+    """
+
+    def __init__(self, db_path: str = DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self.stats = {"stale": 0, "current": 0, "recorded": 0}
+
+    def fingerprints(self, stage: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lead_key, fingerprint FROM stage_runs WHERE stage = ?", (stage,)
+            ).fetchall()
+        return dict(rows)
+
+    def record(self, stage: str, fingerprints: Dict[str, str]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("""
+            INSERT OR REPLACE INTO stage_runs (lead_key, stage, fingerprint, updated_at)
+            VALUES (?, ?, ?, ?)
+            """, [(key, stage, digest, now) for key, digest in fingerprints.items()])
+        self.stats["recorded"] += len(fingerprints)
+
+    def reset(self, stages: Optional[Iterable[str]] = None) -> None:
+        """Forget recorded runs (of `stages`, or all) so the next run redoes them."""
+        with self._lock, self._conn:
+            if stages is None:
+                self._conn.execute("DELETE FROM stage_runs")
+            else:
+                self._conn.executemany("DELETE FROM stage_runs WHERE stage = ?", [(s,) for s in stages])
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# === Stage inputs ===
+def prompt_version(stage: str) -> str:
+    """Hash of the prompt template and settings that shape a stage's output."""
+    return product_matcher.prompt_version() if stage == "match" else email_writer.prompt_version()
+
+
+def stage_context(stage: str) -> Dict:
+    """Inputs shared by every lead in a stage, hashed once per run.
+
+    Upstream artifacts are represented by the digests the artifact store keeps
+    in its index ({lead_key: sha256}), read in one query per stage.
+    """
+    artifacts = get_artifact_store()
+    if stage == "match":
+        return {"catalog": catalog_hash(get_lead_store().products()), "prompt": prompt_version("match"),
+                "sites": artifacts.digests(product_matcher.WEBSITE_CONTENT)}
+    if stage == "email":
+        return {"company_info": file_hash(email_writer.COMPANY_INFO_FILE), "prompt": prompt_version("email"),
+                "sites": artifacts.digests(email_writer.WEBSITE_CONTENT),
+                "matches": artifacts.digests(email_writer.MATCH_RESULTS)}
+    if stage in ("send", "simulate"):
+        return {"emails": artifacts.digests(email_writer.STAGE)}
+    return {}
+
+
+def lead_inputs(stage: str, key: str, lead: Dict, context: Dict) -> Optional[str]:
+    """Fingerprint of what `stage` reads for this lead; None if its upstream output isn't there yet."""
+    if stage == "crawl":
+        # The interval bucket expires the fingerprint, so sites get revalidated and changed content re-matched
+        bucket = int(time.time() // RECRAWL_INTERVAL)
+        return fingerprint(lead.get("website"), bucket) if lead.get("website") else None
+    if stage == "match":
+        return fingerprint(lead, context["sites"].get(key), context["catalog"], context["prompt"])
+    if stage == "email":
+        matches = context["matches"].get(key)
+        if matches is None:
+            return None
+        return fingerprint(lead, matches, context["sites"].get(key), context["company_info"], context["prompt"])
+    if stage == "send":
+        # Keyed on the address only: a rewritten email is never re-sent to someone already contacted
+        ready = lead.get("contact_email") and key in context["emails"]
+        return fingerprint(lead["contact_email"]) if ready else None
+    if stage == "simulate":
+        return context["emails"].get(key)
+    raise ValueError(f"Unknown lead stage: {stage}")
+
+
+def _crawl(keys):
+    from agent.web_crawler import crawl_leads  # crawler dependencies are only needed when crawling
+    return crawl_leads(lead_keys=keys)
+
+
+LEAD_STAGES = {
+    "crawl": _crawl,
+    "match": lambda keys: product_matcher.match_products_to_leads(lead_keys=keys),
+    "email": lambda keys: email_writer.main(lead_keys=keys),
+    "send": lambda keys: send_all_emails(lead_keys=keys),
+    "simulate": lambda keys: run_simulator(lead_keys=keys),
+}
+
+
+def load_parsed_leads() -> Iterator[Dict]:
+    return get_lead_store().iter_leads()
+
+
+def stale_leads(stage: str, ledger: StageLedger, force: bool = False, limit: Optional[int] = None) -> Dict[str, str]:
+    """{lead_key: fingerprint} for leads whose inputs to `stage` changed since it last completed."""
+    context = stage_context(stage)
+    recorded = {} if force else ledger.fingerprints(stage)
+    stale = {}
+    for lead in load_parsed_leads():
+        key = lead["lead_key"]
+        inputs = lead_inputs(stage, key, lead, context)
+        if inputs is None:
+            continue
+        if recorded.get(key) == inputs:
+            ledger.stats["current"] += 1
+            continue
+        stale[key] = inputs
+        if limit is not None and len(stale) >= limit:
+            break
+    ledger.stats["stale"] += len(stale)
+    return stale
+
+
+# === Runner ===
+def run_file_stage(stage: str, ledger: StageLedger, force: bool = False) -> int:
+    """Re-parse the catalog or leads spreadsheet if it changed; returns 1 if it was parsed."""
+    source = CATALOG_SOURCE if stage == "catalog" else LEADS_SOURCE
+    digest = file_hash(source)
+    if digest is None:
+        logger.info(f"⏩ {stage}: {source} not found, keeping the parsed file.")
+        return 0
+    if not force and ledger.fingerprints(stage).get(FILE_KEY) == digest:
+        logger.info(f"⏩ {stage}: {source} unchanged.")
+        return 0
+
+    if stage == "catalog":
+        ingest_catalog(source)
+    else:
+        ingest_leads(source)
+    ledger.record(stage, {FILE_KEY: digest})
+    return 1
+
+
+def run_lead_stage(stage: str, ledger: StageLedger, force: bool = False, limit: Optional[int] = None) -> int:
+    """Run `stage` for the leads whose inputs changed; returns how many completed."""
+    stale = stale_leads(stage, ledger, force, limit)
+    if not stale:
+        logger.info(f"⏩ {stage}: every lead is up to date.")
+        return 0
+    logger.info(f"▶️ {stage}: {len(stale)} leads with new or changed inputs.")
+    done = LEAD_STAGES[stage](set(stale)) or []
+    ledger.record(stage, {key: stale[key] for key in done if key in stale})
+    if len(done) < len(stale):
+        logger.warning(f"⚠️ {stage}: {len(stale) - len(done)} leads not completed; they are retried on the next run.")
+    return len(done)
+
+
+def run_pipeline(stages: Optional[Iterable[str]] = None, force: bool = False, limit: Optional[int] = None,
+                 ledger: Optional[StageLedger] = None) -> Dict[str, int]:
+    """Run `stages` (default DEFAULT_STAGES) in dependency order, each only for leads whose inputs changed.
+
+    `force` ignores recorded fingerprints; `limit` caps the leads a stage processes per run.
+    Returns {stage: leads processed}.
+    """
+    selected = set(stages or DEFAULT_STAGES)
+    unknown = selected - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {sorted(unknown)} (choose from {STAGES})")
+
+    own_ledger = ledger is None
+    ledger = ledger or StageLedger()
+    report = {}
+    try:
+        for stage in [s for s in STAGES if s in selected]:
+            if stage in ("catalog", "leads"):
+                report[stage] = run_file_stage(stage, ledger, force)
+            elif stage == "analyze":
+                # The analyzer already skips replies whose analysis is newer than the email and reply
+                report[stage] = reply_analyzer.run_analysis() or 0
+            else:
+                report[stage] = run_lead_stage(stage, ledger, force, limit)
+    finally:
+        logger.info(f"🧮 Pipeline: {report} — ledger {ledger.stats}")
+        if own_ledger:
+            ledger.close()
+    return report
@@ -1,9 +1,18 @@
 import os
 import json
+import asyncio
 import openai
 import re
+import time
 from tqdm import tqdm
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from agent.artifact_store import get_artifact_store
+from agent.catalog_index import CatalogIndex, catalog_hash
+from agent.crawl_cache import CrawlCache, content_hash, site_content_hash
+from agent.lead_store import get_lead_store, lead_key_for
+from agent.lead_profile import PROFILE_VERSION, get_profile, profile_text
+from agent.product_scorer import ProductScorer
+from utils import llm_batch, llm_client
+from utils.llm_scheduler import RateLimitedScheduler
 from utils.logger import logger
 from dotenv import load_dotenv
 
@@ -11,24 +20,38 @@ from dotenv import load_dotenv
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-CATALOG_PARSED = "data/catalog_parsed.json"
-LEADS_PARSED = "data/leads_parsed.json"
-WEBSITE_CONTENT_DIR = "data/website_content"
-OUTPUT_DIR = "data/match_results"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+WEBSITE_CONTENT = "website_content"  # Artifact store stages read and written here
+STAGE = "match_results"
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 LIMIT = 20  # For testing
+SKIP_UNCHANGED = True  # ⏩ Skip leads whose website content hash hasn't moved since their last match
+CONCURRENT = True  # 🚀 Match leads concurrently through the rate-limited scheduler
+USE_BATCH_API = False  # 🌙 Overnight runs: submit every prompt as one OpenAI Batch API job (half price, up to 24h)
+CHECKPOINT_FILE = "data/match_checkpoint.jsonl"  # Leads finished by an interrupted run
+CHECKPOINT_TTL = 24 * 3600  # Seconds a checkpoint entry is trusted; a run that never finished can't hide a lead for longer
+MATCH_MODEL = "gpt-4o"
+USE_RETRIEVAL = True  # 🎯 Send each lead's top RETRIEVAL_TOP_K products instead of the first 50 of the catalog
+RETRIEVAL_TOP_K = 20
+CANDIDATE_RANKER = "embedding"  # How candidates are retrieved: "embedding" (catalog_index) or "keywords" (BM25 product_scorer)
+MATCH_MODE = "gpt"  # 🧠 "gpt" or "local" (zero-cost keyword/industry scoring, no API calls)
+LOCAL_TOP_N = 3  # Products kept per lead in local mode
 
 def combine_lead_text(lead, website_data):
-    base = f"{lead.get('company_name', '')}. Notes: {lead.get('notes', '')}."
-    if website_data:
+    company = lead.get('company_name', '')
+    base = f"{company}. Notes: {lead.get('notes', '')}."
+    profile = get_profile(lead_key_for(company), website_data, company) if website_data else None
+    if profile:
+        base += " " + profile_text(profile).replace("\n", ". ")
+    elif website_data:
         site_content = " ".join(website_data.values())[:1000]  # truncate
         base += f" Website Summary: {site_content}"
     return base.strip()
 
 
 def format_product_catalog(products, limit=50):
+    if limit and len(products) > limit:
+        logger.warning(f"⚠️ Catalog has {len(products)} products; only the first {limit} are sent to GPT.")
     lines = []
     for idx, p in enumerate(products[:limit], 1):
         desc = f"{p['brand']} {p['product_name']} — {p['description'][:100]}".strip()
@@ -36,8 +59,30 @@ def format_product_catalog(products, limit=50):
     return "\n".join(lines)
 
 
-def ask_gpt4o(lead_text, product_list_text):
-    prompt = f"""
+def scoring_text(lead_text, website_data):
+    """Lead text plus the full crawled site (combine_lead_text truncates it for the prompt)."""
+    if not website_data:
+        return lead_text
+    return lead_text + " " + " ".join(website_data.values())
+
+
+def candidate_catalog_texts(products, jobs):
+    """Catalog text for each job: its top-K retrieved products, or the first 50 without retrieval."""
+    if not USE_RETRIEVAL or len(products) <= RETRIEVAL_TOP_K:
+        return [format_product_catalog(products)] * len(jobs)
+    if CANDIDATE_RANKER == "keywords":
+        ranked = ProductScorer(products).score_many([scoring_text(job[2], job[3]) for job in jobs], RETRIEVAL_TOP_K)
+    else:
+        ranked = CatalogIndex.load_or_build(products).search_many([job[2] for job in jobs], RETRIEVAL_TOP_K)
+    # A lead without a single catalog term gets the plain catalog rather than an empty list
+    return [
+        format_product_catalog([products[i] for i, _ in hits], limit=None) if hits else format_product_catalog(products)
+        for hits in ranked
+    ]
+
+
+def build_match_prompt(lead_text, product_list_text):
+    return f"""
 You are a product-fit analyst for B2B sales. Your goal is to identify the top 3 most relevant products from the list below for the company based on their website content.
 
 Company Description:
@@ -62,13 +107,16 @@ Return your response in this JSON format:
   }},
 ]
 """
+
+
+def ask_gpt4o(lead_text, product_list_text):
+    prompt = build_match_prompt(lead_text, product_list_text)
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
+        return llm_client.chat(
+            model=MATCH_MODEL,
             messages=[{"role": "user", "content": prompt}],
             temperature=0
-        )
-        return response.choices[0].message.content.strip()
+        ).strip()
     except Exception as e:
         print("❌ GPT-4o error:", e)
         return ""
@@ -125,57 +173,240 @@ def extract_json_from_raw(raw_output: str):
         print(f"❌ Error extracting JSON: {e}")
         return []
 
-def match_products_to_leads():
-    with open(CATALOG_PARSED, "r", encoding="utf-8") as f:
-        products = json.load(f)
-    with open(LEADS_PARSED, "r", encoding="utf-8") as f:
-        leads = json.load(f)
+# === Skipping unchanged leads ===
+def prompt_version():
+    """Hash of the prompt template and settings that shape a match result."""
+    settings = [build_match_prompt("", ""), MATCH_MODE, MATCH_MODEL, LOCAL_TOP_N, USE_RETRIEVAL, RETRIEVAL_TOP_K,
+                CANDIDATE_RANKER, PROFILE_VERSION]
+    return content_hash(json.dumps(settings, sort_keys=True, ensure_ascii=False, default=str))
+
+
+def open_stage_cache():
+    """CrawlCache whose match records also cover the catalog and prompt_version(); None with SKIP_UNCHANGED off."""
+    if not SKIP_UNCHANGED:
+        return None
+    inputs = content_hash(catalog_hash(get_lead_store().products()) + prompt_version())
+    return CrawlCache(stage_inputs={"match": inputs, "match_local": inputs})
+
+
+# === Checkpointing: leads already done by a run that didn't finish ===
+def website_hash(website_data):
+    return site_content_hash(website_data) if website_data else None
+
 
-    product_list_text = format_product_catalog(products)
+def load_checkpoint():
+    """{lead: site content hash it was matched against} for entries younger than CHECKPOINT_TTL."""
+    if not os.path.exists(CHECKPOINT_FILE):
+        return {}
+    cutoff = time.time() - CHECKPOINT_TTL
+    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    return {e["lead"]: e.get("site") for e in entries if e.get("at", 0) > cutoff}
 
-    for lead in tqdm(leads[:LIMIT], desc="Matching companies"):
+
+def append_checkpoint(safe_name, website_data):
+    with open(CHECKPOINT_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"lead": safe_name, "site": website_hash(website_data), "at": time.time()}) + "\n")
+
+
+def clear_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        os.remove(CHECKPOINT_FILE)
+
+
+def load_match_jobs(cache=None, stage="match", lead_keys=None):
+    """Return (company, safe_name, lead_text, website_data) for leads that need matching.
+
+    Given `lead_keys` (from the pipeline runner, which tracks its own fingerprints),
+    exactly those leads are returned, without LIMIT, checkpoint or cache skips.
+    """
+    store = get_lead_store()
+    leads = store.iter_leads_by_key(lead_keys) if lead_keys is not None else store.iter_leads(LIMIT)
+    done = load_checkpoint() if lead_keys is None and stage == "match" else {}
+    if done:
+        print(f"⏯️ Resuming interrupted run: {len(done)} leads already matched.")
+
+    artifacts = get_artifact_store()
+    jobs = []
+    for lead in leads:
         company = lead["company_name"]
-        safe_name = company.lower().replace(" ", "_").replace("/", "_")
-        website_path = os.path.join(WEBSITE_CONTENT_DIR, f"{safe_name}.json")
+        safe_name = lead["lead_key"]
+
+        website_data = artifacts.get(WEBSITE_CONTENT, safe_name)
+        # With a cache, stage_is_current below decides; otherwise the checkpoint only holds while the
+        # lead's content is still what the interrupted run matched against
+        if not cache and safe_name in done and done[safe_name] == website_hash(website_data):
+            continue
+        if lead_keys is None and cache and artifacts.has(STAGE, safe_name) and cache.stage_is_current(safe_name, stage):
+            print(f"⏩ Skipping {company}, website, catalog and prompt unchanged since last match.")
+            continue
 
-        website_data = None
-        if os.path.exists(website_path):
-            with open(website_path, "r", encoding="utf-8") as f:
-                website_data = json.load(f)
+        jobs.append((company, safe_name, combine_lead_text(lead, website_data), website_data))
+    return jobs
 
-        lead_text = combine_lead_text(lead, website_data)
 
-        results = {
-            "company_name": company,
-            "missing_website_data": website_data is None,
-            "matches": {
-                "gpt4o": []
+def save_match_result(company, safe_name, website_data, gpt_output, cache=None):
+    results = {
+        "company_name": company,
+        "missing_website_data": website_data is None,
+        "matches": {
+            "gpt4o": []
+        }
+    }
+
+    # Always store raw
+    results["raw_gpt4o_output"] = gpt_output
+    # Try to extract structured matches
+    try:
+        json_block = extract_json_from_raw(gpt_output)
+        if json_block:
+            results["matches"]["gpt4o"] = json_block
+        else:
+            raise ValueError("No JSON block found.")
+    except Exception as e:
+        print("❌ Error parsing GPT output:", e)
+        print("⚠️ RAW GPT OUTPUT:", repr(gpt_output))
+        results["matches"]["gpt4o"] = []
+        results["raw_gpt4o_output"] = gpt_output
+
+    artifacts = get_artifact_store()
+    local_matches = artifacts.get(STAGE, safe_name, {}).get("matches", {}).get("local")
+    if local_matches is not None:  # keep local matches from an offline run
+        results["matches"]["local"] = local_matches
+    artifacts.put(STAGE, safe_name, results)
+    if gpt_output:  # failed calls stay pending for the next run and the resumed one
+        if cache:
+            cache.mark_stage_done(safe_name, "match")
+        append_checkpoint(safe_name, website_data)
+
+    print(f"✅ Saved results for {company} → {STAGE}/{safe_name}")
+    return bool(gpt_output)
+
+
+def save_local_match_result(company, safe_name, website_data, local_matches, cache=None):
+    """Write local matches next to any existing GPT matches for the lead."""
+    artifacts = get_artifact_store()
+    results = artifacts.get(STAGE, safe_name, {"company_name": company, "matches": {}})
+    results["missing_website_data"] = website_data is None
+    results.setdefault("matches", {})["local"] = local_matches
+
+    artifacts.put(STAGE, safe_name, results)
+    if cache:
+        cache.mark_stage_done(safe_name, "match_local")
+    print(f"✅ Saved local matches for {company} → {STAGE}/{safe_name}")
+
+
+def match_products_locally(lead_keys=None):
+    """Zero-cost offline matcher: rank products by keyword/industry BM25 over the crawled text."""
+    products = get_lead_store().products()
+
+    cache = open_stage_cache()
+    jobs = load_match_jobs(cache, stage="match_local", lead_keys=lead_keys)
+    texts = [scoring_text(lead_text, website_data) for _, _, lead_text, website_data in jobs]
+    scorer = ProductScorer(products)
+
+    for (company, safe_name, _, website_data), text, hits in zip(jobs, texts, scorer.score_many(texts, LOCAL_TOP_N)):
+        local_matches = [
+            {
+                "brand": products[i]["brand"],
+                "product_name": products[i]["product_name"],
+                "score": round(score, 3),
+                "reason": "Matches " + ", ".join(scorer.matched_terms(text, i)),
             }
-        }    
+            for i, score in hits
+        ]
+        save_local_match_result(company, safe_name, website_data, local_matches, cache)
+    return [safe_name for _, safe_name, _, _ in jobs]
+
+
+def match_products_to_leads(lead_keys=None):
+    """Match every pending lead (or just `lead_keys`); returns the lead keys matched successfully."""
+    if MATCH_MODE == "local":
+        return match_products_locally(lead_keys)
+    if USE_BATCH_API:
+        return match_products_to_leads_batch(lead_keys=lead_keys)
+    if CONCURRENT:
+        return asyncio.run(match_products_to_leads_async(lead_keys=lead_keys))
 
+    products = get_lead_store().products()
+
+    cache = open_stage_cache()
+    jobs = load_match_jobs(cache, lead_keys=lead_keys)
+    catalog_texts = candidate_catalog_texts(products, jobs)
+
+    matched = []
+    for (company, safe_name, lead_text, website_data), product_list_text in tqdm(
+            zip(jobs, catalog_texts), total=len(jobs), desc="Matching companies"):
         # GPT-4o
         gpt_output = ask_gpt4o(lead_text, product_list_text)
+        if save_match_result(company, safe_name, website_data, gpt_output, cache):
+            matched.append(safe_name)
 
-        # Always store raw
-        results["raw_gpt4o_output"] = gpt_output
-        # Try to extract structured matches
+    llm_client.log_cache_stats()
+    clear_checkpoint()  # the run finished: saved leads are in match_results, failed ones were never checkpointed
+    return matched
+
+
+async def match_products_to_leads_async(client=None, scheduler=None, lead_keys=None):
+    """Concurrent matcher; `client` is any AsyncOpenAI-compatible client (e.g. pointed at a fake server)."""
+    client = client or openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0)
+    scheduler = scheduler or RateLimitedScheduler()
+
+    products = get_lead_store().products()
+
+    cache = open_stage_cache()
+    jobs = load_match_jobs(cache, lead_keys=lead_keys)
+    catalog_texts = candidate_catalog_texts(products, jobs)
+    progress = tqdm(total=len(jobs), desc="Matching companies")
+
+    async def match_one(company, safe_name, lead_text, website_data, product_list_text):
         try:
-            json_block = extract_json_from_raw(gpt_output)
-            if json_block:
-                results["matches"]["gpt4o"] = json_block
-            else:
-                raise ValueError("No JSON block found.")
+            gpt_output = (await llm_client.achat(
+                client,
+                scheduler,
+                model=MATCH_MODEL,
+                messages=[{"role": "user", "content": build_match_prompt(lead_text, product_list_text)}],
+                temperature=0
+            )).strip()
         except Exception as e:
-            print("❌ Error parsing GPT output:", e)
-            print("⚠️ RAW GPT OUTPUT:", repr(gpt_output))
-            results["matches"]["gpt4o"] = []
-            results["raw_gpt4o_output"] = gpt_output
+            print("❌ GPT-4o error:", e)
+            gpt_output = ""
+        progress.update(1)
+        return save_match_result(company, safe_name, website_data, gpt_output, cache)
+
+    results = await asyncio.gather(*[match_one(*job, text) for job, text in zip(jobs, catalog_texts)])
+    progress.close()
+    logger.info(f"📊 Scheduler: {scheduler.stats}")
+    llm_client.log_cache_stats()
+    clear_checkpoint()  # the run finished: saved leads are in match_results, failed ones were never checkpointed
+    return [safe_name for (_, safe_name, _, _), ok in zip(jobs, results) if ok]
+
+
+def match_products_to_leads_batch(client=None, poll_interval=llm_batch.POLL_INTERVAL, lead_keys=None):
+    """Batch API matcher; results land in the same match_results files as the interactive paths."""
+    products = get_lead_store().products()
+
+    cache = open_stage_cache()
+    jobs = load_match_jobs(cache, lead_keys=lead_keys)
+    catalog_texts = candidate_catalog_texts(products, jobs)
+    requests = {
+        safe_name: {
+            "model": MATCH_MODEL,
+            "messages": [{"role": "user", "content": build_match_prompt(lead_text, product_list_text)}],
+            "temperature": 0,
+        }
+        for (_, safe_name, lead_text, _), product_list_text in zip(jobs, catalog_texts)
+    }
+    outputs = llm_batch.run_batch(requests, "match", client=client, poll_interval=poll_interval)
 
-        output_path = os.path.join(OUTPUT_DIR, f"{safe_name}.json")
-        with open(output_path, "w", encoding="utf-8") as f_out:
-            json.dump(results, f_out, indent=2)
+    matched = [
+        safe_name for company, safe_name, _, website_data in jobs
+        if save_match_result(company, safe_name, website_data, (outputs.get(safe_name) or "").strip(), cache)
+    ]
+    llm_client.log_cache_stats()
+    clear_checkpoint()  # the run finished: saved leads are in match_results, failed ones were never checkpointed
+    return matched
 
-        print(f"✅ Saved results for {company} → {output_path}")
 
 if __name__ == "__main__":
     match_products_to_leads()
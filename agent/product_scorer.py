@@ -0,0 +1,156 @@
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from agent.catalog_index import tokenize
+
+# === Config ===
+# How much a term counts depending on which catalog field it came from
+FIELD_WEIGHTS = {
+    "keywords": 3.0,
+    "target_product_types": 2.0,
+    "target_industries": 2.0,
+    "product_name": 1.5,
+    "description": 1.0,
+}
+K1 = 1.2   # BM25 term-frequency saturation
+B = 0.75   # BM25 length normalization
+CHUNK_LEADS = 512  # Leads scored per vectorized batch (bounds the leads x products score matrix)
+DENSE_MIN_DF = 32  # Terms in at least this many products are scored with a matrix multiply instead of postings
+MAX_DENSE_TERMS = 2048  # Caps the dense term x product block (2048 x 5k products ~ 40MB float32)
+
+
+def _terms(text: str) -> List[str]:
+    """Unigrams plus bigrams, so "coffee_box" or "baked goods" match as phrases."""
+    tokens = tokenize(text)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def _field_phrases(product: Dict, field: str) -> List[str]:
+    # List entries are separate phrases, so bigrams never run across them
+    value = product.get(field) or ""
+    phrases = value if isinstance(value, list) else [value]
+    return [p for p in phrases if p and p != "nan"]
+
+
+def _product_terms(product: Dict) -> Counter:
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for phrase in _field_phrases(product, field):
+            for term in _terms(phrase):
+                counts[term] += weight
+    return counts
+
+
+class ProductScorer:
+    """BM25 over catalog keyword/industry/product-type terms, served from an inverted index.
+
+    Products are the documents and a lead's crawled text is the query. Postings
+    are stored CSR-style (term -> products with precomputed BM25 weights), so
+    scoring a batch of leads is one gather + bincount instead of a Python loop.
+    Common terms would expand into huge posting gathers, so those are kept as a
+    dense term x product block and scored with a single matrix multiply.
+    """
+
+    def __init__(self, products: List[Dict], k1: float = K1, b: float = B):
+        self.products = products
+        docs = [_product_terms(p) for p in products]
+        self.vocab = {}
+        for doc in docs:
+            for term in doc:
+                self.vocab.setdefault(term, len(self.vocab))
+        self.terms = list(self.vocab)
+
+        n_docs = len(docs)
+        lengths = np.array([sum(doc.values()) for doc in docs], dtype=np.float32)
+        avg_length = lengths.mean() if n_docs else 1.0
+        doc_freq = Counter(term for doc in docs for term in doc)
+
+        postings = [[] for _ in self.vocab]
+        for pid, doc in enumerate(docs):
+            norm = k1 * (1 - b + b * lengths[pid] / avg_length)
+            for term, tf in doc.items():
+                df = doc_freq[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                postings[self.vocab[term]].append((pid, idf * tf * (k1 + 1) / (tf + norm)))
+
+        self.indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(p) for p in postings])
+        self.post_products = np.array([pid for p in postings for pid, _ in p], dtype=np.int64)
+        self.post_weights = np.array([w for p in postings for _, w in p], dtype=np.float32)
+
+        df = np.diff(self.indptr)
+        hot = np.argsort(-df, kind="stable")[:MAX_DENSE_TERMS]
+        hot = hot[df[hot] >= DENSE_MIN_DF]
+        self.dense_row = np.full(len(self.vocab), -1, dtype=np.int64)
+        self.dense_row[hot] = np.arange(len(hot))
+        self.dense = np.zeros((len(hot), n_docs), dtype=np.float32)
+        for row, term_id in enumerate(hot):
+            s, e = self.indptr[term_id], self.indptr[term_id + 1]
+            self.dense[row, self.post_products[s:e]] = self.post_weights[s:e]
+
+    def _query(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Vocabulary term ids in a lead text and their (log-damped) counts."""
+        counts = Counter(term for term in _terms(text) if term in self.vocab)
+        ids = np.fromiter((self.vocab[t] for t in counts), dtype=np.int64, count=len(counts))
+        weights = np.fromiter((1 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        return ids, weights
+
+    def score_matrix(self, texts: List[str]) -> np.ndarray:
+        """Dense (len(texts), n_products) BM25 scores; use score_many for large batches."""
+        n_products = len(self.products)
+        queries = [self._query(text) for text in texts]
+        rows = np.repeat(np.arange(len(queries)), [len(ids) for ids, _ in queries])
+        if not len(rows):
+            return np.zeros((len(texts), n_products), dtype=np.float32)
+        term_ids = np.concatenate([ids for ids, _ in queries])
+        query_weights = np.concatenate([w for _, w in queries])
+
+        # Common terms: (leads x dense terms) @ (dense terms x products)
+        dense_rows = self.dense_row[term_ids]
+        is_dense = dense_rows >= 0
+        query_dense = np.zeros((len(texts), len(self.dense)), dtype=np.float32)
+        query_dense[rows[is_dense], dense_rows[is_dense]] = query_weights[is_dense]
+        scores = query_dense @ self.dense
+
+        # Rare terms: expand every (lead, term) pair into that term's postings
+        rows, term_ids, query_weights = rows[~is_dense], term_ids[~is_dense], query_weights[~is_dense]
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = np.arange(lengths.sum()) + offsets
+        lead_rows = np.repeat(rows, lengths)
+        weights = self.post_weights[positions] * np.repeat(query_weights, lengths)
+
+        sparse = np.bincount(lead_rows * n_products + self.post_products[positions], weights=weights,
+                             minlength=len(texts) * n_products)
+        scores += sparse.reshape(len(texts), n_products).astype(np.float32)
+        return scores
+
+    def score_many(self, texts: List[str], k: int = 10, chunk: int = CHUNK_LEADS) -> List[List[Tuple[int, float]]]:
+        """Top-k (product_index, score) per lead text, best first; zero-score products are dropped."""
+        results = []
+        k = min(k, len(self.products))
+        for start in range(0, len(texts), chunk):
+            scores = self.score_matrix(texts[start:start + chunk])
+            if not k:
+                results.extend([] for _ in range(len(scores)))
+                continue
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, ids in enumerate(top):
+                ids = ids[np.argsort(-scores[row, ids], kind="stable")]
+                results.append([(int(i), float(scores[row, i])) for i in ids if scores[row, i] > 0])
+        return results
+
+    def matched_terms(self, text: str, product_index: int, limit: int = 5) -> List[str]:
+        """Catalog terms a lead text shares with a product, strongest first (for match reasons)."""
+        ids, _ = self._query(text)
+        start, end = self.indptr[ids], self.indptr[ids + 1]
+        hits = []
+        for term_id, s, e in zip(ids, start, end):
+            where = np.nonzero(self.post_products[s:e] == product_index)[0]
+            if len(where):
+                hits.append((float(self.post_weights[s + where[0]]), self.terms[term_id]))
+        return [term for _, term in sorted(hits, reverse=True)[:limit]]
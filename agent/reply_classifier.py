@@ -0,0 +1,96 @@
+import re
+from typing import Dict, Optional, Tuple
+
+# === Config ===
+PRECLASSIFY = True  # ⚡ Resolve obvious replies (bounce, out-of-office, unsubscribe, hard decline) without GPT
+MIN_CONFIDENCE = 0.8  # Below this the reply goes to GPT
+
+# Intents that end the thread, so the local verdict is the whole analysis. "interested" is
+# recognised too, but still goes to GPT because it needs a drafted next_reply.
+TERMINAL_INTENTS = {
+    "bounce": "bounce",
+    "out_of_office": "out of office",
+    "unsubscribe": "unsubscribe",
+    "decline": "not interested",
+}
+
+# (weight, pattern) per intent; a weight of 3+ is decisive on its own, 2 is strong, 1 is a hint
+RULES = {
+    "bounce": [
+        (3, r"\b(delivery status notification|undeliverable|mail delivery (failed|subsystem)|mailer-daemon)\b"),
+        (3, r"\b(address not found|user unknown|mailbox (unavailable|not found|full)|recipient rejected)\b"),
+        (3, r"\b(could not be delivered|wasn't delivered|550[ -]5\.1\.1)\b"),
+    ],
+    "out_of_office": [
+        (3, r"\b(out of (the )?office|automatic reply|auto-?reply|autoreply)\b"),
+        (2, r"\b(on (annual |parental |maternity |paternity |sick )?leave|away from (the )?office|on vacation|on holiday)\b"),
+        (2, r"\b(limited access to (my )?e-?mail|(returning|back in the office|back) on \w+)\b"),
+    ],
+    "unsubscribe": [
+        (3, r"\b(unsubscribe|opt(-| )?out|remove me|take me off|stop (e-?mailing|contacting|sending))\b"),
+        (3, r"\b(do not|don't|please don't) (contact|e-?mail) (me|us)\b"),
+        (2, r"\bno (further|more) (e-?mails|contact|messages)\b"),
+    ],
+    "decline": [
+        (3, r"\b(not|aren't|are not|isn't|no longer) interested\b"),
+        (2, r"\bnot (currently )?looking (to|for) (partner|new|change|switch|add)"),
+        (2, r"\b(satisfied|happy|content) with our (current|existing)\b"),
+        (2, r"\b(no|don't have( any)?) plans to (make any )?chang"),
+        (2, r"\b(do not|don't) (need|require) (any|your|additional)\b"),
+        (1, r"\b(not a (good )?fit|pass on this|decline|at this time|procurement (schedule|cycle) .{0,30}(set|closed))\b"),
+    ],
+    "interested": [
+        (2, r"(?<!not )\b(interested in|piqued our interest|sounds promising|would love to)\b"),
+        (2, r"\b(could|can|would) you (please )?(send|provide|share|tell)\b"),
+        (1, r"\b(pricing|price list|quote|samples?|lead times?|minimum order|moq|schedule a call|catalog)\b"),
+        (1, r"\?"),
+    ],
+}
+COMPILED = {intent: [(w, re.compile(p, re.IGNORECASE)) for w, p in rules] for intent, rules in RULES.items()}
+
+# Where the lead's own text ends and the quoted thread begins
+QUOTE_RE = re.compile(r"^(>|On .{0,200}wrote:|-{2,} ?Original Message|From: .+@)", re.IGNORECASE | re.MULTILINE)
+
+stats = {"local": 0, "llm": 0}
+
+
+def latest_text(reply: str) -> str:
+    """The lead's newest text, without the quoted thread under it (which repeats our own pitch)."""
+    match = QUOTE_RE.search(reply or "")
+    return (reply[:match.start()] if match else reply or "").strip()
+
+
+def classify(reply: str) -> Tuple[Optional[str], float]:
+    """(intent, confidence) from the weighted rules; (None, 0.0) when nothing matches.
+
+    Confidence grows with the winning intent's score and shrinks with evidence for
+    the others, so a decline that also asks for pricing stays below MIN_CONFIDENCE.
+    """
+    text = latest_text(reply)
+    scores = {intent: sum(w for w, pattern in rules if pattern.search(text)) for intent, rules in COMPILED.items()}
+    intent = max(scores, key=scores.get)
+    top = scores[intent]
+    if not top:
+        return None, 0.0
+    rest = sum(scores.values()) - top
+    return intent, (1 - 0.5 ** top) * top / (top + rest)
+
+
+def local_analysis(reply: str) -> Optional[Dict]:
+    """Reply analysis in the GPT schema (intent, should_continue, next_reply) for obvious terminal replies.
+
+    Returns None when the reply needs GPT: ambiguous, interested, or PRECLASSIFY is off.
+    """
+    if PRECLASSIFY:
+        intent, confidence = classify(reply)
+        if intent in TERMINAL_INTENTS and confidence >= MIN_CONFIDENCE:
+            stats["local"] += 1
+            return {
+                "intent": TERMINAL_INTENTS[intent],
+                "should_continue": False,
+                "next_reply": None,
+                "classified_by": "local",
+                "confidence": round(confidence, 3),
+            }
+    stats["llm"] += 1
+    return None
@@ -1,7 +1,10 @@
 import openai
 import datetime
 import os
-from agent.memory_manager import get_conversation, update_conversation, mark_as_manual
+from agent.lead_profile import get_profile, profile_text
+from agent.reply_classifier import local_analysis
+from agent.memory_manager import HISTORY_MESSAGES, append_messages, get_conversation, mark_as_manual
+from utils import reply_schema
 from utils.logger import logger
 from utils.prompts import REPLY_ANALYSIS_PROMPT
 from dotenv import load_dotenv
@@ -10,66 +13,60 @@ from dotenv import load_dotenv
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-def gpt_analyze_reply(conversation_history: list, latest_reply: str) -> dict:
+def gpt_analyze_reply(conversation_history: list, latest_reply: str, lead_id: str = None) -> dict:
     """Analyze the reply and return intent and recommended next action."""
+    local = local_analysis(latest_reply)
+    if local:
+        return local
     formatted_history = "\n\n".join(
         [f"{msg['sender']}: {msg['content']}" for msg in conversation_history]
     )
     prompt = REPLY_ANALYSIS_PROMPT.format(
-        email_history=formatted_history
+        email_history=formatted_history,
+        lead_profile=profile_text(get_profile(lead_id) if lead_id else None)
     )
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            max_tokens=400
-        )
-        import json
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        logger.error(f"GPT-4o analysis failed: {e}")
-        return {
-            "continue": False,
-            "suggested_reply": None
-        }
+    return reply_schema.analyze_reply([{"role": "user", "content": prompt}])
 
 
 def handle_incoming_reply(lead_id: str, incoming_text: str):
+    """Return the follow-up to send, "" if the thread went manual, or None if the analysis
+    failed and the reply was left unrecorded for the next run to retry."""
     logger.info(f"📨 New reply received for lead: {lead_id}")
 
     # Load existing conversation
-    conversation = get_conversation(lead_id)
-    conversation.append({
+    conversation = get_conversation(lead_id, last_n=HISTORY_MESSAGES)
+    incoming = {
         "sender": "lead",
         "content": incoming_text,
         "timestamp": str(datetime.datetime.utcnow())
-    })
+    }
+    conversation.append(incoming)
 
     # Analyze intent using GPT
-    result = gpt_analyze_reply(conversation, incoming_text)
+    result = gpt_analyze_reply(conversation, incoming_text, lead_id)
+    if result.get("intent") == reply_schema.ANALYSIS_ERROR["intent"]:  # not recorded, so retried next run
+        logger.warning(f"⚠️ Could not analyze reply from {lead_id}, leaving it for the next run.")
+        return None
 
-    if not result["continue"]:
+    if not result["should_continue"]:
         logger.info(f"🛑 Thread for {lead_id} marked for manual handling.")
         mark_as_manual(lead_id)
-        update_conversation(lead_id, conversation, {
+        append_messages(lead_id, [incoming], {
             "last_transaction_type": "received_email",
             "turned_to_manual": True,
             "turned_to_manual_at": str(datetime.datetime.utcnow())
         })
-        return
+        return ""
 
     # Continue with GPT-generated reply
-    followup = result["suggested_reply"]
+    followup = result["next_reply"]
     logger.info(f"🤖 GPT suggests follow-up for {lead_id}: {followup}")
 
-    conversation.append({
+    append_messages(lead_id, [incoming, {
         "sender": "agent",
         "content": followup,
         "timestamp": str(datetime.datetime.utcnow())
-    })
-
-    update_conversation(lead_id, conversation, {
+    }], {
         "last_transaction_type": "sent_email"
     })
 
@@ -1,25 +1,19 @@
-import os
 import datetime
+from agent.artifact_store import get_artifact_store
 from agent.reply_handler import handle_incoming_reply
 
-EMAILS_DIR = "data/emails"
-
 
 # === Step 1: Load initial emails from email_writer output ===
 def load_initial_emails():
     initial_data = {}
-    for fname in os.listdir(EMAILS_DIR):
-        if fname.endswith(".txt"):
-            lead_id = fname.replace(".txt", "")
-            with open(os.path.join(EMAILS_DIR, fname), "r", encoding="utf-8") as f:
-                initial_content = f.read()
-                initial_data[lead_id] = [
-                    {
-                        "sender": "agent",
-                        "content": initial_content,
-                        "timestamp": str(datetime.datetime.utcnow())
-                    }
-                ]
+    for lead_id, initial_content in get_artifact_store().items("emails"):
+        initial_data[lead_id] = [
+            {
+                "sender": "agent",
+                "content": initial_content,
+                "timestamp": str(datetime.datetime.utcnow())
+            }
+        ]
     return initial_data
 
 initial_conversations = load_initial_emails()
@@ -41,5 +35,7 @@ for lead_id, replies in mock_replies.items():
         followup = handle_incoming_reply(lead_id, reply)
         if followup:
             print(f"🤖 GPT Suggested Follow-up:\n{followup}")
+        elif followup is None:
+            print(f"⏳ Could not analyze reply from {lead_id}, left for the next run.")
         else:
             print(f"🛑 Conversation with {lead_id} marked as manual.")
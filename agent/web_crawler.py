@@ -1,18 +1,24 @@
-import os
-import json
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+from agent.artifact_store import get_artifact_store
+from agent.crawl_cache import CrawlCache
+from agent.lead_store import get_lead_store, lead_key_for
+from agent.html_extract import dedupe_site_text, extract_text
+from agent.link_discovery import extract_links, parse_robots_sitemaps, parse_sitemap, select_pages
+from agent.path_memory import PathMemory, classify_outcome, domain_of
 from utils.logger import logger
 
 
 # Configuration
-LEADS_FILE = "data/leads_parsed.json"
-OUTPUT_DIR = "data/website_content"
+STAGE = "website_content"  # Artifact store stage the crawled content is saved under
 LIMIT = 10  # Max number of leads to crawl
-
-# Make sure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+USE_ASYNC = True  # 🔄 Set to False to crawl sequentially with requests
+USE_CACHE = True  # 🗄️ Revalidate pages via data/crawl_cache.sqlite instead of skipping crawled leads
+USE_PATH_MEMORY = True  # 🧭 Skip paths that were dead last time and try known-good paths first
+CRAWL_STRATEGY = "discover"  # "discover" follows homepage nav/sitemap links, "guess" probes TARGET_PAGES
+MAX_SITEMAPS = 2  # Sitemaps fetched per site when nav links don't cover every page type
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024  # Stop reading a response body past this size
+MIN_CONTENT_LENGTH = 100  # Pages with less text than this don't count as a hit
 
 # Target subpages
 TARGET_PAGES = {
@@ -32,63 +38,240 @@ TARGET_PAGES = {
 }
 
 
-def fetch_text_from_url(url):
+HTML_TYPES = ("text/html",)
+SITEMAP_TYPES = ("xml", "text/plain")
+
+
+def fetch_page(url, cache=None, content_types=HTML_TYPES):
+    """Return (status, body), served from `cache` when fresh or confirmed unchanged (304).
+
+    status is the HTTP status code, or "timeout" / "error" when the request failed.
+    Bodies whose Content-Type matches none of `content_types` come back empty.
+    """
+    entry = cache.get(url) if cache else None
+    if entry and cache.is_fresh(entry):
+        cache.stats["fresh"] += 1
+        return 200, entry["body"]
     try:
-        resp = requests.get(url, timeout=8)
-        if resp.status_code == 200 and "text/html" in resp.headers.get("Content-Type", ""):
-            soup = BeautifulSoup(resp.text, "html.parser")
-            return soup.get_text(separator=" ", strip=True)
+        with requests.get(url, timeout=8, stream=True,
+                          headers=cache.conditional_headers(entry) if cache else None) as resp:
+            content_type = resp.headers.get("Content-Type", "")
+            wanted = resp.status_code == 200 and any(t in content_type for t in content_types)
+            body = read_capped(resp) if wanted else ""
+    except requests.exceptions.Timeout:
+        print(f"⌛ Timed out fetching {url}")
+        return "timeout", ""
     except Exception as e:
         print(f"❌ Failed to fetch {url}: {e}")
-    return ""
+        return "error", ""
+
+    if resp.status_code == 304 and entry:
+        cache.touch(url)
+        return 200, entry["body"]
+    if wanted:
+        if cache:
+            cache.store(url, resp.headers, body)
+        return 200, body
+    return resp.status_code, ""
+
+
+def read_capped(resp, limit=MAX_DOWNLOAD_BYTES):
+    """Stream a response body, stopping once `limit` bytes have been read."""
+    chunks, size = [], 0
+    for chunk in resp.iter_content(chunk_size=64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    # requests assumes ISO-8859-1 for text/* without a charset; HTML in the wild is mostly UTF-8
+    charset_given = "charset" in resp.headers.get("Content-Type", "").lower()
+    encoding = resp.encoding if charset_given and resp.encoding else "utf-8"
+    return b"".join(chunks)[:limit].decode(encoding, errors="replace")
+
+
+def fetch_html(url, cache=None):
+    return fetch_page(url, cache)[1]
+
+
+def html_to_text(html):
+    return extract_text(html)
+
 
+def fetch_text_from_url(url, cache=None):
+    html = fetch_html(url, cache)
+    return html_to_text(html) if html else ""
 
-def crawl_website(base_url):
+
+def crawl_website(base_url, cache=None, memory=None, page_types=None):
     result = {}
-    for page_type, paths in TARGET_PAGES.items():
-        for path in paths:
+    domain = domain_of(base_url)
+    for page_type in page_types or TARGET_PAGES:
+        paths = TARGET_PAGES[page_type]
+        # Known-good path first, dead paths skipped, the rest ordered by global hit rate
+        ordered = memory.candidates(domain, page_type, paths) if memory else paths
+        known_good = memory.known_good(domain, page_type) if memory else None
+        probes = 0
+        for path in ordered:
             full_url = urljoin(base_url, path)
             print(f"🔍 Trying {full_url}")
-            content = fetch_text_from_url(full_url)
-            if content and len(content) > 100:
+            status, html = fetch_page(full_url, cache)
+            content = html_to_text(html) if html else ""
+            probes += 1
+            if memory:
+                memory.record(domain, page_type, path, classify_outcome(status, content, MIN_CONTENT_LENGTH))
+            if content and len(content) > MIN_CONTENT_LENGTH:
                 result[page_type] = content
                 break  # stop once we get a valid page for that type
+
+        if memory:
+            found = page_type in result
+            baseline = paths.index(path) + 1 if found and path in paths else len(paths)
+            memory.record_savings(baseline, probes, known_good_hit=found and path == known_good)
     return result
 
 
-def crawl_leads(limit=LIMIT):
-    with open(LEADS_FILE, "r", encoding="utf-8") as f:
-        leads = json.load(f)
+def fetch_sitemap_links(base_url, cache=None):
+    """Collect same-site URLs from the sitemaps listed in robots.txt (or /sitemap.xml)."""
+    _, robots = fetch_page(urljoin(base_url, "/robots.txt"), cache, SITEMAP_TYPES)
+    sitemaps = [urljoin(base_url, url) for url in parse_robots_sitemaps(robots)] or [urljoin(base_url, "/sitemap.xml")]
+    links = []
+    for sitemap_url in sitemaps[:MAX_SITEMAPS]:
+        _, xml = fetch_page(sitemap_url, cache, SITEMAP_TYPES)
+        links += [(url, "", "sitemap") for url in parse_sitemap(xml) if domain_of(url) == domain_of(base_url)]
+    return links
+
+
+def discover_website(base_url, cache=None, memory=None):
+    """Fetch the homepage once, follow its nav/footer (or sitemap) links, and guess only what's missing."""
+    domain = domain_of(base_url)
+    if memory and all(memory.known_good(domain, page_type) for page_type in TARGET_PAGES):
+        return crawl_website(base_url, cache, memory)  # every page type has a known-good path
+
+    result = {}
+    home_url = urljoin(base_url, "/")
+    print(f"🔍 Discovering links on {home_url}")
+    status, home_html = fetch_page(home_url, cache)
+    home_text = html_to_text(home_html) if home_html else ""
+    if memory:
+        memory.record(domain, "home", "/", classify_outcome(status, home_text, MIN_CONTENT_LENGTH))
+    if len(home_text) > MIN_CONTENT_LENGTH:
+        result["home"] = home_text
+
+    links = extract_links(home_html, base_url) if home_html else []
+    pages = select_pages(links, TARGET_PAGES)
+    if any(page_type not in pages for page_type in TARGET_PAGES if page_type != "home"):
+        pages = select_pages(links + fetch_sitemap_links(base_url, cache), TARGET_PAGES)
+
+    for page_type, url in pages.items():
+        if page_type in result:
+            continue
+        print(f"🔗 Following {url} ({page_type})")
+        status, html = fetch_page(url, cache)
+        content = html_to_text(html) if html else ""
+        if memory:
+            memory.record(domain, page_type, urlparse(url).path or "/",
+                          classify_outcome(status, content, MIN_CONTENT_LENGTH))
+        if len(content) > MIN_CONTENT_LENGTH:
+            result[page_type] = content
+
+    missing = [page_type for page_type in TARGET_PAGES if page_type not in result]
+    if missing:
+        result.update(crawl_website(base_url, cache, memory, page_types=missing))
+    return result
 
-    for i, lead in enumerate(leads[:limit]):
-        company = lead.get("company_name", f"company_{i}")
+
+def crawl_site(base_url, cache=None, memory=None):
+    if CRAWL_STRATEGY == "discover":
+        return discover_website(base_url, cache, memory)
+    return crawl_website(base_url, cache, memory)
+
+
+# === Lead helpers (shared with agent/async_crawler.py) ===
+def normalize_url(website):
+    cleaned_url = website.strip()
+    if not cleaned_url.startswith("http"):
+        cleaned_url = "https://" + cleaned_url
+    return cleaned_url
+
+
+def load_crawl_targets(limit=LIMIT, cache=None, lead_keys=None):
+    """Return (company, url) for leads to crawl.
+
+    Without a cache, leads that already have saved content are skipped; with one,
+    every lead is revisited since unchanged pages cost at most a 304. Given
+    `lead_keys` (from the pipeline runner), exactly those leads are crawled.
+    """
+    store = get_lead_store()
+    leads = store.iter_leads_by_key(lead_keys) if lead_keys is not None else store.iter_leads(limit)
+    artifacts = get_artifact_store()
+    targets = []
+    for lead in leads:
+        company = lead["company_name"]
         website = lead.get("website")
 
         if not website:
             continue
-        
-        print(f"\n🌐 Crawling: {company} ({website})")
-        safe_name = company.lower().replace(" ", "_").replace("/", "_")
-        output_path = os.path.join(OUTPUT_DIR, f"{safe_name}.json")
-        
-        if os.path.exists(output_path):
-                print(f"⏩ Skipping {company}, already crawled.")
-                continue
-        
-        cleaned_url = website.strip()
-        if not cleaned_url.startswith("http"):
-            cleaned_url = "https://" + cleaned_url
-
-        site_content = crawl_website(cleaned_url)
-
-        if site_content:
-            safe_name = company.lower().replace(" ", "_").replace("/", "_")
-            output_path = os.path.join(OUTPUT_DIR, f"{safe_name}.json")
-            with open(output_path, "w", encoding="utf-8") as f_out:
-                json.dump(site_content, f_out, indent=2)
-            print(f"✅ Saved content for {company} to {output_path}")
-        else:
-            print(f"⚠️ No content extracted for {company}")
+
+        if lead_keys is None and cache is None and artifacts.has(STAGE, lead["lead_key"]):
+            print(f"⏩ Skipping {company}, already crawled.")
+            continue
+
+        targets.append((company, normalize_url(website)))
+    return targets
+
+
+def save_site_content(company, site_content, cache=None):
+    """Write the lead's crawled content; returns False if nothing was extracted."""
+    site_content = dedupe_site_text(site_content)
+    if not site_content:
+        print(f"⚠️ No content extracted for {company}")
+        return False
+
+    lead_key = lead_key_for(company)
+    artifacts = get_artifact_store()
+    changed = cache.record_site_content(lead_key, site_content) if cache else True
+    if not changed and artifacts.has(STAGE, lead_key):
+        print(f"⏩ Content unchanged for {company}")
+        return True
+
+    artifacts.put(STAGE, lead_key, site_content)
+    print(f"✅ Saved content for {company} ({STAGE}/{lead_key})")
+    return True
+
+
+def open_crawl_cache():
+    return CrawlCache() if USE_CACHE else None
+
+
+def open_path_memory():
+    return PathMemory() if USE_PATH_MEMORY else None
+
+
+def log_crawl_stores(cache, memory):
+    if cache:
+        logger.info(f"🗄️ Crawl cache: {cache.stats}")
+        cache.close()
+    if memory:
+        logger.info(f"🧭 Path memory: {memory.stats} (all-time: {memory.totals()})")
+        memory.close()
+
+
+def crawl_leads(limit=LIMIT, lead_keys=None):
+    """Crawl the leads' websites; returns the lead keys whose content was saved."""
+    if USE_ASYNC:
+        from agent.async_crawler import run_async_crawl
+        return run_async_crawl(limit, lead_keys)
+
+    cache = open_crawl_cache()
+    memory = open_path_memory()
+    crawled = []
+    for company, url in load_crawl_targets(limit, cache, lead_keys):
+        print(f"\n🌐 Crawling: {company} ({url})")
+        site_content = crawl_site(url, cache, memory)
+        if save_site_content(company, site_content, cache):
+            crawled.append(lead_key_for(company))
+    log_crawl_stores(cache, memory)
+    return crawled
 
 
 if __name__ == "__main__":
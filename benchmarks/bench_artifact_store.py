@@ -0,0 +1,111 @@
+"""Per-lead artifact access benchmark for agent/artifact_store.py.
+
+For each --sizes lead count, writes one email per lead the old way (a flat
+data/emails-style directory) and into an ArtifactStore per backend in a
+temporary directory, then times what the pipeline and UI do with them:
+
+- write: saving every email
+- load all: every email by lead (old: os.listdir + open each, as load_sent_emails() did)
+- first LIMIT: the first --limit emails in key order (old: sorted listdir, as load_match_results() did)
+- random pick: "Show Random Results" (old: glob + random.choice + open)
+- exists: is there an email for this lead (old: os.path.exists)
+
+Usage: python benchmarks/bench_artifact_store.py [--sizes 10000,100000] [--limit 20]
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.artifact_store import BACKENDS, ArtifactStore
+
+STAGE = "emails"
+
+
+def make_email(i):
+    return f"Hello Lead {i},\n\nOur compostable trays could be a fit for your bakery.\n\nBest regards,\nSam"
+
+
+def timed(fn, rounds=1):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return result, (time.perf_counter() - start) / rounds
+
+
+def flat_readers(folder, limit, keys):
+    def write():
+        os.makedirs(folder)
+        for i, key in enumerate(keys):
+            with open(os.path.join(folder, f"{key}.txt"), "w", encoding="utf-8") as f:
+                f.write(make_email(i))
+
+    def load_all():
+        emails = {}
+        for fname in os.listdir(folder):
+            with open(os.path.join(folder, fname), "r", encoding="utf-8") as f:
+                emails[fname[:-4]] = f.read()
+        return emails
+
+    def first_page():
+        emails = []
+        for fname in sorted(os.listdir(folder))[:limit]:
+            with open(os.path.join(folder, fname), "r", encoding="utf-8") as f:
+                emails.append(f.read())
+        return emails
+
+    def random_pick():
+        with open(random.choice(glob.glob(os.path.join(folder, "*.txt"))), "r", encoding="utf-8") as f:
+            return f.read()
+
+    return write, load_all, first_page, random_pick, lambda key: os.path.exists(os.path.join(folder, f"{key}.txt"))
+
+
+def store_readers(store, limit, keys):
+    def write():
+        for i, key in enumerate(keys):
+            store.put(STAGE, key, make_email(i))
+
+    return (write, lambda: dict(store.items(STAGE)), lambda: [v for _, v in store.items(STAGE, limit=limit)],
+            lambda: store.get(STAGE, store.random_key(STAGE)), lambda key: store.has(STAGE, key))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'leads':>8} {'layout':<8} {'write':>9} {'load all':>9} {'first LIMIT':>12} {'random pick':>12} {'exists':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        keys = [f"lead_{i}_bakery" for i in range(size)]
+        probes = random.Random(0).sample(keys, min(1000, size))
+        with tempfile.TemporaryDirectory() as tmp:
+            layouts = [("flat", flat_readers(os.path.join(tmp, "flat"), args.limit, keys), None)]
+            for backend in BACKENDS:
+                root = os.path.join(tmp, backend)
+                os.makedirs(root)
+                store = ArtifactStore(os.path.join(root, "artifacts.sqlite"), root, backend)
+                layouts.append((backend, store_readers(store, args.limit, keys), store))
+
+            for name, (write, load_all, first_page, random_pick, exists), store in layouts:
+                _, write_time = timed(write)
+                loaded, load_time = timed(load_all)
+                assert len(loaded) == size, name
+                _, page_time = timed(first_page, rounds=5)
+                _, pick_time = timed(random_pick, rounds=5)
+                start = time.perf_counter()
+                assert all(exists(key) for key in probes), name
+                exists_time = (time.perf_counter() - start) / len(probes)
+                print(f"{size:>8} {name:<8} {write_time:>8.2f}s {load_time:>8.2f}s {page_time * 1000:>10.1f}ms "
+                      f"{pick_time * 1000:>10.1f}ms {exists_time * 1e6:>7.1f}µs")
+                if store:
+                    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Time-to-first-visible-text benchmark for streamed email generation.
+
+Generates emails for synthetic prompts against the local fake OpenAI server,
+once with the blocking generate_email() and once with stream_email(), and
+reports when the reviewer first sees text, when the first email is complete
+and the total time. The fake server streams one word every --token-delay seconds.
+
+Usage: python benchmarks/bench_email_stream.py [--leads 5] [--latency 0.3] [--token-delay 0.05]
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openai
+
+from agent import email_writer
+from benchmarks.fake_openai_server import EMAIL_REPLY, FakeOpenAIServer
+from utils import llm_client
+
+
+def run(mode, prompts):
+    start = time.perf_counter()
+    first_text = first_email = None
+    streamed = 0
+
+    def on_token(text):
+        nonlocal first_text, streamed
+        streamed += 1
+        if first_text is None:
+            first_text = time.perf_counter() - start
+
+    emails = []
+    for prompt in prompts:
+        if mode == "stream":
+            emails.append(email_writer.stream_email(prompt, on_token))
+        else:
+            emails.append(email_writer.generate_email(prompt))
+        if first_email is None:
+            first_email = time.perf_counter() - start
+    first_text = first_text if first_text is not None else first_email
+    correct = sum(email == EMAIL_REPLY for email in emails)
+    return first_text, first_email, time.perf_counter() - start, streamed, correct
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the server starts answering")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="Seconds between streamed words")
+    args = parser.parse_args()
+
+    llm_client.CACHE_ENABLED = False  # measure the API, not the cache
+    prompts = [f"Write a sales email for Lead {i}." for i in range(args.leads)]
+    with FakeOpenAIServer(latency=args.latency, token_delay=args.token_delay) as server:
+        openai.base_url = server.base_url + "/"
+        openai.api_key = "fake"
+        print(f"{'mode':<9} {'leads':>6} {'first text':>11} {'first email':>12} {'total':>8} {'updates':>8} {'ok':>4}")
+        for mode in ["blocking", "stream"]:
+            first_text, first_email, total, updates, correct = run(mode, prompts)
+            print(f"{mode:<9} {args.leads:>6} {first_text:>10.2f}s {first_email:>11.2f}s {total:>7.2f}s "
+                  f"{updates:>8} {correct:>4}")
+
+
+if __name__ == "__main__":
+    main()
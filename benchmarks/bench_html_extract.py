@@ -0,0 +1,88 @@
+"""Micro-benchmark for the HTML-to-text extractors in agent/html_extract.py.
+
+Reports throughput (MB/s of HTML), peak traced memory per page and the size of
+the extracted text for the legacy full-page extractor and the boilerplate-
+stripping bs4/lxml extractors. tracemalloc only sees Python allocations, so
+lxml's C-side tree is under-reported in the memory column.
+
+Usage: python benchmarks/bench_html_extract.py [--fixtures DIR] [--pages 50]
+  DIR holds saved .html files; without it synthetic store-front pages are used.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.html_extract import EXTRACTORS, lxml
+
+WORDS = ("packaging bakery tray compostable catering fresh pastry order delivery wholesale "
+         "seasonal gift box local family recipe menu cafe coffee retail shipping").split()
+
+
+def synthetic_page(rng):
+    sentence = lambda n: " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+    nav = "".join(f'<li><a href="/c/{i}">{sentence(2)}</a></li>' for i in range(60))
+    script = "<script>" + "var x=" + "1+" * 5000 + "1;</script>"
+    style = "<style>" + ".c{color:red}" * 2000 + "</style>"
+    cookie = '<div id="cookie-consent"><p>We use cookies to improve your experience. Accept all?</p></div>'
+    main = "".join(
+        f"<section><h2>{sentence(4)}</h2>" + "".join(f"<p>{sentence(25)}</p>" for _ in range(4)) + "</section>"
+        for _ in range(12)
+    )
+    footer = "<footer>" + "".join(f'<a href="/f/{i}">{sentence(2)}</a>' for i in range(40)) + "</footer>"
+    return (f"<html><head>{style}{script}</head><body><header><nav><ul>{nav}</ul></nav></header>"
+            f"{cookie}<main>{main}</main>{footer}{script}</body></html>")
+
+
+def load_fixtures(args):
+    if args.fixtures:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        return pages
+    rng = random.Random(42)
+    return [synthetic_page(rng) for _ in range(args.pages)]
+
+
+def bench(extract, pages):
+    total_bytes = sum(len(p.encode("utf-8")) for p in pages)
+    start = time.perf_counter()
+    text_chars = sum(len("\n".join(extract(p))) for p in pages)
+    elapsed = time.perf_counter() - start
+
+    peaks = []
+    for page in pages[:10]:
+        tracemalloc.start()
+        extract(page)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return total_bytes / elapsed / 1e6, sum(peaks) / len(peaks) / 1e6, text_chars / len(pages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="Directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=50, help="Synthetic pages when no fixtures are given")
+    args = parser.parse_args()
+
+    pages = load_fixtures(args)
+    if not pages:
+        sys.exit("No .html fixtures found.")
+    avg_kb = sum(len(p) for p in pages) / len(pages) / 1024
+    print(f"\n=== HTML extraction: {len(pages)} pages, avg {avg_kb:.0f} KB ===")
+    print(f"{'extractor':<10} {'MB/s':>8} {'peak MB/page':>13} {'text chars/page':>16}")
+    for name, extract in EXTRACTORS.items():
+        if name == "lxml" and lxml is None:
+            print(f"{name:<10} (lxml not installed)")
+            continue
+        mb_s, peak_mb, chars = bench(extract, pages)
+        print(f"{name:<10} {mb_s:>8.2f} {peak_mb:>13.2f} {chars:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Throughput and peak-memory benchmark for lead ingestion (agent/ingest.py).
+
+Writes a synthetic lead list of --rows rows as .csv (and .xlsx when openpyxl is
+installed) to a temporary directory, then parses it in a fresh subprocess per
+loader so peak RSS is measured in isolation:
+
+- old: pd.read_excel / pd.read_csv + df.iterrows() + one json.dump(indent=2)
+- new: lead_loader.ingest_leads(), streaming CHUNK_SIZE rows at a time into a LeadStore
+
+Loaders whose dependencies are missing (pandas, openpyxl) are reported as skipped.
+
+Usage: python benchmarks/bench_ingest.py [--rows 500000] [--formats csv,xlsx]
+"""
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+COLUMNS = ["company_name", "website", "contact_name", "contact_email", "notes"]
+NEEDS = {("old", "csv"): ["pandas"], ("old", "xlsx"): ["pandas", "openpyxl"], ("new", "xlsx"): ["openpyxl"]}
+
+
+def make_row(i):
+    return [f"Lead {i} Bakery", f"lead{i}.example.com", f"Contact {i}", f"buyer@lead{i}.example.com",
+            f"Independent bakery #{i}, asked about compostable trays and kraft bags."]
+
+
+def write_inputs(tmp, rows, formats):
+    paths = {}
+    if "csv" in formats:
+        paths["csv"] = os.path.join(tmp, "leads.csv")
+        with open(paths["csv"], "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(make_row(i) for i in range(rows))
+    if "xlsx" in formats and importlib.util.find_spec("openpyxl"):
+        from openpyxl import Workbook
+        paths["xlsx"] = os.path.join(tmp, "leads.xlsx")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(COLUMNS)
+        for i in range(rows):
+            sheet.append(make_row(i))
+        workbook.save(paths["xlsx"])
+    return paths
+
+
+def old_loader(path, output):
+    """The previous lead_loader: whole-file DataFrame, iterrows, one indented JSON dump."""
+    import pandas as pd
+    df = pd.read_excel(path) if path.endswith(".xlsx") else pd.read_csv(path)
+    leads = []
+    for _, row in df.iterrows():
+        leads.append({column: str(row.get(column, "")).strip() for column in COLUMNS})
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(leads, f, indent=2)
+    return len(leads)
+
+
+def worker(loader, path, output):
+    start = time.perf_counter()
+    if loader == "old":
+        rows = old_loader(path, output)
+    else:
+        from agent.lead_loader import ingest_leads
+        from agent.lead_store import LeadStore
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = ingest_leads(path, LeadStore(output))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"rows": rows, "seconds": elapsed, "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def measure(loader, path, output):
+    result = subprocess.run([sys.executable, __file__, "--worker", loader, path, output],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        return worker(*sys.argv[2:5])
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--formats", default="csv,xlsx")
+    args = parser.parse_args()
+
+    formats = args.formats.split(",")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_inputs(tmp, args.rows, formats)
+        print(f"{'format':<7} {'loader':<6} {'rows':>8} {'time':>8} {'rows/s':>10} {'peak RSS':>10}")
+        for fmt in formats:
+            for loader in ("old", "new"):
+                missing = [m for m in NEEDS.get((loader, fmt), []) if not importlib.util.find_spec(m)]
+                if fmt not in paths or missing:
+                    print(f"{fmt:<7} {loader:<6} skipped (needs {', '.join(missing or ['openpyxl'])})")
+                    continue
+                stats = measure(loader, paths[fmt], os.path.join(tmp, f"{loader}_{fmt}.out"))
+                print(f"{fmt:<7} {loader:<6} {stats['rows']:>8} {stats['seconds']:>7.2f}s "
+                      f"{stats['rows'] / stats['seconds']:>10.0f} {stats['max_rss_kb'] / 1024:>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Dashboard-query benchmark for lead state in agent/memory_manager.py.
+
+Fills a temporary memory store with --leads synthetic leads (random statuses,
+last activity spread over the past --days days, ~5% handed to manual), then
+times the status dashboard calls: status_counts(), awaiting_reply() and
+filtered query_leads() pages. Reports the median of --repeats runs and
+whether SQLite had to sort or scan for each query.
+
+Usage: python benchmarks/bench_lead_queries.py [--leads 1000000] [--days 60] [--repeats 50]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.memory_manager import STATE_COLUMNS, MemoryStore
+
+TYPES = ["sent_email", "received_email", "follow_up_sent", "bounced"]
+
+
+def fill(store, leads, days, seed=7):
+    rng = random.Random(seed)
+    now = time.time()
+    with store.transaction() as conn:
+        for start in range(0, leads, 50000):
+            rows = []
+            for i in range(start, min(start + 50000, leads)):
+                at = now - rng.random() * days * 86400
+                manual = rng.random() < 0.05
+                rows.append((f"lead_{i:07d}", int(manual), at + 3600 if manual else None, rng.choice(TYPES), at))
+            conn.executemany(f"INSERT INTO memory ({STATE_COLUMNS}) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def median_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def plan(store, sql, params):
+    with store.connection() as conn:
+        details = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+    return "sort" if "TEMP B-TREE" in details else ("scan" if "SCAN" in details and "INDEX" not in details else "index")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(os.path.join(tmp, "memory_store.sqlite"))
+        start = time.perf_counter()
+        fill(store, args.leads, args.days)
+        print(f"🗄️ {args.leads} leads written in {time.perf_counter() - start:.1f}s")
+        counts = store.status_counts()
+        assert counts["total"] == args.leads, counts
+
+        queries = [
+            ("status_counts()", store.status_counts, None),
+            ("awaiting_reply(3 days)", lambda: store.awaiting_reply(3), None),
+            ("awaiting_reply page 20", lambda: store.awaiting_reply(3, offset=1000), None),
+            ("manual, newest first", lambda: store.query_leads(turned_to_manual=True, newest_first=True), (
+                f"SELECT {STATE_COLUMNS} FROM memory WHERE turned_to_manual = ? "
+                "ORDER BY last_transaction_at DESC, lead_id DESC LIMIT 50", (1,))),
+            ("type + last 7 days", lambda: store.query_leads("received_email", after=time.time() - 7 * 86400), (
+                f"SELECT {STATE_COLUMNS} FROM memory WHERE last_transaction_type = ? AND last_transaction_at >= ? "
+                "ORDER BY last_transaction_at, lead_id LIMIT 50", ("received_email", 0))),
+            ("all leads, oldest", lambda: store.query_leads(), (
+                f"SELECT {STATE_COLUMNS} FROM memory ORDER BY last_transaction_at, lead_id LIMIT 50", ())),
+            ("lead_state(id)", lambda: store.lead_state("lead_0500000"), None),
+        ]
+        print(f"{'query':<24} {'median':>9} {'rows':>6} {'plan':>6}")
+        for name, fn, explain in queries:
+            result = fn()
+            rows = len(result) if isinstance(result, list) else 1
+            how = plan(store, *explain) if explain else "-"
+            print(f"{name:<24} {median_ms(fn, args.repeats):>7.3f}ms {rows:>6} {how:>6}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Startup-cost benchmark for the indexed lead store (agent/lead_store.py).
+
+For each --sizes lead count, writes the leads both as the old parsed JSON file
+and into a LeadStore in a temporary directory, then measures what a stage pays
+before it can work on its first LIMIT leads, plus single-lead lookups:
+
+- old: json.load(leads_parsed.json)[:LIMIT]
+- store: iter_leads(LIMIT), get_lead(key), leads_for_domain(domain)
+
+Time and peak Python memory (tracemalloc) should stay flat for the store as
+the list grows, and grow linearly for the JSON file.
+
+Usage: python benchmarks/bench_lead_store.py [--sizes 10000,100000,500000] [--limit 20]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.lead_store import LeadStore, lead_key_for
+
+CHUNK = 5000
+
+
+def make_lead(i):
+    return {"company_name": f"Lead {i} Bakery", "website": f"www.lead{i}.example.com", "contact_name": f"Contact {i}",
+            "contact_email": f"buyer@lead{i}.example.com", "notes": f"Independent bakery #{i}."}
+
+
+def measure(fn, rounds=5):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    elapsed = (time.perf_counter() - start) / rounds
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,500000")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'leads':>8} {'reader':<25} {'time':>10} {'peak mem':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "leads_parsed.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump([make_lead(i) for i in range(size)], f, indent=2)
+            store = LeadStore(os.path.join(tmp, "leads.sqlite"))
+            store.upsert_leads([make_lead(i) for i in range(start, min(start + CHUNK, size))]
+                               for start in range(0, size, CHUNK))
+            middle = make_lead(size // 2)
+
+            def old_first_page():
+                with open(json_path, "r", encoding="utf-8") as f:
+                    return json.load(f)[:args.limit]
+
+            readers = [
+                ("old: json.load[:LIMIT]", old_first_page),
+                ("store: iter_leads(LIMIT)", lambda: list(store.iter_leads(args.limit))),
+                ("store: get_lead", lambda: store.get_lead(lead_key_for(middle["company_name"]))),
+                ("store: leads_for_domain", lambda: store.leads_for_domain(f"lead{size // 2}.example.com")),
+            ]
+            for name, fn in readers:
+                result, elapsed, peak = measure(fn)
+                assert result, name
+                print(f"{size:>8} {name:<25} {elapsed * 1000:>8.2f}ms {peak / 1024:>8.0f}KB")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Requests per lead and page coverage: path guessing vs link discovery.
+
+Runs both strategies against a local fixture corpus of stub sites with
+different layouts (standard nav, custom slugs, sitemap-only, no links).
+
+Usage: python benchmarks/bench_link_discovery.py [--sites 40]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.web_crawler import crawl_website, discover_website
+from benchmarks.stub_site_server import StubSites, render_page
+
+
+def standard_site():
+    nav = [("/about-us", "About Us"), ("/our-products", "Products"), ("/services", "Services")]
+    return {
+        "/": render_page("Home", nav_links=nav),
+        "/about-us": render_page("About us"),
+        "/our-products": render_page("Our products"),
+        "/services": render_page("Services"),
+    }
+
+
+def custom_slug_site():
+    # Paths a guesser will never try; only the nav links point at them
+    nav = [("/company/our-story-since-1998", "Our Story"), ("/collections/all", "Shop"),
+           ("/how-we-help", "What We Do")]
+    return {
+        "/": render_page("Home", nav_links=nav, footer_links=[("/contact", "Contact")]),
+        "/company/our-story-since-1998": render_page("Our story"),
+        "/collections/all": render_page("All products"),
+        "/how-we-help": render_page("What we do"),
+    }
+
+
+def sitemap_only_site():
+    sitemap = "".join(
+        f"<url><loc>{{base}}{path}</loc></url>" for path in ("/", "/who-we-are", "/product-range", "/solutions")
+    )
+    return {
+        "/": render_page("Home"),
+        "/robots.txt": ("text/plain", "User-agent: *\nSitemap: /sitemap.xml\n"),
+        "/sitemap.xml": ("application/xml", f"<urlset>{sitemap}</urlset>"),
+        "/who-we-are": render_page("Who we are"),
+        "/product-range": render_page("Product range"),
+        "/solutions": render_page("Solutions"),
+    }
+
+
+def bare_site():
+    return {
+        "/": render_page("Home"),
+        "/about": render_page("About"),
+        "/catalog": render_page("Catalog"),
+    }
+
+
+LAYOUTS = [standard_site, custom_slug_site, sitemap_only_site, bare_site]
+
+
+def run(strategy, sites):
+    before = sites.requests
+    found = available = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for url, pages in zip(sites.urls, sites.site_pages):
+            found += len(strategy(url))
+            available += len([p for p in pages if not p.endswith((".txt", ".xml"))])
+    return sites.requests - before, found, available, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sites", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    site_pages = [LAYOUTS[i % len(LAYOUTS)]() for i in range(args.sites)]
+    with StubSites(latency=args.latency, site_pages=site_pages) as sites:
+        # Sitemaps need absolute URLs on the stub's own port
+        for url, pages in zip(sites.urls, sites.site_pages):
+            if "/sitemap.xml" in pages:
+                content_type, body = pages["/sitemap.xml"]
+                pages["/sitemap.xml"] = (content_type, body.replace("{base}", url))
+
+        print("\n=== Link discovery vs path guessing ===")
+        print(f"{'strategy':<10} {'requests':>9} {'req/lead':>9} {'coverage':>9} {'time':>8}")
+        for name, strategy in (("guess", crawl_website), ("discover", discover_website)):
+            requests, found, available, elapsed = run(strategy, sites)
+            print(f"{name:<10} {requests:>9} {requests / args.sites:>9.1f} "
+                  f"{found / available:>8.0%} {elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
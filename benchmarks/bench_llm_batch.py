@@ -0,0 +1,59 @@
+"""End-to-end check of the Batch API mode in utils/llm_batch.py against the fake server.
+
+Submits synthetic matching prompts as batch jobs while the fake server fails a
+fraction of batch items, then reports batches submitted, items resubmitted and
+whether every prompt got an answer. A second run shows cached answers skip
+submission entirely.
+
+Usage: python benchmarks/bench_llm_batch.py [--leads 2000] [--batch-error-rate 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openai
+
+from agent.product_matcher import MATCH_MODEL, build_match_prompt
+from benchmarks.fake_openai_server import MATCH_REPLY, FakeOpenAIServer
+from utils import llm_batch, llm_client
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=2000)
+    parser.add_argument("--batch-error-rate", type=float, default=0.05, help="Fraction of batch items that fail")
+    parser.add_argument("--batch-delay", type=float, default=0.5, help="Seconds until a fake batch completes")
+    args = parser.parse_args()
+
+    requests = {
+        f"lead_{i}": {
+            "model": MATCH_MODEL,
+            "messages": [{"role": "user", "content": build_match_prompt(f"Lead {i}. Notes: bakery.", "1. Paperbake baking tray")}],
+            "temperature": 0,
+        }
+        for i in range(args.leads)
+    }
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOpenAIServer(latency=0, batch_delay=args.batch_delay, batch_error_rate=args.batch_error_rate) as server:
+        llm_batch.BATCH_DIR = tmp
+        llm_client._shared_cache = llm_client.LLMCache(os.path.join(tmp, "llm_cache.sqlite"))
+        client = openai.OpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+
+        print(f"{'run':<6} {'leads':>6} {'batches':>8} {'items sent':>11} {'item errors':>12} {'answered':>9} {'time':>7}")
+        for name in ["cold", "warm"]:
+            before = dict(server.counts)
+            start = time.perf_counter()
+            results = llm_batch.run_batch(requests, "bench", client=client, poll_interval=0.2)
+            elapsed = time.perf_counter() - start
+            delta = {k: server.counts[k] - before[k] for k in before}
+            correct = sum(results.get(cid) == MATCH_REPLY for cid in requests)
+            print(f"{name:<6} {args.leads:>6} {delta['batches']:>8} {delta['batch_items']:>11} "
+                  f"{delta['batch_item_errors']:>12} {correct:>9} {elapsed:>6.2f}s")
+        llm_client._shared_cache.close()
+
+
+if __name__ == "__main__":
+    main()
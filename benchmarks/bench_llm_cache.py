@@ -0,0 +1,63 @@
+"""Re-run benchmark for the shared LLM response cache in utils/llm_client.py.
+
+Runs the same batch of matching prompts twice against the local fake OpenAI
+server through llm_client.achat and reports API calls, wall time and cache
+stats per pass. The second pass should make zero API calls.
+
+Usage: python benchmarks/bench_llm_cache.py [--leads 200] [--latency 0.2] [--max-entries 20000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openai
+
+from agent.product_matcher import MATCH_MODEL, build_match_prompt
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from utils import llm_client
+from utils.llm_scheduler import RateLimitedScheduler
+
+
+async def run_pass(server, prompts):
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+    scheduler = RateLimitedScheduler(max_concurrency=16, requests_per_minute=10000, tokens_per_minute=2000000)
+    before = server.counts["requests"]
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        llm_client.achat(client, scheduler, model=MATCH_MODEL, messages=[{"role": "user", "content": p}], temperature=0)
+        for p in prompts
+    ])
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return elapsed, server.counts["requests"] - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-entries", type=int, default=llm_client.MAX_ENTRIES)
+    args = parser.parse_args()
+
+    prompts = [build_match_prompt(f"Lead {i}. Notes: bakery and cafe.", "1. Paperbake baking tray")
+               for i in range(args.leads)]
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(args.latency) as server:
+        llm_client._shared_cache = llm_client.LLMCache(os.path.join(tmp, "llm_cache.sqlite"),
+                                                       max_entries=args.max_entries)
+        print(f"{'pass':<6} {'leads':>6} {'api calls':>10} {'time':>8} {'hits':>6} {'misses':>7} {'evicted':>8}")
+        for name in ["cold", "warm"]:
+            stats = llm_client._shared_cache.stats
+            hits, misses = stats["hits"], stats["misses"]
+            elapsed, calls = asyncio.run(run_pass(server, prompts))
+            print(f"{name:<6} {args.leads:>6} {calls:>10} {elapsed:>7.2f}s {stats['hits'] - hits:>6} "
+                  f"{stats['misses'] - misses:>7} {stats['evicted']:>8}")
+        print(f"🗃️ {len(llm_client._shared_cache)} cached completions, ~{stats['tokens_saved']} tokens saved")
+        llm_client._shared_cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Load test for utils/llm_scheduler.py against the local fake OpenAI server.
+
+Compares serial matching (concurrency 1, like the old tqdm loop) with the
+rate-limited concurrent scheduler while the server injects latency and 429s.
+
+Usage: python benchmarks/bench_llm_scheduler.py [--leads 200] [--latency 0.2] [--rate-limit-rate 0.1]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openai
+
+from agent.product_matcher import build_match_prompt
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from utils.llm_scheduler import RateLimitedScheduler
+
+
+async def run(server, leads, concurrency, args):
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+    scheduler = RateLimitedScheduler(
+        max_concurrency=concurrency, requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+        base_delay=0.05, max_delay=1.0,
+    )
+    start = time.perf_counter()
+    prompts = [build_match_prompt(f"Lead {i}. Notes: bakery and cafe.", "1. Paperbake baking tray") for i in range(leads)]
+    results = await asyncio.gather(*[
+        scheduler.chat(client, model="gpt-4o", messages=[{"role": "user", "content": p}], temperature=0)
+        for p in prompts
+    ], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    await client.close()
+    failed = sum(isinstance(r, Exception) for r in results)
+    return elapsed, failed, scheduler.stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200)
+    parser.add_argument("--serial-leads", type=int, default=20, help="Serial runs are slow; sample fewer leads")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.1, help="Fraction of calls answered with 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--rpm", type=float, default=10000)
+    parser.add_argument("--tpm", type=float, default=2000000)
+    args = parser.parse_args()
+
+    print(f"\n=== LLM scheduler: latency {args.latency}s, {args.rate_limit_rate:.0%} 429s, "
+          f"{args.server_error_rate:.0%} 5xx ===")
+    print(f"{'mode':<16} {'leads':>6} {'time':>8} {'leads/s':>8} {'retries':>8} {'429s':>6} {'failed':>7}")
+    with FakeOpenAIServer(args.latency, args.rate_limit_rate, args.server_error_rate) as server:
+        for concurrency in [1] + args.concurrency:
+            leads = args.serial_leads if concurrency == 1 else args.leads
+            elapsed, failed, stats = asyncio.run(run(server, leads, concurrency, args))
+            print(f"{'concurrency ' + str(concurrency):<16} {leads:>6} {elapsed:>7.2f}s {leads / elapsed:>8.1f} "
+                  f"{stats['retries']:>8} {stats['rate_limited']:>6} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Concurrent-writer benchmark for the conversation memory store in agent/memory_manager.py.
+
+Several threads each append turns to their own leads against a temporary
+database. Compares the previous connect-per-call approach (rollback journal,
+fresh connection and commit per call, whole JSON thread read and rewritten)
+with the pooled WAL MemoryStore's append_messages(), per call and with
+`--batch` updates committed per transaction, and reports updates/sec.
+
+Usage: python benchmarks/bench_memory_store.py [--threads 8] [--updates 300] [--batch 50]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.memory_manager import MemoryStore
+
+LEGACY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memory (
+    lead_id TEXT PRIMARY KEY,
+    messages TEXT,
+    turned_to_manual INTEGER DEFAULT 0,
+    turned_to_manual_at TEXT,
+    last_transaction_type TEXT
+)
+"""
+
+
+class ConnectPerCall:
+    """The store as it was: a new connection (default journal) for every read and write."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        conn = sqlite3.connect(db_path, timeout=30)
+        conn.execute(LEGACY_SCHEMA)
+        conn.commit()
+        conn.close()
+
+    def get_conversation(self, lead_id):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        row = conn.execute("SELECT messages FROM memory WHERE lead_id = ?", (lead_id,)).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row and row[0] else []
+
+    def update_conversation(self, lead_id, messages, metadata=None):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("""
+        INSERT INTO memory (lead_id, messages, last_transaction_type) VALUES (?, ?, ?)
+        ON CONFLICT(lead_id) DO UPDATE SET messages = excluded.messages,
+            last_transaction_type = excluded.last_transaction_type
+        """, (lead_id, json.dumps(messages), (metadata or {}).get("last_transaction_type")))
+        conn.commit()
+        conn.close()
+
+
+def turn(i):
+    return {"sender": "lead", "content": f"Reply {i}: could you send pricing for the trays?"}
+
+
+def add_turn(store, lead, i):
+    if isinstance(store, MemoryStore):
+        store.append_messages(lead, [turn(i)], {"last_transaction_type": "reply"})
+    else:
+        store.update_conversation(lead, store.get_conversation(lead) + [turn(i)], {"last_transaction_type": "reply"})
+
+
+def writer(store, worker, updates, batch, errors):
+    leads = [f"lead-{worker}-{n}" for n in range(10)]
+    try:
+        for start in range(0, updates, batch):
+            if batch > 1:
+                with store.transaction():
+                    for i in range(start, min(start + batch, updates)):
+                        add_turn(store, leads[i % len(leads)], i)
+            else:
+                add_turn(store, leads[start % len(leads)], start)
+    except sqlite3.OperationalError as e:
+        errors.append(str(e))
+
+
+def run(store, threads, updates, batch):
+    errors = []
+    workers = [threading.Thread(target=writer, args=(store, w, updates, batch, errors)) for w in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=300, help="Conversation updates per thread")
+    parser.add_argument("--batch", type=int, default=50, help="Updates per transaction in the batched run")
+    args = parser.parse_args()
+
+    total = args.threads * args.updates
+    print(f"{'store':<16} {'threads':>8} {'updates':>8} {'time':>8} {'updates/s':>10} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, batch in [("connect-per-call", 1), ("pooled", 1), ("pooled+batch", args.batch)]:
+            db_path = os.path.join(tmp, f"{name}.sqlite")
+            store = ConnectPerCall(db_path) if name == "connect-per-call" else MemoryStore(db_path)
+            elapsed, errors = run(store, args.threads, args.updates, batch)
+            print(f"{name:<16} {args.threads:>8} {total:>8} {elapsed:>7.2f}s {total / elapsed:>10.0f} {len(errors):>7}")
+            if isinstance(store, MemoryStore):
+                turns = sum(len(store.get_conversation(f"lead-{w}-{n}")) for w in range(args.threads) for n in range(10))
+                assert turns == total, f"{name}: expected {total} stored turns, found {turns}"
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Thread-length benchmark for appending messages in agent/memory_manager.py.
+
+Grows one conversation to each --lengths size, then times adding one more
+message: the previous way (read the whole JSON thread, append, rewrite it) and
+MemoryStore.append_messages(), plus a last-N read for prompt building. The
+append and last-N columns should stay flat as threads get longer.
+
+Usage: python benchmarks/bench_message_append.py [--lengths 10,100,1000,5000] [--appends 200] [--last-n 20]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.memory_manager import MemoryStore
+
+MESSAGE = {"sender": "lead", "content": "Thanks, could you send pricing for 5,000 kraft trays? " * 3,
+           "timestamp": "2025-01-01 00:00:00"}
+
+
+def time_json_rewrite(db_path, length, appends):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE memory (lead_id TEXT PRIMARY KEY, messages TEXT)")
+    conn.execute("INSERT INTO memory VALUES (?, ?)", ("lead", json.dumps([MESSAGE] * length)))
+    conn.commit()
+    start = time.perf_counter()
+    for _ in range(appends):
+        thread = json.loads(conn.execute("SELECT messages FROM memory WHERE lead_id = ?", ("lead",)).fetchone()[0])
+        thread.append(MESSAGE)
+        conn.execute("UPDATE memory SET messages = ? WHERE lead_id = ?", (json.dumps(thread), "lead"))
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return elapsed / appends
+
+
+def time_append(db_path, length, appends, last_n):
+    store = MemoryStore(db_path)
+    store.append_messages("lead", [MESSAGE] * length)
+    start = time.perf_counter()
+    for _ in range(appends):
+        store.append_messages("lead", [MESSAGE], {"last_transaction_type": "received_email"})
+    append = (time.perf_counter() - start) / appends
+    start = time.perf_counter()
+    for _ in range(appends):
+        recent = store.get_conversation("lead", last_n=last_n)
+    read = (time.perf_counter() - start) / appends
+    assert len(recent) == min(last_n, length + appends)
+    assert store.message_count("lead") == length + appends
+    store.close()
+    return append, read
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", default="10,100,1000,5000")
+    parser.add_argument("--appends", type=int, default=200)
+    parser.add_argument("--last-n", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'json rewrite':>13} {'append':>9} {'last-N read':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for length in [int(n) for n in args.lengths.split(",")]:
+            rewrite = time_json_rewrite(os.path.join(tmp, f"json_{length}.sqlite"), length, args.appends)
+            append, read = time_append(os.path.join(tmp, f"table_{length}.sqlite"), length, args.appends, args.last_n)
+            print(f"{length:>9} {rewrite * 1000:>11.3f}ms {append * 1000:>7.3f}ms {read * 1000:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Incremental-run benchmark for the pipeline runner in agent/pipeline.py.
+
+Builds a temporary data/ tree with --leads synthetic leads (crawled content
+already in the artifact store) and runs the match and email stages offline (local matching,
+OFFLINE email) through run_pipeline(): a first full run, a no-change rerun,
+--added new leads, one lead whose website changed and an edited catalog. The
+last row reruns the same stages the old way (every lead, as the Streamlit
+buttons do) after the new leads were added.
+
+Usage: python benchmarks/bench_pipeline_incremental.py [--leads 10000] [--added 50]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import email_writer, lead_profile, pipeline, product_matcher
+from agent.artifact_store import get_artifact_store
+from agent.ingest import read_records
+from agent.lead_store import LEGACY_CATALOG, get_lead_store, lead_key_for
+from utils.logger import logger
+
+REPO = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+STAGES = ["match", "email"]
+TRADES = ["bakery", "coffee roaster", "butcher", "deli", "brewery", "florist", "pizzeria", "juice bar"]
+
+
+def make_lead(i):
+    return {
+        "company_name": f"Lead {i} {TRADES[i % len(TRADES)].title()}",
+        "website": f"lead{i}.example.com",
+        "contact_name": f"Contact {i}",
+        "contact_email": f"buyer@lead{i}.example.com",
+        "notes": f"Independent {TRADES[i % len(TRADES)]} looking at sustainable packaging.",
+    }
+
+
+def write_site(lead):
+    trade = lead["notes"].split()[1]
+    content = {"homepage": f"{lead['company_name']} is a family {trade} serving takeaway food and drinks "
+                           f"in compostable cups, trays and bags.", "about": f"Founded as a {trade}."}
+    get_artifact_store().put("website_content", lead_key_for(lead["company_name"]), content)
+
+
+def write_leads(leads):
+    get_lead_store().upsert_leads([leads])
+
+
+def setup(tmp, count):
+    os.chdir(tmp)
+    os.makedirs("data", exist_ok=True)
+    get_lead_store().replace_products([list(read_records(os.path.join(REPO, LEGACY_CATALOG)))])
+    shutil.copy(os.path.join(REPO, "data/company_info.md"), "data/company_info.md")
+    leads = [make_lead(i) for i in range(count)]
+    for lead in leads:
+        write_site(lead)
+    write_leads(leads)
+    return leads
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # the stages print a line per lead
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def legacy_run():
+    return {"match": len(product_matcher.match_products_to_leads() or []), "email": len(email_writer.main())}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=10000)
+    parser.add_argument("--added", type=int, default=50)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    lead_profile.USE_PROFILES = False
+    product_matcher.MATCH_MODE = "local"
+    product_matcher.SKIP_UNCHANGED = False
+    product_matcher.LIMIT = None
+    email_writer.USE_GPT = False
+    email_writer.SKIP_UNCHANGED = False
+    email_writer.LIMIT = None
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        leads = setup(tmp, args.leads)
+        ledger = pipeline.StageLedger()
+
+        def run(label):
+            report, elapsed = timed(lambda: pipeline.run_pipeline(STAGES, ledger=ledger))
+            print(f"{label:<28} {len(leads):>7} {report['match']:>8} {report['email']:>8} {elapsed:>8.2f}s")
+            return report
+
+        print(f"{'run':<28} {'leads':>7} {'matched':>8} {'emailed':>8} {'time':>9}")
+        run("first run")
+        run("rerun, nothing changed")
+
+        new = [make_lead(args.leads + i) for i in range(args.added)]
+        for lead in new:
+            write_site(lead)
+        leads += new
+        write_leads(leads)
+        report = run(f"+{args.added} leads")
+        assert report == {"match": args.added, "email": args.added}, report
+
+        write_site({**leads[0], "notes": "x butcher with a new deli counter"})
+        assert run("1 website changed") == {"match": 1, "email": 1}
+
+        catalog = get_lead_store().products()
+        catalog[0]["description"] += " Now also in kraft paper."
+        get_lead_store().replace_products([catalog])
+        run("catalog edited")
+
+        report, elapsed = timed(legacy_run)
+        print(f"{'old: recompute everything':<28} {len(leads):>7} {report['match']:>8} {report['email']:>8} "
+              f"{elapsed:>8.2f}s")
+        ledger.close()
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Prompt-size report for the budgeted email prompt in agent/email_writer.py.
+
+Builds every lead's email prompt with and without PROMPT_BUDGETS and reports
+prompt tokens per lead plus the token prefix shared by all prompts (what the
+provider's prompt cache can reuse; it needs at least ~1024 identical tokens).
+Counts are exact with tiktoken installed, ~4 chars/token otherwise.
+
+Usage: python benchmarks/bench_prompt_budget.py
+"""
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import email_writer
+from utils.prompt_budget import count_tokens, tiktoken
+
+
+def build_all(company_info, entries):
+    return {entry["company_name"]: email_writer.build_prompt(entry, company_info) for entry in entries}
+
+
+def shared_prefix(prompts):
+    prompts = list(prompts)
+    prefix = os.path.commonprefix(prompts) if len(prompts) > 1 else ""
+    return count_tokens(prefix, email_writer.EMAIL_MODEL)
+
+
+def main():
+    company_info = email_writer.load_text(email_writer.COMPANY_INFO_FILE)
+    entries = email_writer.load_match_results()
+    budgets = dict(email_writer.PROMPT_BUDGETS)
+
+    email_writer.PROMPT_BUDGETS = {}
+    unbounded = build_all(company_info, entries)
+    email_writer.PROMPT_BUDGETS = budgets
+    budgeted = build_all(company_info, entries)
+
+    model = email_writer.EMAIL_MODEL
+    print(f"🔢 Token counts via {'tiktoken' if tiktoken else '~4 chars/token estimate'}; budgets {budgets}")
+    print(f"{'lead':<28} {'unbounded':>10} {'budgeted':>9}")
+    total_before = total_after = 0
+    for company in unbounded:
+        before, after = count_tokens(unbounded[company], model), count_tokens(budgeted[company], model)
+        total_before += before
+        total_after += after
+        print(f"{company[:28]:<28} {before:>10} {after:>9}")
+    print(f"{'total':<28} {total_before:>10} {total_after:>9}")
+    print(f"🔁 Shared prompt prefix: {shared_prefix(budgeted.values())} tokens")
+
+
+if __name__ == "__main__":
+    main()
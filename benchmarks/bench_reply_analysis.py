@@ -0,0 +1,87 @@
+"""Concurrency benchmark for the reply-analysis pipeline in integrations/reply_analyzer.py.
+
+Writes --replies synthetic sent emails and replies to a temporary artifact store and
+runs run_analysis_async() against the local fake OpenAI server at each
+--concurrency level, reporting wall time, replies/sec and speedup over the
+serial (concurrency 1) run. A final rerun at the highest level should skip
+every reply and make no API calls.
+
+Usage: python benchmarks/bench_reply_analysis.py [--replies 64] [--latency 0.2] [--concurrency 1,2,4,8,16,32]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openai
+
+from agent import artifact_store, lead_profile, memory_manager
+from benchmarks.fake_openai_server import FakeOpenAIServer
+from integrations import reply_analyzer
+from utils import llm_client
+from utils.llm_scheduler import RateLimitedScheduler
+from utils.logger import logger
+
+
+def write_replies(store, count):
+    for i in range(count):
+        store.put("emails", f"lead_{i}", f"Hello Lead {i}, our compostable trays could be a fit for your bakery.")
+        store.put("replies", f"lead_{i}", f"Thanks! What would 5,000 trays cost? (lead {i})")
+
+
+async def run_pass(server, concurrency):
+    client = openai.AsyncOpenAI(base_url=server.base_url, api_key="fake", max_retries=0)
+    scheduler = RateLimitedScheduler(max_concurrency=concurrency, requests_per_minute=100000,
+                                     tokens_per_minute=100000000)
+    analyzed = await reply_analyzer.run_analysis_async(client, scheduler)
+    await client.close()
+    return analyzed
+
+
+def run(server, concurrency):
+    before = server.counts["requests"]
+    start = time.perf_counter()
+    analyzed = asyncio.run(run_pass(server, concurrency))
+    return time.perf_counter() - start, analyzed, server.counts["requests"] - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    llm_client.CACHE_ENABLED = False  # measure the pipeline, not the cache
+    lead_profile.USE_PROFILES = False
+    reply_analyzer.ANALYSIS_BUDGET = args.replies
+    levels = [int(c) for c in args.concurrency.split(",")]
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(args.latency) as server:
+        store = artifact_store._store = artifact_store.ArtifactStore(os.path.join(tmp, "artifacts.sqlite"), tmp)
+        write_replies(store, args.replies)
+        memory_manager._store = memory_manager.MemoryStore(os.path.join(tmp, "memory_store.sqlite"))
+
+        print(f"{'concurrency':>11} {'replies':>8} {'api calls':>10} {'time':>8} {'replies/s':>10} {'speedup':>8}")
+        serial = None
+        for concurrency in levels:
+            for lead_key in list(store.keys(reply_analyzer.ANALYZED)):
+                store.delete(reply_analyzer.ANALYZED, lead_key)
+            elapsed, analyzed, calls = run(server, concurrency)
+            serial = serial or elapsed
+            print(f"{concurrency:>11} {analyzed:>8} {calls:>10} {elapsed:>7.2f}s {analyzed / elapsed:>10.1f} "
+                  f"{serial / elapsed:>7.1f}x")
+        elapsed, analyzed, calls = run(server, levels[-1])
+        print(f"{'rerun':>11} {analyzed:>8} {calls:>10} {elapsed:>7.2f}s {'-':>10} {'-':>8}")
+        stored = memory_manager.status_counts()["total"]
+        assert stored == args.replies, f"expected {args.replies} stored conversations, found {stored}"
+        memory_manager._store.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Parse-failure and misrouting benchmark for reply-analysis output (utils/reply_schema.py).
+
+Feeds a corpus of model outputs seen in practice (clean JSON, code fences,
+prose around the object, trailing commas, Python literals, "yes"/"no"
+strings, the old continue/suggested_reply keys, truncation at max_tokens)
+plus the saved analyses in the artifact store through the previous
+handling (strip backticks + json.loads + truthiness of should_continue) and
+through reply_schema.parse_analysis(). Reports failures (a wasted call and
+the lead dropped to manual), misroutes (continue/stop decided wrongly) and
+time per parse.
+
+Usage: python benchmarks/bench_reply_parsing.py [--rounds 2000]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.artifact_store import get_artifact_store
+from utils import reply_schema
+from utils.logger import logger
+
+DRAFT = "Thanks for getting back to us! Pricing for 5,000 trays is attached."
+
+# (expected should_continue or None if the output can't be acted on, raw model output)
+CORPUS = [
+    (True, json.dumps({"intent": "interested", "should_continue": True, "next_reply": DRAFT})),
+    (False, json.dumps({"intent": "not interested", "should_continue": False, "next_reply": None})),
+    (True, "```json\n" + json.dumps({"intent": "pricing", "should_continue": True, "next_reply": DRAFT}) + "\n```"),
+    (False, 'Here is the analysis:\n{"intent": "not interested", "should_continue": false, "next_reply": null}\nLet me know!'),
+    (True, '{"intent": "interested", "should_continue": true, "next_reply": "' + DRAFT + '",}'),
+    (False, "{'intent': 'unsubscribe', 'should_continue': False, 'next_reply': None}"),
+    (False, '{"intent": "not interested", "should_continue": "no", "explanation": "Happy with current supplier."}'),
+    (True, '{"intent": "interested", "should_continue": "yes", "next_reply": "' + DRAFT + '"}'),
+    (True, '{"intent": "interested", "continue": true, "suggested_reply": "' + DRAFT + '"}'),
+    (False, '{"continue": false, "suggested_reply": null}'),
+    (None, '{"intent": "asking for samples", "should_continue": true, "next_reply": "Hello,\\n\\nThanks for your interest. We'),
+    (None, '{"intent": "interested", "should_continue": true, "next_reply": ""}'),
+    (None, "I'm sorry, I can't help with that."),
+    (None, '{"intent": "unclear", "should_continue": "maybe"}'),
+]
+
+
+def old_parse(raw):
+    """The previous handling: strip ```json fences, json.loads, route on truthiness."""
+    raw = raw.strip()
+    if raw.startswith("```json"):
+        raw = raw[7:]
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    try:
+        data = json.loads(raw.strip())
+    except json.JSONDecodeError:
+        return None
+    return bool(data.get("should_continue") or data.get("continue"))
+
+
+def new_parse(raw):
+    analysis = reply_schema.parse_analysis(raw)
+    return None if analysis is None else analysis["should_continue"]
+
+
+def load_corpus():
+    corpus = list(CORPUS)
+    for _, analysis in get_artifact_store().items("analyzed_replies"):
+        raw = json.dumps(analysis, indent=2, ensure_ascii=False)
+        corpus.append((reply_schema._as_bool(analysis.get("should_continue")), raw))
+    return corpus
+
+
+def score(parse, corpus, rounds):
+    failed = misrouted = 0
+    for expected, raw in corpus:
+        result = parse(raw)
+        if result is None:
+            failed += expected is not None  # refusing an unusable output is correct
+        elif result != expected:
+            misrouted += 1
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, raw in corpus:
+            parse(raw)
+    return failed, misrouted, (time.perf_counter() - start) / (rounds * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)  # the unusable samples would log a warning per round
+    corpus = load_corpus()
+    print(f"{'parser':<16} {'outputs':>8} {'failed':>7} {'misrouted':>10} {'per parse':>10}")
+    for name, parse in [("strip+json.loads", old_parse), ("reply_schema", new_parse)]:
+        failed, misrouted, per_parse = score(parse, corpus, args.rounds)
+        print(f"{name:<16} {len(corpus):>8} {failed:>7} {misrouted:>10} {per_parse * 1e6:>8.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Reply-to-lead resolution benchmark for the lead registry (agent/lead_store.py).
+
+For each --sizes lead count, fills a LeadStore in a temporary directory, records
+an outbound Message-ID per lead and resolves --replies synthetic replies:
+
+- old: lead_id from the sender's email local-part (integrations/reply_handler.py before)
+- store: resolve_reply() by In-Reply-To, by subject [LeadID] tag, by sender email
+  and by sender domain (a colleague replying from the lead's website domain)
+
+Reports how many replies landed on the lead they answer and the time per lookup,
+which should stay flat as the list grows.
+
+Usage: python benchmarks/bench_reply_resolution.py [--sizes 10000,100000,1000000] [--replies 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.lead_store import LeadStore, lead_key_for
+
+CHUNK = 5000
+
+
+def make_lead(i):
+    return {"company_name": f"Lead {i} Bakery", "website": f"www.lead{i}.example.com", "contact_name": f"Contact {i}",
+            "contact_email": f"buyer@lead{i}.example.com", "notes": ""}
+
+
+def message_id(i):
+    return f"<{i}.outreach@sender.example.com>"
+
+
+def replies_for(i):
+    """(label, from, message_ids, subject) variants of one lead's reply."""
+    key = lead_key_for(make_lead(i)["company_name"])
+    return [
+        ("in-reply-to", "someone@elsewhere.com", [message_id(i)], "Re: hello"),
+        ("subject tag", "someone@elsewhere.com", [], f"Re: Packaging Solutions [LeadID: {key}]"),
+        ("sender email", f"Contact <buyer@lead{i}.example.com>", [], "Re: hello"),
+        ("sender domain", f"owner@lead{i}.example.com", [], "Re: hello"),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--replies", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'leads':>8} {'resolver':<22} {'correct':>8} {'per lookup':>11}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = LeadStore(os.path.join(tmp, "leads.sqlite"))
+            store.upsert_leads([make_lead(i) for i in range(start, min(start + CHUNK, size))]
+                               for start in range(0, size, CHUNK))
+            with store._conn:
+                store._conn.executemany("INSERT INTO sent_messages (message_id, lead_id, sent_at) VALUES (?, ?, ?)",
+                                        ((message_id(i), i + 1, time.time()) for i in range(size)))
+            sample = random.Random(0).sample(range(size), min(args.replies, size))
+
+            old_hits = sum(f"buyer@lead{i}.example.com".split("@")[0] == lead_key_for(make_lead(i)["company_name"])
+                           for i in sample)
+            print(f"{size:>8} {'old: email local-part':<22} {old_hits / len(sample):>7.0%} {'-':>11}")
+            for variant in range(4):
+                hits, start = 0, time.perf_counter()
+                for i in sample:
+                    label, sender, ids, subject = replies_for(i)[variant]
+                    lead = store.resolve_reply(sender, ids, subject)
+                    hits += bool(lead) and lead["lead_key"] == lead_key_for(make_lead(i)["company_name"])
+                elapsed = (time.perf_counter() - start) / len(sample)
+                print(f"{size:>8} {'store: ' + label:<22} {hits / len(sample):>7.0%} {elapsed * 1e6:>8.1f}µs")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
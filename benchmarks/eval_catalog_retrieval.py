@@ -0,0 +1,106 @@
+"""Offline check of catalog retrieval against past GPT-4o matches.
+
+For every lead with saved match results, re-runs top-K retrieval from
+agent/catalog_index.py and reports recall@K (how many of the products GPT picked
+from the full catalog are still in the candidate set) plus the estimated prompt
+tokens saved per lead by sending only the candidates (~4 chars per token).
+
+With --ranker keywords the BM25 scorer from agent/product_scorer.py is used
+instead of the vector index (queried with the full crawled text).
+
+Usage: python benchmarks/eval_catalog_retrieval.py [--k 5 10 15 20] [--backend hashing]
+                                                   [--ranker embedding|keywords]
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.artifact_store import get_artifact_store
+from agent.catalog_index import CatalogIndex
+from agent.lead_store import get_lead_store
+from agent.product_scorer import ProductScorer
+from agent.product_matcher import (
+    STAGE, WEBSITE_CONTENT,
+    build_match_prompt, combine_lead_text, format_product_catalog, scoring_text,
+)
+
+
+def product_key(brand, name):
+    return f"{brand} {name}".strip().lower()
+
+
+def resolve_pick(pick, by_key, by_name):
+    """Catalog index for a GPT pick; GPT sometimes folds the brand into product_name."""
+    brand, name = pick.get("brand", ""), pick.get("product_name", "")
+    for key in (product_key(brand, name), product_key("", name)):
+        if key in by_key:
+            return by_key[key]
+    return by_name.get(name.strip().lower())
+
+
+def load_evaluation_set(products):
+    by_key = {product_key(p["brand"], p["product_name"]): i for i, p in enumerate(products)}
+    by_name = {p["product_name"].lower(): i for i, p in enumerate(products)}
+    leads = {lead["company_name"]: lead for lead in get_lead_store().iter_leads()}
+
+    cases, unresolved = [], 0
+    artifacts = get_artifact_store()
+    for lead_key, result in artifacts.items(STAGE):
+        lead = leads.get(result.get("company_name"), {"company_name": result.get("company_name", "")})
+        website_data = artifacts.get(WEBSITE_CONTENT, lead_key)
+
+        picks = set()
+        for pick in result.get("matches", {}).get("gpt4o", []):
+            idx = resolve_pick(pick, by_key, by_name)
+            if idx is None:
+                unresolved += 1
+            else:
+                picks.add(idx)
+        if picks:
+            cases.append((combine_lead_text(lead, website_data), website_data, picks))
+    return cases, unresolved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10, 15, 20])
+    parser.add_argument("--backend", default="hashing", choices=["hashing", "openai"])
+    parser.add_argument("--ranker", default="embedding", choices=["embedding", "keywords"])
+    args = parser.parse_args()
+
+    products = get_lead_store().products()
+    cases, unresolved = load_evaluation_set(products)
+    if not cases:
+        print("❌ No match results with resolvable picks to evaluate.")
+        return
+
+    if args.ranker == "keywords":
+        scorer = ProductScorer(products)
+        search = lambda k: scorer.score_many([scoring_text(text, site) for text, site, _ in cases], k)
+    else:
+        index = CatalogIndex.build(products, args.backend)
+        search = lambda k: index.search_many([text for text, _, _ in cases], k)
+    full_tokens = len(build_match_prompt("", format_product_catalog(products))) / 4
+    print(f"📦 {len(products)} products, {len(cases)} leads, {unresolved} unresolved GPT picks")
+    print(f"🧾 Full-catalog prompt (without lead text): ~{full_tokens:.0f} tokens\n")
+    print(f"{'K':>4} {'recall@K':>9} {'leads fully covered':>20} {'prompt tokens':>14} {'saved/lead':>11}")
+
+    for k in args.k:
+        results = search(k)
+        found = total = covered = 0
+        top_tokens = 0.0
+        for (_, _, picks), hits in zip(cases, results):
+            candidates = {i for i, _ in hits}
+            found += len(picks & candidates)
+            total += len(picks)
+            covered += picks <= candidates
+            top_tokens += len(build_match_prompt("", format_product_catalog(
+                [products[i] for i, _ in hits], limit=None))) / 4
+        top_tokens /= len(cases)
+        print(f"{k:>4} {found / total:>9.0%} {covered:>13}/{len(cases):<6} "
+              f"{top_tokens:>14.0f} {full_tokens - top_tokens:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
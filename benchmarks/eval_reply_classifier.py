@@ -0,0 +1,118 @@
+"""Precision/recall report for the local reply pre-classifier in agent/reply_classifier.py.
+
+Scores classify() against two labelled sets: the saved GPT analyses of
+simulated replies (their intent mapped to a class) and a hand-written set
+of bounces, out-of-office notices, unsubscribes, declines, interested and
+deliberately ambiguous replies. For each class it reports precision and recall
+of the replies resolved locally (confidence >= MIN_CONFIDENCE), then coverage
+(= GPT calls avoided) and the time per classification.
+
+Usage: python benchmarks/eval_reply_classifier.py [--min-confidence 0.8] [--show-misses]
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import reply_classifier
+from agent.artifact_store import get_artifact_store
+
+CLASSES = ["bounce", "out_of_office", "unsubscribe", "decline", "interested", "other"]
+
+EXAMPLES = [
+    ("bounce", "Delivery Status Notification (Failure)\n\nAddress not found. Your message wasn't delivered to "
+               "orders@example.com because the address couldn't be found."),
+    ("bounce", "Mail Delivery Subsystem: The following message could not be delivered to one or more recipients. "
+               "550 5.1.1 User unknown."),
+    ("bounce", "Undeliverable: Sustainable packaging for your bakery. The mailbox unavailable error was returned."),
+    ("out_of_office", "Automatic reply: I am out of the office until Monday with limited access to email."),
+    ("out_of_office", "Thanks for your email. I'm currently on annual leave and will be back in the office on 12 May."),
+    ("out_of_office", "Auto-reply: I am away from the office this week. For urgent matters contact ops@example.com."),
+    ("unsubscribe", "Please remove me from your mailing list."),
+    ("unsubscribe", "Unsubscribe."),
+    ("unsubscribe", "Stop emailing me. Do not contact us again."),
+    ("decline", "Thanks, but we're not interested."),
+    ("decline", "We are currently satisfied with our existing packaging suppliers and have no plans to change."),
+    ("decline", "We're not looking for new suppliers this year. Our procurement schedule is already set."),
+    ("interested", "This sounds promising! Could you send pricing and samples for the compostable containers?"),
+    ("interested", "We're interested in the baking trays. What are your lead times and minimum order?"),
+    ("other", "Who gave you my address?"),
+    ("other", "Thanks, I've forwarded this to our purchasing team."),
+    ("other", "Not interested right now, but could you send a price list for next year's budget?"),
+    ("other", "Can you stop by the shop next week? We're out of the office Friday though."),
+    ("decline", "Hi,\n\nWe'll pass on this, thank you.\n\nOn Tue, Mr. Robot wrote:\n> Could you share your pricing "
+                "needs? We'd love to send samples."),
+]
+
+
+def intent_class(intent):
+    """Map a free-text GPT intent onto the classifier's classes."""
+    intent = (intent or "").lower()
+    for needle, label in [("bounce", "bounce"), ("out of office", "out_of_office"), ("unsubscribe", "unsubscribe"),
+                          ("not interested", "decline"), ("declin", "decline"), ("interest", "interested"),
+                          ("pricing", "interested"), ("information", "interested")]:
+        if needle in intent:
+            return label
+    return "other"
+
+
+def load_labelled():
+    labelled = []
+    artifacts = get_artifact_store()
+    for lead_key, analysis in artifacts.items("analyzed_replies"):
+        reply = artifacts.get("replies", lead_key)
+        if reply is not None:
+            labelled.append((intent_class(analysis.get("intent")), reply, f"analyzed:{lead_key}"))
+    labelled += [(label, text, f"example:{i}") for i, (label, text) in enumerate(EXAMPLES)]
+    return labelled
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-confidence", type=float, default=reply_classifier.MIN_CONFIDENCE)
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    labelled = load_labelled()
+    predictions = []
+    for label, text, source in labelled:
+        intent, confidence = reply_classifier.classify(text)
+        resolved = intent if intent and confidence >= args.min_confidence else None
+        predictions.append((label, resolved, intent, confidence, source))
+
+    print(f"{'class':<14} {'support':>8} {'resolved':>9} {'precision':>10} {'recall':>7}")
+    for cls in CLASSES[:-1]:
+        support = sum(label == cls for label, *_ in predictions)
+        resolved = [label for label, pred, *_ in predictions if pred == cls]
+        correct = sum(label == cls for label in resolved)
+        precision = f"{correct / len(resolved):.2f}" if resolved else "-"
+        recall = f"{correct / support:.2f}" if support else "-"
+        print(f"{cls:<14} {support:>8} {len(resolved):>9} {precision:>10} {recall:>7}")
+
+    others = [pred for label, pred, *_ in predictions if label == "other"]
+    print(f"{'other':<14} {len(others):>8} {sum(p is not None for p in others):>9}  (ambiguous; should go to GPT)")
+
+    # GPT is skipped only for terminal intents; "interested" still needs a drafted reply
+    skipped = [(label, pred) for label, pred, *_ in predictions if pred in reply_classifier.TERMINAL_INTENTS]
+    wrong = sum(label != pred for label, pred in skipped)
+    print(f"\n⚡ GPT calls avoided: {len(skipped)} of {len(predictions)} replies ({len(skipped) / len(predictions):.0%}), "
+          f"{wrong} of them misclassified")
+
+    texts = [text for _, text, _ in labelled]
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            reply_classifier.classify(text)
+    per_call = (time.perf_counter() - start) / (rounds * len(texts))
+    print(f"⏱️ {per_call * 1e6:.1f} µs per classification")
+
+    if args.show_misses:
+        for label, pred, intent, confidence, source in predictions:
+            if pred != label and (pred or label != "other"):
+                print(f"  {source}: label={label} predicted={intent} ({confidence:.2f}) resolved={pred}")
+
+
+if __name__ == "__main__":
+    main()
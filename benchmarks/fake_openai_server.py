@@ -0,0 +1,263 @@
+"""Local fake of the OpenAI chat completions API for offline load tests.
+
+Point a client at it with openai.AsyncOpenAI(base_url=server.base_url, api_key="fake").
+Latency and 429/500 error rates are configurable. The Batch API is faked too
+(file upload/download plus batch create/retrieve): a batch completes
+`batch_delay` seconds after creation and `batch_error_rate` of its items fail.
+Completions take `token_delay` seconds per word; with stream=true each word is sent as it's "generated".
+"""
+import json
+from email.parser import BytesParser
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MATCH_REPLY = json.dumps([
+    {"brand": "Paperbake", "product_name": "Paperbake baking tray", "reason": "Oven-safe trays for bakeries."},
+    {"brand": "Octo", "product_name": "Octo compostable container", "reason": "Compostable takeout packaging."},
+    {"brand": "Boardsio", "product_name": "Retail Coffee Box", "reason": "Eco-friendly retail boxes."},
+], indent=2)
+EMAIL_REPLY = (
+    "Hello,\n\nI came across your business and thought our sustainable packaging could be a great fit. "
+    "I've attached our product catalog PDF.\n\nWe'd love to explore how we can support your packaging needs.\n\n"
+    "Best regards,\nMr. Robot"
+)
+
+ANALYSIS_REPLY = json.dumps({
+    "intent": "asking for pricing",
+    "should_continue": True,
+    "next_reply": "Thanks for getting back to us! Pricing for the trays is attached.",
+})
+
+
+def default_reply(messages):
+    prompt = " ".join(m.get("content") or "" for m in messages)
+    if "product-fit analyst" in prompt:
+        return MATCH_REPLY
+    if "analyzing an email thread" in prompt:
+        return ANALYSIS_REPLY
+    return EMAIL_REPLY
+
+
+class FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default backlog of 5 would throttle concurrent clients
+
+
+class FakeOpenAIServer:
+    """Run the fake API on a background thread; use as a context manager."""
+
+    def __init__(self, latency=0.1, rate_limit_rate=0.0, server_error_rate=0.0, reply=default_reply, seed=0,
+                 batch_delay=0.0, batch_error_rate=0.0, token_delay=0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.batch_delay = batch_delay
+        self.batch_error_rate = batch_error_rate
+        self.files = {}
+        self.batches = {}
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "server_errors": 0,
+                       "batches": 0, "batch_items": 0, "batch_item_errors": 0}
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def _count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    def _roll(self):
+        with self.lock:
+            return self.random.random()
+
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length)
+                if self.path.rstrip("/").endswith("/files"):
+                    self.send_json(200, fake.upload_file(self.headers.get("Content-Type", ""), body))
+                    return
+                payload = json.loads(body or b"{}")
+                fake._count("requests")
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                route = self.path.rstrip("/")
+                if route.endswith("/chat/completions"):
+                    self.handle_chat(payload)
+                elif route.endswith("/batches"):
+                    self.send_json(200, fake.create_batch(payload))
+                else:
+                    self.send_json(404, {"error": {"message": f"Unknown route {self.path}"}})
+
+            def do_GET(self):
+                parts = self.path.rstrip("/").split("/")
+                if len(parts) >= 3 and parts[-2] == "batches" and parts[-1] in fake.batches:
+                    self.send_json(200, fake.retrieve_batch(parts[-1]))
+                elif len(parts) >= 3 and parts[-1] == "content" and parts[-2] in fake.files:
+                    data = fake.files[parts[-2]]
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                else:
+                    self.send_json(404, {"error": {"message": f"Unknown route {self.path}"}})
+
+            def handle_chat(self, payload):
+                roll = fake._roll()
+                if roll < fake.rate_limit_rate:
+                    fake._count("rate_limited")
+                    self.send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                                   {"Retry-After": "0"})
+                    return
+                if roll < fake.rate_limit_rate + fake.server_error_rate:
+                    fake._count("server_errors")
+                    self.send_json(500, {"error": {"message": "Internal error", "type": "server_error"}})
+                    return
+                fake._count("ok")
+                content = fake.reply(payload.get("messages", []))
+                if payload.get("stream"):
+                    self.send_stream(payload, content)
+                else:
+                    if fake.token_delay:  # the whole completion is generated before anything is sent
+                        time.sleep(fake.token_delay * len(content.split(" ")))
+                    self.send_json(200, chat_completion(payload, content))
+
+            def send_stream(self, payload, content):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                for chunk in chat_completion_chunks(payload, content):
+                    if fake.token_delay and chunk["choices"]:
+                        time.sleep(fake.token_delay)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+            def send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = FakeHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    # === Batch API ===
+    def upload_file(self, content_type, body):
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+        data = next(part.get_payload(decode=True) for part in message.get_payload()
+                    if part.get_param("name", header="content-disposition") == "file")
+        return self._store_file(data, "batch")
+
+    def _store_file(self, data, purpose):
+        with self.lock:
+            file_id = f"file-fake-{len(self.files)}"
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": f"{file_id}.jsonl", "purpose": purpose, "status": "processed"}
+
+    def create_batch(self, payload):
+        self._count("batches")
+        with self.lock:
+            batch_id = f"batch-fake-{len(self.batches)}"
+            self.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": payload.get("endpoint"),
+                "input_file_id": payload.get("input_file_id"), "completion_window": payload.get("completion_window"),
+                "status": "in_progress", "created_at": int(time.time()), "ready_at": time.time() + self.batch_delay,
+                "output_file_id": None, "error_file_id": None,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+        return self.retrieve_batch(batch_id)
+
+    def retrieve_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        if batch["status"] == "in_progress" and time.time() >= batch["ready_at"]:
+            self._run_batch(batch)
+        return {k: v for k, v in batch.items() if k != "ready_at"}
+
+    def _run_batch(self, batch):
+        outputs, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            self._count("batch_items")
+            if self._roll() < self.batch_error_rate:
+                self._count("batch_item_errors")
+                errors.append({"id": f"batch_req_{len(errors)}", "custom_id": item["custom_id"], "response": {
+                    "status_code": 500, "body": {"error": {"message": "Internal error", "type": "server_error"}}
+                }, "error": None})
+                continue
+            body = item["body"]
+            outputs.append({"id": f"batch_req_{len(outputs)}", "custom_id": item["custom_id"], "response": {
+                "status_code": 200, "body": chat_completion(body, self.reply(body.get("messages", [])))
+            }, "error": None})
+        encode = lambda rows: "".join(json.dumps(r) + "\n" for r in rows).encode("utf-8")
+        batch["output_file_id"] = self._store_file(encode(outputs), "batch_output")["id"] if outputs else None
+        batch["error_file_id"] = self._store_file(encode(errors), "batch_output")["id"] if errors else None
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        batch["status"] = "completed"
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def chat_completion(payload, content):
+    prompt_tokens = sum(len(m.get("content") or "") for m in payload.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-fake-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def chat_completion_chunks(payload, content):
+    """The chat.completion.chunk events for streaming `content` word by word."""
+    full = chat_completion(payload, content)
+    base = {"id": full["id"], "object": "chat.completion.chunk", "created": full["created"], "model": full["model"]}
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == len(words) - 1 else word + " "}
+        if i == 0:
+            delta["role"] = "assistant"
+        yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+    yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (payload.get("stream_options") or {}).get("include_usage"):
+        yield {**base, "choices": [], "usage": full["usage"]}
@@ -0,0 +1,126 @@
+"""Local stub websites for exercising the crawler without touching the network.
+
+Each stub site runs on its own port so it counts as a separate host for the
+crawler's per-host politeness limits.
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = (
+    "We are a family-owned food business serving fresh baked goods, catering trays and "
+    "seasonal specials to customers across the region. "
+)
+
+# Paths each stub site serves; everything else is a 404
+DEFAULT_PAGES = {
+    "/": "Welcome home",
+    "/about-us": "About our company",
+    "/our-products": "Our products",
+    "/services": "Catering services",
+}
+
+
+def render_page(title, repeat=8, nav_links=None, footer_links=None):
+    """Render a stub page; nav/footer links are lists of (href, anchor text)."""
+    nav = "".join(f'<a href="{href}">{text}</a>' for href, text in nav_links or [])
+    footer = "".join(f'<a href="{href}">{text}</a>' for href, text in footer_links or [])
+    body = f"<h1>{title}</h1>" + "".join(f"<p>{FILLER}</p>" for _ in range(repeat))
+    return (
+        f"<html><head><title>{title}</title></head><body>"
+        f"<nav>{nav}</nav><main>{body}</main><footer>{footer}</footer></body></html>"
+    )
+
+
+def make_handler(pages, latency, counter):
+    class StubSiteHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with counter["lock"]:
+                counter["requests"] += 1
+            if latency:
+                time.sleep(latency)
+            path = self.path.split("?")[0].rstrip("/") or "/"
+            page = pages.get(path)
+            if page is None:
+                self._send(404, "text/html; charset=utf-8", b"<html><body>Not found</body></html>")
+                return
+            content_type, body = page if isinstance(page, tuple) else ("text/html; charset=utf-8", page)
+            body = body.encode("utf-8")
+            etag = '"%s"' % hashlib.md5(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, content_type, b"", etag)
+                return
+            self._send(200, content_type, body, etag)
+
+        def _send(self, status, content_type, body, etag=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            if etag:
+                self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client cancelled the probe mid-response
+
+        def log_message(self, *args):
+            pass
+
+    return StubSiteHandler
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # default backlog of 5 would throttle concurrent probes
+
+    def handle_error(self, request, client_address):
+        pass  # Cancelled probes drop connections; that's expected here
+
+
+class StubSites:
+    """Start stub sites on localhost; use as a context manager.
+
+    Every site serves `pages` ({path: html or (content_type, body)}), unless
+    `site_pages` gives one such dict per site.
+    """
+
+    def __init__(self, n_sites=10, latency=0.02, pages=None, site_pages=None):
+        pages = pages or {path: render_page(title) for path, title in DEFAULT_PAGES.items()}
+        self.site_pages = site_pages or [pages] * n_sites
+        self.latency = latency
+        self.counter = {"requests": 0, "lock": threading.Lock()}
+        self.servers = []
+        self.urls = []
+
+    @property
+    def requests(self):
+        return self.counter["requests"]
+
+    def __enter__(self):
+        for pages in self.site_pages:
+            server = QuietHTTPServer(("127.0.0.1", 0), make_handler(pages, self.latency, self.counter))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.servers.append(server)
+            self.urls.append(f"http://127.0.0.1:{server.server_address[1]}")
+        return self
+
+    def __exit__(self, *exc):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    with StubSites(n_sites=3, latency=0) as sites:
+        print("Serving stub sites (Ctrl+C to stop):")
+        for url in sites.urls:
+            print(f"  {url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -1,8 +1,10 @@
 import os
-import json
 import smtplib
+from email.utils import make_msgid
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from agent.artifact_store import get_artifact_store
+from agent.lead_store import get_lead_store
 from utils.logger import logger
 from dotenv import load_dotenv
 
@@ -13,22 +15,23 @@ SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")  # Your sender email
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")  # App password or real password (if less secure apps enabled)
-EMAILS_DIR = "data/emails"
-LEADS_FILE = "data/leads_parsed.json"
+EMAILS = "emails"  # Artifact store stage holding the written emails
 LIMIT = 10  # 🔁 Only send to this many leads
 
 # === Load leads ===
-def load_leads():
-    with open(LEADS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def load_leads(lead_keys=None):
+    store = get_lead_store()
+    return store.iter_leads() if lead_keys is None else store.iter_leads_by_key(lead_keys)
 
 # === Send one email ===
-def send_email(to_email, subject, body, lead_id=None):
+def send_email(to_email, subject, body, lead_id=None, message_id=None):
     try:
         msg = MIMEMultipart()
         msg["From"] = EMAIL_ADDRESS
         msg["To"] = to_email
         msg["Subject"] = subject
+        if message_id:
+            msg["Message-ID"] = message_id
 
         msg.attach(MIMEText(body, "plain"))
 
@@ -44,35 +47,40 @@ def send_email(to_email, subject, body, lead_id=None):
         return False
 
 # === Load and Send All Emails (with LIMIT) ===
-def send_all_emails():
-    leads = load_leads()
-    count = 0
+def send_all_emails(lead_keys=None):
+    """Send the written emails (only to `lead_keys` when given); returns the lead keys sent to."""
+    store = get_lead_store()
+    artifacts = get_artifact_store()
+    leads = load_leads(lead_keys)
+    sent = []
 
     for lead in leads:
-        if LIMIT is not None and count >= LIMIT:
+        if LIMIT is not None and len(sent) >= LIMIT:
             break
 
         company_name = lead["company_name"]
         contact_email = lead["contact_email"]
+        safe_name = lead["lead_key"]
 
         if not contact_email:
             logger.warning(f"⚠️ No email for {company_name}, skipping.")
             continue
 
-        safe_name = company_name.lower().replace(" ", "_").replace("/", "_")
-        email_file = os.path.join(EMAILS_DIR, f"{safe_name}.txt")
+        email_body = artifacts.get(EMAILS, safe_name)
 
-        if not os.path.exists(email_file):
+        if email_body is None:
             logger.warning(f"⚠️ No email content found for {company_name}, skipping.")
             continue
 
-        with open(email_file, "r", encoding="utf-8") as f:
-            email_body = f.read()
-
         subject = f"Packaging Solutions for {company_name} [LeadID: {safe_name}]"
 
-        if send_email(contact_email, subject, email_body, lead_id=safe_name):
-            count += 1
+        # Recorded so replies (In-Reply-To / References) map straight back to this lead
+        message_id = make_msgid(domain=(EMAIL_ADDRESS or "localhost").rsplit("@", 1)[-1])
+        if send_email(contact_email, subject, email_body, lead_id=safe_name, message_id=message_id):
+            store.record_message(safe_name, message_id)
+            sent.append(safe_name)
+
+    return sent
 
 # === Run as script ===
 if __name__ == "__main__":
@@ -1,133 +1,176 @@
 import os
-import json
+import asyncio
 import datetime
 import openai
 from dotenv import load_dotenv
+from tqdm import tqdm
+from utils import llm_client, reply_schema
+from utils.llm_scheduler import RateLimitedScheduler
 from utils.logger import logger
 from utils.prompts import REPLY_ANALYSIS_PROMPT
-from agent.memory_manager import update_conversation, mark_as_manual
+from agent.artifact_store import get_artifact_store
+from agent.lead_profile import get_profile, profile_text
+from agent.memory_manager import get_store
+from agent import reply_classifier
 
 # === Setup ===
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-EMAILS_DIR = "data/emails"
-REPLIES_DIR = "data/replies"
-MAX_ANALYSIS = 10  # Set how many leads to process
-
-# === Loaders ===
-def load_sent_emails():
-    emails = {}
-    for fname in os.listdir(EMAILS_DIR):
-        if fname.endswith(".txt"):
-            lead_id = fname.replace(".txt", "")
-            with open(os.path.join(EMAILS_DIR, fname), "r", encoding="utf-8") as f:
-                emails[lead_id] = f.read()
-    return emails
-
-def load_simulated_replies():
-    replies = {}
-    for fname in os.listdir(REPLIES_DIR):
-        if fname.endswith(".txt"):
-            lead_id = fname.replace(".txt", "")
-            with open(os.path.join(REPLIES_DIR, fname), "r", encoding="utf-8") as f:
-                replies[lead_id] = f.read()
-    return replies
+EMAILS = "emails"  # Artifact store stages read and written here
+REPLIES = "replies"
+ANALYZED = "analyzed_replies"
+ANALYSIS_BUDGET = 10  # 💸 Max replies analyzed (sent to GPT) per run; None analyzes them all
+CONCURRENT = True  # 🚀 Analyze replies concurrently through the rate-limited scheduler
+MAX_CONCURRENCY = 8  # In-flight GPT calls when CONCURRENT
+SKIP_ANALYZED = True  # ⏩ Skip replies whose analysis is newer than both the sent email and the reply
+WRITE_BATCH = 25  # Conversations written to the memory store per transaction
 
 # === GPT Analyzer ===
-def gpt_analyze_reply(sent_email: str, reply: str) -> dict:
+def analysis_messages(sent_email: str, reply: str, lead_id: str = None) -> list:
     email_history = f"agent: {sent_email}\n\nlead: {reply}"
-    prompt = REPLY_ANALYSIS_PROMPT.format(email_history=email_history)
+    prompt = REPLY_ANALYSIS_PROMPT.format(email_history=email_history,
+                                          lead_profile=profile_text(get_profile(lead_id) if lead_id else None))
+    return [
+        {"role": "system", "content": "Respond ONLY with a valid JSON object as specified in the prompt."},
+        {"role": "user", "content": prompt}
+    ]
 
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Respond ONLY with a valid JSON object as specified in the prompt."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=400
-        )
-        raw = response.choices[0].message.content.strip()
 
-        # Clean triple backtick wrappers
-        if raw.startswith("```json"):
-            raw = raw[7:]
-        if raw.endswith("```"):
-            raw = raw[:-3]
-        raw = raw.strip()
+def gpt_analyze_reply(sent_email: str, reply: str, lead_id: str = None) -> dict:
+    local = reply_classifier.local_analysis(reply)
+    if local:
+        return local
+    return reply_schema.analyze_reply(analysis_messages(sent_email, reply, lead_id))
+
 
-        logger.info(f"📥 Cleaned GPT reply:\n{raw}")
-        return json.loads(raw)
-    except Exception as e:
-        logger.error(f"❌ GPT analysis failed: {e}")
-        return {"should_continue": False, "next_reply": None}
+async def gpt_analyze_reply_async(client, scheduler, sent_email: str, reply: str, lead_id: str = None) -> dict:
+    local = reply_classifier.local_analysis(reply)
+    if local:
+        return local
+    return await reply_schema.analyze_reply_async(client, scheduler, analysis_messages(sent_email, reply, lead_id))
 
 # === Helper: Save Analysis ===
 
 def save_analysis_result(lead_id: str, analysis: dict):
-    os.makedirs("data/analyzed_replies", exist_ok=True)
-    file_path = os.path.join("data/analyzed_replies", f"{lead_id}.json")
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(analysis, f, indent=2, ensure_ascii=False)
-
-# === Main ===
-def run_analysis():
-    sent_emails = load_sent_emails()
-    simulated_replies = load_simulated_replies()
-    processed = 0
-
-    for lead_id in sent_emails:
-        if lead_id not in simulated_replies:
+    get_artifact_store().put(ANALYZED, lead_id, analysis)
+
+
+def is_analyzed(lead_id: str) -> bool:
+    """True if the saved analysis is newer than the sent email and the reply it was made from."""
+    store = get_artifact_store()
+    analyzed_at = store.updated_at(ANALYZED, lead_id)
+    if analyzed_at is None:
+        return False
+    return all((store.updated_at(stage, lead_id) or 0) <= analyzed_at for stage in (EMAILS, REPLIES))
+
+
+def conversation_update(sent: str, reply: str, analysis: dict) -> tuple:
+    """(conversation, metadata) to store for an analyzed reply."""
+    now = str(datetime.datetime.utcnow())
+    conversation = [
+        {"sender": "agent", "content": sent, "timestamp": now},
+        {"sender": "lead", "content": reply, "timestamp": now}
+    ]
+    if analysis.get("should_continue"):
+        conversation.append({"sender": "agent", "content": analysis.get("next_reply", ""), "timestamp": now})
+    return conversation, {
+        "last_transaction_type": "sent_email" if analysis.get("should_continue") else "received_email",
+        "turned_to_manual": not analysis.get("should_continue"),
+        "turned_to_manual_at": now if not analysis.get("should_continue") else None
+    }
+
+
+def load_analysis_jobs(budget=None):
+    """(lead_id, sent, reply) for replies that still need analysis, at most `budget` (default ANALYSIS_BUDGET)."""
+    budget = ANALYSIS_BUDGET if budget is None else budget
+    store = get_artifact_store()
+    jobs, skipped = [], 0
+    for lead_id in store.keys(EMAILS):  # only the leads that become jobs have their texts read
+        if not store.has(REPLIES, lead_id):
             logger.warning(f"⚠️ No simulated reply found for lead: {lead_id}")
             continue
-
-        if processed >= MAX_ANALYSIS:
-            logger.info(f"✅ Limit of {MAX_ANALYSIS} leads reached. Stopping.")
+        if SKIP_ANALYZED and is_analyzed(lead_id):
+            skipped += 1
+            continue
+        if budget is not None and len(jobs) >= budget:
+            logger.info(f"✅ Analysis budget of {budget} replies reached; the rest wait for the next run.")
             break
+        jobs.append((lead_id, store.get(EMAILS, lead_id), store.get(REPLIES, lead_id)))
+    if skipped:
+        logger.info(f"⏩ Skipped {skipped} replies already analyzed.")
+    return jobs
 
-        sent = sent_emails[lead_id]
-        reply = simulated_replies[lead_id]
 
-        logger.info(f"🔍 Analyzing reply for: {lead_id}")
-        analysis = gpt_analyze_reply(sent, reply)
-        save_analysis_result(lead_id, analysis)
-
-        # Build conversation
-        conversation = [
-            {
-                "sender": "agent",
-                "content": sent,
-                "timestamp": str(datetime.datetime.utcnow())
-            },
-            {
-                "sender": "lead",
-                "content": reply,
-                "timestamp": str(datetime.datetime.utcnow())
-            }
-        ]
+class AnalysisWriter:
+    """Buffers analyzed replies and writes them WRITE_BATCH at a time: one memory-store
+    transaction, then the saved analyses, which mark the replies done for the next run."""
+
+    def __init__(self, batch_size: int = WRITE_BATCH):
+        self.batch_size = batch_size
+        self.pending = []
 
+    def add(self, lead_id: str, sent: str, reply: str, analysis: dict):
+        if analysis.get("intent") == reply_schema.ANALYSIS_ERROR["intent"]:  # not saved, so retried next run
+            return
         if not analysis.get("should_continue"):
             logger.info(f"🛑 Conversation for {lead_id} marked for manual handling.")
-            mark_as_manual(lead_id)
         else:
-            followup = analysis.get("next_reply", "")
-            logger.info(f"🤖 GPT suggests reply:\n{followup}")
-            conversation.append({
-                "sender": "agent",
-                "content": followup,
-                "timestamp": str(datetime.datetime.utcnow())
-            })
-
-        # Save conversation state
-        update_conversation(lead_id, conversation, {
-            "last_transaction_type": "sent_email" if analysis.get("should_continue") else "received_email",
-            "turned_to_manual": not analysis.get("should_continue"),
-            "turned_to_manual_at": str(datetime.datetime.utcnow()) if not analysis.get("should_continue") else None
-        })
-
-        processed += 1
+            logger.info(f"🤖 GPT suggests reply for {lead_id}:\n{analysis.get('next_reply', '')}")
+        self.pending.append((lead_id, sent, reply, analysis))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        get_store().update_many(
+            (lead_id, *conversation_update(sent, reply, analysis)) for lead_id, sent, reply, analysis in self.pending
+        )
+        for lead_id, _, _, analysis in self.pending:
+            save_analysis_result(lead_id, analysis)
+        self.pending = []
+
+
+# === Main ===
+def run_analysis(budget=None):
+    if CONCURRENT:
+        return asyncio.run(run_analysis_async(budget=budget))
+
+    writer = AnalysisWriter()
+    for lead_id, sent, reply in load_analysis_jobs(budget):
+        logger.info(f"🔍 Analyzing reply for: {lead_id}")
+        writer.add(lead_id, sent, reply, gpt_analyze_reply(sent, reply, lead_id))
+    writer.flush()
+    logger.info(f"⚡ Reply pre-classifier: {reply_classifier.stats}")
+    reply_schema.log_stats()
+    llm_client.log_cache_stats()
+
+
+async def run_analysis_async(client=None, scheduler=None, budget=None):
+    """Concurrent analyzer; `client` is any AsyncOpenAI-compatible client (e.g. pointed at a fake server)."""
+    client = client or openai.AsyncOpenAI(api_key=openai.api_key, max_retries=0)
+    scheduler = scheduler or RateLimitedScheduler(max_concurrency=MAX_CONCURRENCY)
+    jobs = load_analysis_jobs(budget)
+    writer = AnalysisWriter()
+    progress = tqdm(total=len(jobs), desc="Analyzing replies")
+
+    async def analyze_one(lead_id, sent, reply):
+        analysis = await gpt_analyze_reply_async(client, scheduler, sent, reply, lead_id)
+        writer.add(lead_id, sent, reply, analysis)  # runs on the event loop thread, so no lock needed
+        progress.update(1)
+
+    try:
+        await asyncio.gather(*[analyze_one(*job) for job in jobs])
+    finally:
+        writer.flush()
+        progress.close()
+    logger.info(f"📊 Scheduler: {scheduler.stats}")
+    logger.info(f"⚡ Reply pre-classifier: {reply_classifier.stats}")
+    reply_schema.log_stats()
+    llm_client.log_cache_stats()
+    return len(jobs)
+
 
 if __name__ == "__main__":
     run_analysis()
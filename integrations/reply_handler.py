@@ -1,14 +1,17 @@
 import os
 import datetime
 import base64
-import json
 import openai
 from email import message_from_bytes
 from dotenv import load_dotenv
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
-from agent.memory_manager import get_conversation, update_conversation, mark_as_manual
+from agent.lead_profile import get_profile, profile_text
+from agent.lead_store import get_lead_store, message_ids_in
+from agent.reply_classifier import local_analysis
+from agent.memory_manager import HISTORY_MESSAGES, append_messages, get_conversation, mark_as_manual
+from utils import reply_schema
 from utils.logger import logger
 from utils.prompts import REPLY_ANALYSIS_PROMPT
 
@@ -34,6 +37,8 @@ def fetch_recent_replies(service, query="is:inbox is:unread"):
         headers = msg_data['payload']['headers']
         subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
         from_email = next((h['value'] for h in headers if h['name'] == 'From'), '')
+        in_reply_to = next((h['value'] for h in headers if h['name'].lower() == 'in-reply-to'), '')
+        references = next((h['value'] for h in headers if h['name'].lower() == 'references'), '')
         parts = msg_data['payload'].get('parts', [])
         payload = msg_data['payload'].get('body', {})
         body_data = None
@@ -51,63 +56,58 @@ def fetch_recent_replies(service, query="is:inbox is:unread"):
             replies.append({
                 "from": from_email,
                 "subject": subject,
+                # Message-IDs this replies to: the direct parent first, then the thread newest first
+                "message_ids": message_ids_in(in_reply_to) + message_ids_in(references)[::-1],
                 "body": decoded.strip()
             })
 
     return replies
 
 # === GPT-4o Intent Analysis ===
-def gpt_analyze_reply(conversation_history, latest_reply):
+def gpt_analyze_reply(conversation_history, latest_reply, lead_id=None):
+    local = local_analysis(latest_reply)
+    if local:
+        return local
     formatted_history = "\n\n".join([f"{msg['sender']}: {msg['content']}" for msg in conversation_history])
-    prompt = REPLY_ANALYSIS_PROMPT.format(email_history=formatted_history, latest_reply=latest_reply)
-
-    try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            max_tokens=400
-        )
-        return json.loads(response.choices[0].message.content)
-    except Exception as e:
-        logger.error(f"GPT analysis failed: {e}")
-        return {
-            "intent": "error",
-            "should_continue": False,
-            "next_reply": None
-        }
+    prompt = REPLY_ANALYSIS_PROMPT.format(email_history=formatted_history, latest_reply=latest_reply,
+                                          lead_profile=profile_text(get_profile(lead_id) if lead_id else None))
+    return reply_schema.analyze_reply([{"role": "user", "content": prompt}])
 
 # === Handler ===
 def handle_incoming_reply(lead_id: str, incoming_text: str):
+    """Return the follow-up to send, "" if the thread went manual, or None if the analysis
+    failed and the reply was left unrecorded for the next run to retry."""
     logger.info(f"📨 New reply received for lead: {lead_id}")
-    conversation = get_conversation(lead_id)
-    conversation.append({
+    conversation = get_conversation(lead_id, last_n=HISTORY_MESSAGES)
+    incoming = {
         "sender": "lead",
         "content": incoming_text,
         "timestamp": str(datetime.datetime.utcnow())
-    })
+    }
+    conversation.append(incoming)
 
-    result = gpt_analyze_reply(conversation, incoming_text)
+    result = gpt_analyze_reply(conversation, incoming_text, lead_id)
+    if result.get("intent") == reply_schema.ANALYSIS_ERROR["intent"]:  # not recorded, so retried next run
+        logger.warning(f"⚠️ Could not analyze reply from {lead_id}, leaving it for the next run.")
+        return None
 
     if not result["should_continue"]:
         logger.info(f"🛑 Marking thread for {lead_id} as manual.")
         mark_as_manual(lead_id)
-        update_conversation(lead_id, conversation, {
+        append_messages(lead_id, [incoming], {
             "last_transaction_type": "received_email",
             "turned_to_manual": True,
             "turned_to_manual_at": str(datetime.datetime.utcnow())
         })
-        return
+        return ""
 
     reply_text = result["next_reply"]
     logger.info(f"🤖 GPT suggests follow-up for {lead_id}: {reply_text}")
-    conversation.append({
+    append_messages(lead_id, [incoming, {
         "sender": "agent",
         "content": reply_text,
         "timestamp": str(datetime.datetime.utcnow())
-    })
-
-    update_conversation(lead_id, conversation, {
+    }], {
         "last_transaction_type": "sent_email"
     })
 
@@ -117,16 +117,22 @@ def handle_incoming_reply(lead_id: str, incoming_text: str):
 if __name__ == "__main__":
     gmail = get_gmail_service()
     incoming = fetch_recent_replies(gmail)
+    store = get_lead_store()
 
     for reply in incoming:
-        from_email = reply["from"]
         reply_body = reply["body"]
 
-        # Derive lead_id from email address for simplicity
-        lead_id = from_email.split('@')[0].lower().replace(".", "_").replace("-", "_")
+        # Thread headers, subject tag, sender email, then sender domain (see LeadStore.resolve_reply)
+        lead = store.resolve_reply(reply["from"], reply["message_ids"], reply["subject"])
+        if not lead:
+            logger.warning(f"⚠️ No lead found for reply from {reply['from']} ({reply['subject']!r}), skipping.")
+            continue
+        lead_id = lead["lead_key"]
 
         followup = handle_incoming_reply(lead_id, reply_body)
         if followup:
             print(f"✅ GPT Response for {lead_id}:\n{followup}\n")
+        elif followup is None:
+            print(f"⏳ {lead_id} left unprocessed, will retry next run.")
         else:
             print(f"🛑 {lead_id} marked as manual.")
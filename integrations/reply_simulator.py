@@ -2,29 +2,21 @@ import os
 import openai
 import random
 from dotenv import load_dotenv
+from agent.artifact_store import get_artifact_store
+from utils import llm_client
 from utils.logger import logger
 
 # Load environment variables and OpenAI key
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-EMAILS_DIR = "data/emails"
-REPLIES_DIR = "data/replies"
+EMAILS = "emails"  # Artifact store stages read and written here
+REPLIES = "replies"
 MAX_LEADS = 6  # Set a limit for simulation runs
 
-# Ensure replies directory exists
-os.makedirs(REPLIES_DIR, exist_ok=True)
-
-# Load all previously sent emails
-def load_sent_emails():
-    email_data = {}
-    for fname in os.listdir(EMAILS_DIR):
-        if fname.endswith(".txt"):
-            lead_id = fname.replace(".txt", "")
-            with open(os.path.join(EMAILS_DIR, fname), "r", encoding="utf-8") as f:
-                content = f.read()
-                email_data[lead_id] = content
-    return email_data
+# Iterate previously sent emails as (lead_id, email), only those of `lead_keys` when given
+def iter_sent_emails(lead_keys=None):
+    return get_artifact_store().items(EMAILS, lead_keys)
 
 # Simulate customer reply using GPT
 def simulate_reply(sent_email: str) -> str:
@@ -48,13 +40,14 @@ Make sure your reply feels like a real B2B message, not fictional or dramatic. I
 Only output the reply text — do not label the tone or explain anything.
 """
     try:
-        response = openai.chat.completions.create(
+        # Simulated replies should vary between runs, so never served from the cache
+        reply = llm_client.chat(
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
+            cache=False,
             temperature=0.8,
             max_tokens=200
-        )
-        reply = response.choices[0].message.content.strip()
+        ).strip()
         return reply
     except Exception as e:
         logger.error(f"❌ GPT simulation failed: {e}")
@@ -62,16 +55,15 @@ Only output the reply text — do not label the tone or explain anything.
 
 # Save simulated reply
 def save_simulated_reply(lead_id: str, reply: str):
-    path = os.path.join(REPLIES_DIR, f"{lead_id}.txt")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(reply)
+    get_artifact_store().put(REPLIES, lead_id, reply)
 
 # Main loop
-def run_simulator():
-    sent_emails = load_sent_emails()
+def run_simulator(lead_keys=None):
+    """Simulate replies to the sent emails (only `lead_keys` when given); returns the lead ids replied to."""
     processed = 0
+    simulated = []
 
-    for lead_id, sent_email in sent_emails.items():
+    for lead_id, sent_email in iter_sent_emails(lead_keys):
         if processed >= MAX_LEADS:
             logger.info(f"✅ Limit of {MAX_LEADS} leads reached. Stopping.")
             break
@@ -82,10 +74,13 @@ def run_simulator():
         if reply:
             logger.info(f"📨 Simulated reply:\n{reply}")
             save_simulated_reply(lead_id, reply)
+            simulated.append(lead_id)
         else:
             logger.warning(f"⚠️ Skipped {lead_id} due to simulation failure.")
 
         processed += 1
 
+    return simulated
+
 if __name__ == "__main__":
     run_simulator()
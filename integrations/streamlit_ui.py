@@ -3,14 +3,15 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import streamlit as st
 import pandas as pd
-import random
 import json
-import glob
 from dotenv import load_dotenv
-from agent.catalog_loader import load_product_catalog, save_parsed_catalog
-from agent.lead_loader import load_leads, save_parsed_leads
+from agent.artifact_store import get_artifact_store
+from agent.catalog_loader import ingest_catalog
+from agent.ingest import read_header
+from agent.lead_loader import ingest_leads
 from agent.product_matcher import match_products_to_leads
-from agent.email_writer import main as email_writer
+from agent.email_writer import iter_emails
+from agent.memory_manager import AWAITING_REPLY_DAYS, awaiting_reply, status_counts
 from integrations.email_sender import send_all_emails as email_sender
 from integrations.reply_analyzer import run_analysis as reply_analyzer
 from integrations.reply_simulator import run_simulator as reply_simulator
@@ -18,16 +19,11 @@ from agent.web_crawler import crawl_leads as web_crawler
 
 load_dotenv()
 
-# --- Auto-load Excel files from disk if present ---
-#if os.path.exists("data/product_info.xlsx") and os.path.exists("data/leads_info.xlsx"):
- #   st.session_state.catalog_df = pd.read_excel("data/product_info.xlsx")
-  #  st.session_state.leads_df = pd.read_excel("data/leads_info.xlsx")
-
 # Initialize session state variables
-if "catalog_df" not in st.session_state:
-    st.session_state.catalog_df = None
-if "leads_df" not in st.session_state:
-    st.session_state.leads_df = None
+if "catalog_columns" not in st.session_state:
+    st.session_state.catalog_columns = None
+if "leads_columns" not in st.session_state:
+    st.session_state.leads_columns = None
 if "matches" not in st.session_state:
     st.session_state.matches = []
 if "selected_lead_index" not in st.session_state:
@@ -59,20 +55,17 @@ if leads_file and not st.session_state.crawler_ran:
     leads_path = "data/leads_info.xlsx"   
     if os.path.exists(catalog_path) and os.path.exists(leads_path):
 
-        catalog = load_product_catalog(catalog_path)
-        save_parsed_catalog(catalog)
-
-        leads = load_leads(leads_path)
-        save_parsed_leads(leads)
+        product_count = ingest_catalog(catalog_path)
+        lead_count = ingest_leads(leads_path)
 
         web_crawler()  # Run web crawler to fetch website content
 
-         # ✅ Update session state
-        st.session_state.catalog_df = pd.read_excel(catalog_path)
-        st.session_state.leads_df = pd.read_excel(leads_path)
+         # ✅ Update session state (header row only; the rows were upserted into the lead store above)
+        st.session_state.catalog_columns = read_header(catalog_path)
+        st.session_state.leads_columns = read_header(leads_path)
         st.session_state.crawler_ran = True
 
-        st.success("✅ Catalog and Leads successfully parsed and saved to JSON.")
+        st.success(f"✅ Parsed {product_count} products and {lead_count} leads into the lead store.")
     else:
         st.error("❌ Required Excel files not found in `data/` directory.")
 
@@ -80,21 +73,21 @@ if leads_file and not st.session_state.crawler_ran:
 # --- Debug: Show Columns in Catalog and Leads DataFrames ---
 
 if st.button("Show Catalog and Leads Columns"):
-    if st.session_state.catalog_df is not None:
-        st.write("Catalog columns:", st.session_state.catalog_df.columns.tolist())
+    if st.session_state.catalog_columns is not None:
+        st.write("Catalog columns:", st.session_state.catalog_columns)
     else:
-        st.write("Catalog DataFrame is empty.")
+        st.write("Catalog is not loaded.")
 
-    if st.session_state.leads_df is not None:
-        st.write("Leads columns:", st.session_state.leads_df.columns.tolist())
+    if st.session_state.leads_columns is not None:
+        st.write("Leads columns:", st.session_state.leads_columns)
     else:
-        st.write("Leads DataFrame is empty.")
+        st.write("Leads are not loaded.")
 
 # --- Step 2: Match Products to Leads ---
 
 st.header("2. Match Products to Leads")
 
-if st.session_state.catalog_df is None or st.session_state.leads_df is None:
+if st.session_state.catalog_columns is None or st.session_state.leads_columns is None:
     st.warning("Please load both catalog and leads first.")
 else:
     if st.button("Run Product Matching"):
@@ -102,7 +95,7 @@ else:
             try:
                 from agent.product_matcher import match_products_to_leads
                 match_products_to_leads()
-                st.success("✅ Product matching completed. Results saved in `data/match_results/`.")
+                st.success("✅ Product matching completed. Results saved in the artifact store (`match_results`).")
             except Exception as e:
                 st.error(f"❌ Error during product matching: {e}")
 
@@ -110,14 +103,29 @@ else:
 
 st.header("3. Generate Outreach Emails")
 
-if not os.path.exists("data/match_results"):
-    st.warning("Please run product matching first to generate leads.")
+artifacts = get_artifact_store()
+
+if not artifacts.count("match_results"):
+    st.warning("Please run product matching first to generate leads "
+               "(results from before the artifact store: run `python main.py migrate-artifacts`).")
 else:
     if st.button("Generate Emails"):
         try:
-            with st.spinner("Generating emails using email_writer.main()..."):
-                email_writer()
-            st.success("✅ Emails generated successfully!")
+            status = st.empty()
+            live = {}  # company -> placeholder its email streams into
+
+            def render_token(company, text):
+                if company not in live:
+                    st.subheader(company)
+                    live[company] = st.empty()
+                live[company].text(text)
+
+            done = 0
+            for company, email in iter_emails(on_token=render_token):
+                done += 1
+                render_token(company, email)
+                status.info(f"✉️ {done} emails generated, latest: {company}")
+            status.success(f"✅ {done} emails generated successfully!")
         except Exception as e:
             st.error(f"❌ Error generating emails: {e}")
             
@@ -126,7 +134,7 @@ else:
 
 st.header("4. Simulate and Classify Reply")
 
-if not os.path.exists("data/emails"):
+if not artifacts.count("emails"):
     st.warning("Please run product matching first to generate leads.")
 else:
     if st.button("Simulate and Classify Reply"):
@@ -138,7 +146,7 @@ else:
 # --- Step 5: Send Emails to All Leads ---
 st.header("5. Send Emails to All Leads")
 
-if not os.path.exists("data/emails"):
+if not artifacts.count("emails"):
     st.warning("Please run product matching first to generate leads.")
 else:
     if st.button("Send Emails to All Leads"):
@@ -149,50 +157,62 @@ else:
 st.header("6. Show Random Lead Interaction")
 
 if st.button("Show Random Results"):
-    match_files = glob.glob("data/match_results/*.json")
-    if not match_files:
-        st.warning("No match results found in data/match_results/")
+    # Random pick straight off the artifact index, then one keyed read per stage
+    company_name = artifacts.random_key("match_results")
+    if company_name is None:
+        st.warning("No match results found in the artifact store; to import older per-lead files, run `python main.py migrate-artifacts`.")
     else:
-        random_file = random.choice(match_files)
-        company_name = os.path.splitext(os.path.basename(random_file))[0]
         st.subheader(f"🧠 Company: {company_name}")
 
         # Load and show matched product info
-        product_path = f"data/match_results/{company_name}.json"
-        if os.path.exists(product_path):
-            with open(product_path, "r", encoding="utf-8") as f:
-                product_text = f.read()
+        product_data = artifacts.get("match_results", company_name)
+        if product_data is not None:
             st.markdown("### Match Products")
-            st.text_area("Products", product_text, height=250)
+            st.text_area("Products", json.dumps(product_data, indent=2, ensure_ascii=False), height=250)
         else:
             st.info("Product not found for this company.")
 
         # Load and show generated email
-        email_path = f"data/emails/{company_name}.txt"
-        if os.path.exists(email_path):
-            with open(email_path, "r", encoding="utf-8") as f:
-                email_text = f.read()
+        email_text = artifacts.get("emails", company_name)
+        if email_text is not None:
             st.markdown("### 📧 Generated Email")
             st.text_area("Email", email_text, height=250)
         else:
             st.info("Email not found for this company.")
 
         # Load and show simulated reply
-        reply_path = f"data/replies/{company_name}.txt"
-        if os.path.exists(reply_path):
-            with open(reply_path, "r", encoding="utf-8") as f:
-                reply_text = f.read()
+        reply_text = artifacts.get("replies", company_name)
+        if reply_text is not None:
             st.markdown("### 🤖 Simulated Reply")
             st.text_area("Reply", reply_text, height=250)
         else:
             st.info("Simulated reply not found.")
 
         # Load and show analyzed reply
-        analysis_path = f"data/analyzed_replies/{company_name}.json"
-        if os.path.exists(analysis_path):
-            with open(analysis_path, "r", encoding="utf-8") as f:
-                analysis_data = json.load(f)
+        analysis_data = artifacts.get("analyzed_replies", company_name)
+        if analysis_data is not None:
             st.markdown("### 🧪 Reply Analysis")
             st.json(analysis_data)
         else:
-            st.info("Reply analysis not found.")
\ No newline at end of file
+            st.info("Reply analysis not found.")
+
+# --- Step 7: Lead Status Dashboard ---
+st.header("7. Lead Status Dashboard")
+
+counts = status_counts()
+if not counts["total"]:
+    st.info("No conversations recorded yet.")
+else:
+    cols = st.columns(2 + len(counts["by_type"]))
+    cols[0].metric("Leads", counts["total"])
+    cols[1].metric("Manual", counts["manual"])
+    for col, (transaction_type, leads) in zip(cols[2:], sorted(counts["by_type"].items(), key=lambda kv: -kv[1])):
+        col.metric(transaction_type or "no activity", leads)
+
+    days = st.number_input("Awaiting reply for at least (days)", min_value=0, value=AWAITING_REPLY_DAYS)
+    page = st.number_input("Page", min_value=1, value=1)
+    waiting = awaiting_reply(days, limit=50, offset=(page - 1) * 50)
+    if waiting:
+        st.dataframe(pd.DataFrame(waiting))
+    else:
+        st.info("No leads awaiting a reply.")
@@ -0,0 +1,66 @@
+"""Command-line entry point for the sales pipeline.
+
+Usage:
+    python main.py run [--stages crawl,match,email] [--force] [--limit N]
+    python main.py status
+    python main.py reset [--stages match,email]
+    python main.py migrate-artifacts [--backend sharded|packed]
+"""
+import argparse
+
+from agent.artifact_store import BACKENDS, migrate
+from agent.pipeline import DEFAULT_STAGES, STAGES, StageLedger, run_pipeline
+
+
+def parse_stages(value):
+    return [s.strip() for s in value.split(",") if s.strip()] if value else None
+
+
+def show_status(ledger):
+    print(f"{'stage':<10} {'completed leads':>16}")
+    for stage in STAGES:
+        print(f"{stage:<10} {len(ledger.fingerprints(stage)):>16}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the lead → email pipeline incrementally.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the stages whose inputs changed since the last run")
+    run.add_argument("--stages", help=f"Comma-separated subset of {','.join(STAGES)} "
+                                      f"(default: {','.join(DEFAULT_STAGES)})")
+    run.add_argument("--force", action="store_true", help="Ignore recorded fingerprints and redo every lead")
+    run.add_argument("--limit", type=int, help="Max leads per stage this run; the rest wait for the next one")
+
+    sub.add_parser("status", help="Show how many leads each stage has completed")
+
+    reset = sub.add_parser("reset", help="Forget recorded runs so the next run redoes them")
+    reset.add_argument("--stages", help="Comma-separated stages to reset (default: all)")
+
+    artifacts = sub.add_parser("migrate-artifacts",
+                               help="Copy per-lead files into the artifact store, optionally switching its backend")
+    artifacts.add_argument("--backend", choices=sorted(BACKENDS),
+                           help="Convert the store to this backend (packed → packed drops superseded copies)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        for stage, count in run_pipeline(parse_stages(args.stages), args.force, args.limit).items():
+            print(f"{stage:<10} {count:>6} processed")
+        return
+    if args.command == "migrate-artifacts":
+        for stage, count in migrate(args.backend).items():
+            print(f"{stage:<17} {count:>8} artifacts")
+        return
+
+    ledger = StageLedger()
+    try:
+        if args.command == "status":
+            show_status(ledger)
+        else:
+            ledger.reset(parse_stages(args.stages))
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""A failed reply analysis must leave the reply unrecorded, not turn the lead to manual.
+
+Usage: python -m pytest tests/test_reply_handler_errors.py
+"""
+import importlib
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from utils import reply_schema
+
+HANDLERS = ["agent.reply_handler", "integrations.reply_handler"]
+
+
+def load_handler(name, monkeypatch, analysis):
+    if name.startswith("integrations."):
+        pytest.importorskip("googleapiclient")
+    handler = importlib.import_module(name)
+    writes = []
+    monkeypatch.setattr(handler, "get_conversation", lambda lead_id, last_n=None: [])
+    monkeypatch.setattr(handler, "gpt_analyze_reply", lambda *args: dict(analysis))
+    monkeypatch.setattr(handler, "mark_as_manual", lambda lead_id: writes.append(("manual", lead_id)))
+    monkeypatch.setattr(handler, "append_messages", lambda lead_id, messages, metadata=None: writes.append(("append", lead_id)))
+    return handler, writes
+
+
+@pytest.mark.parametrize("name", HANDLERS)
+def test_analysis_error_leaves_reply_for_next_run(name, monkeypatch):
+    handler, writes = load_handler(name, monkeypatch, reply_schema.ANALYSIS_ERROR)
+    assert handler.handle_incoming_reply("kariout", "Could you send a price sheet?") is None
+    assert writes == []
+
+
+@pytest.mark.parametrize("name", HANDLERS)
+def test_not_interested_still_goes_manual(name, monkeypatch):
+    analysis = {"intent": "not_interested", "should_continue": False, "next_reply": None}
+    handler, writes = load_handler(name, monkeypatch, analysis)
+    assert handler.handle_incoming_reply("fiori_bruno_pasta", "Not interested, thanks.") == ""
+    assert writes == [("manual", "fiori_bruno_pasta"), ("append", "fiori_bruno_pasta")]
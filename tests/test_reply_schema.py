@@ -0,0 +1,42 @@
+"""Reply-analysis parsing must refuse output it can only read by guessing how it ended.
+
+Usage: python -m pytest tests/test_reply_schema.py
+"""
+import json
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from utils import reply_schema
+
+TRUNCATED = [
+    '{"intent":"x","should_continue":true,"next_reply":"Thanks for',
+    '```json\n{"intent": "pricing", "meta": {"tone": "warm"}, "should_continue": true, "next_reply": "Hello,\\n\\nWe',
+    '{"intent": "interested", "should_continue": true, "next_reply": "Thanks!"',
+]
+
+
+@pytest.mark.parametrize("raw", TRUNCATED)
+def test_truncated_output_is_refused(raw):
+    assert reply_schema.parse_analysis(raw) is None
+
+
+def test_truncated_completion_leaves_reply_pending(monkeypatch):
+    forgotten = []
+    monkeypatch.setattr(reply_schema.llm_client, "chat", lambda **request: TRUNCATED[0])
+    monkeypatch.setattr(reply_schema.llm_client, "forget", lambda **request: forgotten.append(request))
+    assert reply_schema.analyze_reply([{"role": "user", "content": "Reply?"}]) == reply_schema.ANALYSIS_ERROR
+    assert len(forgotten) == 1
+
+
+def test_complete_output_with_trailing_comma_still_parses():
+    raw = '{"intent": "interested", "should_continue": true, "next_reply": "Pricing attached.",}'
+    assert reply_schema.parse_analysis(raw) == {"intent": "interested", "should_continue": True,
+                                                "next_reply": "Pricing attached."}
+
+
+def test_plain_json_parses():
+    raw = json.dumps({"intent": "not interested", "should_continue": False, "next_reply": None})
+    assert reply_schema.parse_analysis(raw)["should_continue"] is False
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+from typing import Dict, Tuple
+
+import openai
+
+from utils import llm_client
+from utils.logger import logger
+
+# === Config ===
+BATCH_DIR = "data/batches"
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL = 60  # Seconds between status checks; batches take minutes to hours
+MAX_ATTEMPTS = 3  # Items that fail are resubmitted in a new batch up to this many times in total
+MAX_REQUESTS_PER_BATCH = 50000  # OpenAI's per-batch request limit
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def batch_line(custom_id: str, body: Dict) -> Dict:
+    return {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+
+
+def write_batch_file(path: str, requests: Dict[str, Dict]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests.items():
+            f.write(json.dumps(batch_line(custom_id, body), ensure_ascii=False) + "\n")
+
+
+def submit_batch(client, path: str) -> str:
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window=COMPLETION_WINDOW)
+    logger.info(f"📤 Submitted batch {batch.id} ({path})")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id: str, poll_interval: float = POLL_INTERVAL):
+    """Poll until the batch reaches a terminal status; returns the final batch object."""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in TERMINAL_STATUSES:
+            logger.info(f"📥 Batch {batch_id} {batch.status}: {batch.request_counts}")
+            return batch
+        logger.info(f"⏳ Batch {batch_id} {batch.status}: {batch.request_counts}")
+        time.sleep(poll_interval)
+
+
+def read_batch_results(client, batch) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """Split a finished batch into ({custom_id: completion body}, {custom_id: error message})."""
+    succeeded, failed = {}, {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200 and not item.get("error"):
+                succeeded[item["custom_id"]] = response["body"]
+            else:
+                error = item.get("error") or (response.get("body") or {}).get("error") or {}
+                failed[item["custom_id"]] = error.get("message") or f"status {response.get('status_code')}"
+    return succeeded, failed
+
+
+def _state_path(name: str) -> str:
+    return os.path.join(BATCH_DIR, f"{name}_state.json")
+
+
+def _save_state(name: str, batch_ids) -> None:
+    with open(_state_path(name), "w", encoding="utf-8") as f:
+        json.dump({"batch_ids": list(batch_ids)}, f)
+
+
+def _load_state(name: str):
+    if not os.path.exists(_state_path(name)):
+        return []
+    with open(_state_path(name), "r", encoding="utf-8") as f:
+        return json.load(f).get("batch_ids", [])
+
+
+def run_batch(requests: Dict[str, Dict], name: str, client=None, poll_interval: float = POLL_INTERVAL,
+              max_attempts: int = MAX_ATTEMPTS) -> Dict[str, str]:
+    """Run chat requests through the Batch API and return {custom_id: message content}.
+
+    `requests` maps a custom_id to chat.completions params (model, messages, ...),
+    optionally with a `cache` flag as in llm_client.chat(). Cached answers are
+    served without submitting; failed items are resubmitted up to `max_attempts`
+    times and are left out of the result if they never succeed. Submitted batch
+    ids are kept in data/batches/<name>_state.json, so a restarted run picks up
+    its in-flight batches instead of paying for them twice.
+    """
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    client = client or openai.OpenAI(api_key=openai.api_key)
+    store = llm_client.get_cache()
+
+    results, pending, keys = {}, {}, {}
+    for custom_id, request in requests.items():
+        body = dict(request)
+        cacheable = store is not None and llm_client.should_cache(body, body.pop("cache", None))
+        if cacheable:
+            keys[custom_id] = llm_client.request_key(**body)
+            cached = store.get(keys[custom_id])
+            if cached is not None:
+                results[custom_id] = cached
+                continue
+        pending[custom_id] = body
+    if results:
+        logger.info(f"🗃️ {len(results)} of {len(requests)} batch requests served from the LLM cache")
+
+    def collect(batch):
+        succeeded, failed = read_batch_results(client, batch)
+        for custom_id, body in succeeded.items():
+            if custom_id not in pending:
+                continue
+            content = body["choices"][0]["message"]["content"]
+            usage = body.get("usage") and SimpleNamespace(**body["usage"])
+            llm_client.record_usage(body.get("model", ""), usage, log=False)
+            if custom_id in keys and content:
+                store.store(keys[custom_id], body.get("model", ""), content, usage)
+            results[custom_id] = content
+            del pending[custom_id]
+        failed = {custom_id: error for custom_id, error in failed.items() if custom_id in pending}
+        if failed:
+            custom_id, error = next(iter(failed.items()))
+            logger.warning(f"⚠️ {len(failed)} items failed in batch {batch.id} (e.g. {custom_id}: {error})")
+
+    for batch_id in _load_state(name):  # in-flight batches from an interrupted run
+        collect(wait_for_batch(client, batch_id, poll_interval))
+
+    for attempt in range(1, max_attempts + 1):
+        if not pending:
+            break
+        ids = list(pending)
+        batch_ids = []
+        for part, start in enumerate(range(0, len(ids), MAX_REQUESTS_PER_BATCH)):
+            path = os.path.join(BATCH_DIR, f"{name}_{attempt}_{part}.jsonl")
+            write_batch_file(path, {custom_id: pending[custom_id] for custom_id in ids[start:start + MAX_REQUESTS_PER_BATCH]})
+            batch_ids.append(submit_batch(client, path))
+        _save_state(name, batch_ids)
+        for batch_id in batch_ids:
+            collect(wait_for_batch(client, batch_id, poll_interval))
+        if pending and attempt < max_attempts:
+            logger.info(f"🔁 Resubmitting {len(pending)} failed batch items (attempt {attempt + 1}/{max_attempts})")
+
+    if os.path.exists(_state_path(name)):
+        os.remove(_state_path(name))
+    if pending:
+        logger.error(f"❌ {len(pending)} batch items still failing after {max_attempts} attempts")
+    return results
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+import openai
+from dotenv import load_dotenv
+
+from utils.logger import logger
+
+load_dotenv()
+openai.api_key = os.getenv("OPENAI_API_KEY")
+
+# === Config ===
+DB_PATH = "data/llm_cache.sqlite"
+CACHE_ENABLED = True
+CACHE_TTL = 30 * 24 * 3600  # Seconds a cached completion is reused; None keeps entries forever
+MAX_ENTRIES = 20000  # Least recently used completions are evicted beyond this
+CACHE_SAMPLED = False  # Default for temperature > 0 calls when the call site doesn't pass cache=
+
+
+def request_key(model: str, messages: List[Dict], **params) -> str:
+    """Content address of a chat request: model, messages and sampling params."""
+    payload = {"model": model, "messages": messages, "params": params}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Persistent chat-completion cache keyed by request_key().
+
+    Entries older than `ttl` are treated as misses and dropped; once more than
+    `max_entries` are stored the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, ttl: Optional[float] = CACHE_TTL, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            content TEXT,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            created_at REAL,
+            last_used REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used);
+        """)
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "expired": 0, "evicted": 0, "tokens_saved": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, prompt_tokens, completion_tokens, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl is not None and now - row[3] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats["expired"] += 1
+                row = None
+            if not row:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        self.stats["hits"] += 1
+        self.stats["tokens_saved"] += (row[1] or 0) + (row[2] or 0)
+        return row[0]
+
+    def store(self, key: str, model: str, content: str, usage=None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+            INSERT OR REPLACE INTO llm_cache (key, model, content, prompt_tokens, completion_tokens, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                key,
+                model,
+                content,
+                getattr(usage, "prompt_tokens", None),
+                getattr(usage, "completion_tokens", None),
+                now,
+                now,
+            ))
+            evicted = self._conn.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+            """, (self.max_entries,)).rowcount
+            self._conn.commit()
+        self.stats["stored"] += 1
+        self.stats["evicted"] += max(evicted, 0)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_shared_cache = None
+usage_totals = {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+
+
+def record_usage(model: str, usage, log: bool = True) -> None:
+    """Add one API call's token usage to usage_totals (and log it unless `log` is off)."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):  # batch results carry plain dicts
+        details = SimpleNamespace(**details)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    usage_totals["calls"] += 1
+    usage_totals["prompt_tokens"] += prompt
+    usage_totals["cached_prompt_tokens"] += cached
+    usage_totals["completion_tokens"] += completion
+    if log:
+        logger.info(f"🔢 {model}: {prompt} prompt tokens ({cached} cached), {completion} completion tokens")
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Process-wide cache used by every GPT call site (None when CACHE_ENABLED is off)."""
+    global _shared_cache
+    if CACHE_ENABLED and _shared_cache is None:
+        _shared_cache = LLMCache()
+    return _shared_cache if CACHE_ENABLED else None
+
+
+def should_cache(params: Dict, cache: Optional[bool]) -> bool:
+    """Explicit `cache` wins; otherwise only temperature-0 calls (or all, with CACHE_SAMPLED)."""
+    if cache is not None:
+        return cache
+    return params.get("temperature", 1) == 0 or CACHE_SAMPLED
+
+
+def chat(model: str, messages: List[Dict], cache: Optional[bool] = None, **params) -> str:
+    """openai.chat.completions.create through the shared cache; returns the message content.
+
+    Temperature-0 calls are cached by default; sampled calls only when `cache=True`
+    (or CACHE_SAMPLED). Errors propagate to the caller, and failures are never cached.
+    """
+    store = get_cache() if should_cache(params, cache) else None
+    key = request_key(model, messages, **params)
+    if store is not None:
+        cached = store.get(key)
+        if cached is not None:
+            return cached
+    response = openai.chat.completions.create(model=model, messages=messages, **params)
+    content = response.choices[0].message.content
+    record_usage(model, getattr(response, "usage", None))
+    if store is not None and content:
+        store.store(key, model, content, getattr(response, "usage", None))
+    return content
+
+
+def forget(model: str, messages: List[Dict], **params) -> None:
+    """Drop a cached completion the caller couldn't use, so the next identical call asks the API again."""
+    store = get_cache()
+    if store is not None:
+        store.delete(request_key(model, messages, **params))
+
+
+def stream_chat(model: str, messages: List[Dict], cache: Optional[bool] = None, **params) -> Iterator[str]:
+    """Streaming chat(): yields content deltas as they arrive (a cache hit yields the whole text at once).
+
+    The assembled text is cached only if the stream finishes, so an abandoned or
+    failed stream never leaves a truncated completion behind.
+    """
+    store = get_cache() if should_cache(params, cache) else None
+    key = request_key(model, messages, **params)
+    if store is not None:
+        cached = store.get(key)
+        if cached is not None:
+            yield cached
+            return
+    parts = []
+    usage = None
+    stream = openai.chat.completions.create(model=model, messages=messages, stream=True,
+                                            stream_options={"include_usage": True}, **params)
+    for chunk in stream:
+        usage = getattr(chunk, "usage", None) or usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    content = "".join(parts)
+    record_usage(model, usage)
+    if store is not None and content:
+        store.store(key, model, content, usage)
+
+
+async def achat(client, scheduler, model: str, messages: List[Dict], cache: Optional[bool] = None, **params) -> str:
+    """Async chat() via an AsyncOpenAI client; cache hits skip the scheduler's rate limits entirely."""
+    store = get_cache() if should_cache(params, cache) else None
+    key = request_key(model, messages, **params)
+    if store is not None:
+        cached = store.get(key)
+        if cached is not None:
+            return cached
+    response = await scheduler.chat(client, model=model, messages=messages, **params)
+    content = response.choices[0].message.content
+    record_usage(model, getattr(response, "usage", None))
+    if store is not None and content:
+        store.store(key, model, content, getattr(response, "usage", None))
+    return content
+
+
+def log_cache_stats() -> None:
+    if _shared_cache is not None:
+        logger.info(f"🗃️ LLM cache: {_shared_cache.stats} ({len(_shared_cache)} entries)")
+    if usage_totals["calls"]:
+        logger.info(f"🔢 Token usage this run: {usage_totals}")
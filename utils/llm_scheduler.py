@@ -0,0 +1,115 @@
+import asyncio
+import random
+import time
+
+from utils.logger import logger
+
+# === Defaults (gpt-4o tier-1-ish limits; tune to your account) ===
+MAX_CONCURRENCY = 8
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30000
+MAX_RETRIES = 6
+BASE_DELAY = 1.0   # Seconds; doubled per retry before jitter
+MAX_DELAY = 60.0
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "ConnectError", "ReadTimeout"}
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """Cheap prompt+completion token estimate (~4 chars per token) for the TPM bucket."""
+    prompt_chars = sum(len(m.get("content") or "") for m in messages)
+    return prompt_chars // 4 + (max_tokens or 500)
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)  # oversize requests still get through, just slowly
+        async with self._lock:  # FIFO: later callers wait behind the one being served
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+def is_retryable(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error's response, if any."""
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class RateLimitedScheduler:
+    """Runs async LLM calls concurrently under request/min and token/min budgets.
+
+    Retryable failures (429, 5xx, connection errors) are retried with full-jitter
+    exponential backoff, honouring Retry-After when the server sends one.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY):
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "rate_limited": 0, "failed": 0}
+
+    def backoff(self, attempt, error=None):
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        hinted = retry_after(error) if error is not None else None
+        return max(delay, hinted) if hinted else delay
+
+    async def run(self, call, *args, estimated_tokens=1, **kwargs):
+        """Await call(*args, **kwargs) within the limits; re-raises after max_retries."""
+        self.stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            async with self._slots:
+                await self.requests.acquire(1)
+                await self.tokens.acquire(estimated_tokens)
+                self.stats["attempts"] += 1
+                try:
+                    return await call(*args, **kwargs)
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self.stats["failed"] += 1
+                        raise
+                    error = e
+            # Back off outside the slot so other requests keep flowing
+            if getattr(error, "status_code", None) == 429:
+                self.stats["rate_limited"] += 1
+            self.stats["retries"] += 1
+            delay = self.backoff(attempt, error)
+            logger.warning(f"⏳ Retrying LLM call in {delay:.1f}s ({type(error).__name__})")
+            await asyncio.sleep(delay)
+
+    async def chat(self, client, **params):
+        """Scheduled client.chat.completions.create(**params); returns the response."""
+        estimate = estimate_tokens(params.get("messages", []), params.get("max_tokens"))
+        return await self.run(client.chat.completions.create, estimated_tokens=estimate, **params)
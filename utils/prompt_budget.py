@@ -0,0 +1,82 @@
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+from utils.logger import logger
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to the ~4 chars/token estimate
+    tiktoken = None
+
+# === Config ===
+CHARS_PER_TOKEN = 4  # Used when tiktoken isn't installed
+BOUNDARY_SLACK = 0.2  # Truncation may back off up to this fraction of the budget to end on a sentence/line
+TRUNCATION_MARK = " …"
+
+BOUNDARY_RE = re.compile(r"(?:\n|[.!?])\s")
+
+
+@lru_cache(maxsize=8)
+def _encoder(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:  # encodings are downloaded on first use; offline runs fall back to the estimate
+        logger.warning(f"⚠️ tiktoken encoding unavailable ({type(e).__name__}); estimating tokens from length")
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Prompt tokens for `text`: exact with tiktoken, otherwise estimated."""
+    encoder = _encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _cut(text: str, budget: int, model: str) -> str:
+    encoder = _encoder(model)
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text, disallowed_special=())[:budget])
+    return text[:budget * CHARS_PER_TOKEN]
+
+
+def truncate_to_tokens(text: str, budget: int, model: str = "gpt-4o") -> str:
+    """Keep the head of `text` within `budget` tokens, ending on a sentence or line break when one is close."""
+    if budget <= 0:
+        return ""
+    if count_tokens(text, model) <= budget:
+        return text
+    cut = _cut(text, budget, model)
+    boundaries = [m.start() + 1 for m in BOUNDARY_RE.finditer(cut)]
+    if boundaries and boundaries[-1] >= len(cut) * (1 - BOUNDARY_SLACK):
+        cut = cut[:boundaries[-1]]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def fit_pages(pages: Dict[str, str], budget: int, model: str = "gpt-4o") -> Dict[str, str]:
+    """Share a token budget across crawled pages so one long page can't crowd out the rest.
+
+    Short pages are kept whole and their unused share goes to the longer ones
+    (water-filling); every page that still doesn't fit keeps its head.
+    """
+    sizes = {name: count_tokens(text, model) for name, text in pages.items() if text}
+    fitted, remaining = {}, budget
+    for i, name in enumerate(sorted(sizes, key=sizes.get)):
+        share = remaining // (len(sizes) - i)
+        fitted[name] = pages[name] if sizes[name] <= share else truncate_to_tokens(pages[name], share, model)
+        remaining -= min(sizes[name], share)
+    return {name: fitted[name] for name in pages if name in fitted}
+
+
+def fit_sections(sections: Dict[str, str], budgets: Dict[str, Optional[int]], model: str = "gpt-4o") -> Dict[str, str]:
+    """Truncate each prompt section to its budget; sections without a budget (or None) are left alone."""
+    return {
+        name: truncate_to_tokens(text, budgets[name], model) if budgets.get(name) is not None else text
+        for name, text in sections.items()
+    }
@@ -1,6 +1,8 @@
 # agent/utils/prompts.py
 
 # SALES EMAIL PROMPT
+# Everything before {lead_company} is identical for every lead, so keep per-lead text
+# below it: the provider's prompt cache only reuses an exact shared prefix.
 SALES_EMAIL_PROMPT = """
 You are an expert B2B sales assistant helping a packaging manufacturer reach out to potential business leads.
 
@@ -9,15 +11,8 @@ Here is background information about our company and product line:
 {company_info}
 ---
 
-Here is information about the target lead:
----
-Company Name: {lead_company}
-Website Text:
-{lead_website}
----
-
 Instructions:
-- Please write a short and engaging outreach email to this company offering our packaging solutions.
+- Please write a short and engaging outreach email to the target lead described below, offering our packaging solutions.
 - Be professional but friendly
 - Specifically mention with descriptions 2–3 of the matched products and how they fit the lead’s business.
 - Use a real-sounding human tone, not robotic
@@ -26,12 +21,26 @@ Instructions:
 - End with a soft CTA (e.g., “We’d love to explore how we can support your packaging needs.”)
 - Also ask to connect or view our catalog.
 Output only the **body of the email**, without greeting headers like "Subject:".
+
+Here is information about the target lead:
+---
+Company Name: {lead_company}
+Matched Products:
+{matched_products}
+Website Profile:
+{lead_website}
+---
 """
 
 # REPLY INTENT ANALYSIS PROMPT
 REPLY_ANALYSIS_PROMPT = """
 You are analyzing an email thread between a packaging supplier and a potential business lead.
 
+About the lead:
+---
+{lead_profile}
+---
+
 Here is the conversation history:
 ---
 {email_history}
@@ -47,7 +56,26 @@ Please analyze the most recent reply from the lead. Answer the following:
 4. If no, briefly explain why and stop the conversation.
 
 Output as structured JSON with fields:
-- "intent"
-- "should_continue"
-- "next_reply" (only if should_continue is yes)
+- "intent" (short label, e.g. "interested", "not interested", "asking for pricing")
+- "should_continue" (true or false)
+- "next_reply" (the drafted reply if should_continue is true, otherwise null)
+"""
+
+# LEAD PROFILE PROMPT (used when agent/lead_profile.py runs with PROFILE_MODE = "gpt")
+LEAD_PROFILE_PROMPT = """
+Summarize this company's website for a packaging sales team.
+
+Company: {company}
+Known industries: {industries}
+Known product types: {product_types}
+
+Website text:
+---
+{website_text}
+---
+
+Respond ONLY with a JSON object with fields:
+- "summary": what the company makes or sells and how it packages/serves it, at most {summary_tokens} tokens
+- "industry": the best-fitting known industry, or a short label if none fits
+- "product_types": up to 5 known product types the company sells
 """
@@ -0,0 +1,180 @@
+import ast
+import json
+import re
+from typing import Dict, Optional, Tuple, TypedDict
+
+from utils import llm_client
+from utils.logger import logger
+
+# === Config ===
+STRUCTURED_OUTPUT = "json_schema"  # 🧾 "json_schema" (strict structured output), "json_object" (JSON mode) or None
+ANALYSIS_MODEL = "gpt-4o"
+ANALYSIS_PARAMS = {"temperature": 0.5, "max_tokens": 400}
+
+
+class ReplyAnalysis(TypedDict):
+    intent: str
+    should_continue: bool
+    next_reply: Optional[str]
+
+
+ANALYSIS_ERROR: ReplyAnalysis = {"intent": "error", "should_continue": False, "next_reply": None}
+
+JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string"},
+        "should_continue": {"type": "boolean"},
+        "next_reply": {"type": ["string", "null"]},
+    },
+    "required": ["intent", "should_continue", "next_reply"],
+    "additionalProperties": False,
+}
+
+# Keys older prompts and models used for the same fields
+KEY_ALIASES = {
+    "continue": "should_continue",
+    "shouldcontinue": "should_continue",
+    "suggested_reply": "next_reply",
+    "reply": "next_reply",
+    "next_response": "next_reply",
+}
+TRUE_WORDS = {"true", "yes", "y", "1", "continue"}
+FALSE_WORDS = {"false", "no", "n", "0", "stop", "none", "null", ""}
+
+FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+stats = {"parsed": 0, "repaired": 0, "failed": 0}
+
+
+def response_format() -> Optional[Dict]:
+    """The `response_format` request param for STRUCTURED_OUTPUT, or None to send none."""
+    if STRUCTURED_OUTPUT == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": "reply_analysis", "strict": True, "schema": JSON_SCHEMA}}
+    if STRUCTURED_OUTPUT == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def request_params() -> Dict:
+    """Extra chat params for a reply-analysis call."""
+    fmt = response_format()
+    return {"response_format": fmt} if fmt else {}
+
+
+def _load(raw: str) -> Tuple[Optional[Dict], bool]:
+    """(object, repaired) from model output; repaired is True if it wasn't plain JSON."""
+    try:
+        data = json.loads(raw)
+        return (data, False) if isinstance(data, dict) else (None, False)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    text = FENCE_RE.sub("", raw or "").strip()
+    start = text.find("{")
+    if start < 0:
+        return None, True
+    end = text.rfind("}")
+    if end < start:  # cut off at max_tokens: closing it would pass a half-written reply off as complete
+        return None, True
+    candidate = TRAILING_COMMA_RE.sub(r"\1", text[start:end + 1])
+    try:
+        data = json.loads(candidate)
+    except json.JSONDecodeError:
+        try:  # single quotes / True / None from a model writing Python instead of JSON
+            data = ast.literal_eval(candidate)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None, True
+    return (data, True) if isinstance(data, dict) else (None, True)
+
+
+def _as_bool(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    word = str(value).strip().lower().rstrip(".")
+    if word in TRUE_WORDS:
+        return True
+    if word in FALSE_WORDS:
+        return False
+    return None
+
+
+def validate(data: Dict) -> Tuple[Optional[ReplyAnalysis], bool]:
+    """Coerce a decoded object onto ReplyAnalysis; (None, _) if it can't be trusted for routing."""
+    fields = {KEY_ALIASES.get(k.strip().lower(), k.strip().lower()): v for k, v in data.items()}
+    should_continue = _as_bool(fields.get("should_continue"))
+    if should_continue is None:
+        return None, True
+    next_reply = fields.get("next_reply")
+    next_reply = next_reply.strip() if isinstance(next_reply, str) and next_reply.strip() else None
+    if should_continue and not next_reply:  # "continue" with nothing to send can't be acted on
+        return None, True
+    analysis: ReplyAnalysis = {
+        "intent": str(fields.get("intent") or "unknown").strip(),
+        "should_continue": should_continue,
+        "next_reply": next_reply if should_continue else None,
+    }
+    coerced = (not isinstance(fields.get("should_continue"), bool) or set(data) != set(JSON_SCHEMA["properties"]))
+    return analysis, coerced
+
+
+def parse_analysis(raw: str) -> Optional[ReplyAnalysis]:
+    """Tolerant parse of a reply-analysis completion: plain JSON first, local repairs second.
+
+    Handles code fences, prose around the object, trailing commas, Python
+    literals, yes/no strings and the old continue / suggested_reply keys.
+    Output cut off at max_tokens is refused, not closed up. Returns None (and counts a failure) when the result
+    still can't be trusted; callers decide what to do with that.
+    """
+    data, repaired = _load(raw)
+    analysis, coerced = validate(data) if data is not None else (None, True)
+    if analysis is None:
+        stats["failed"] += 1
+        logger.warning(f"⚠️ Unparseable reply analysis: {(raw or '')[:200]!r}")
+        return None
+    stats["repaired" if repaired or coerced else "parsed"] += 1
+    return analysis
+
+
+def _request(messages) -> Dict:
+    return {"model": ANALYSIS_MODEL, "messages": messages, **ANALYSIS_PARAMS, **request_params()}
+
+
+def _finish(request: Dict, raw: str) -> ReplyAnalysis:
+    analysis = parse_analysis(raw)
+    if analysis is None:
+        llm_client.forget(**request)  # don't replay the unusable completion from the cache
+        return dict(ANALYSIS_ERROR)
+    return analysis
+
+
+def analyze_reply(messages) -> ReplyAnalysis:
+    """Run a reply-analysis prompt and return the validated result (ANALYSIS_ERROR if the call or parse fails)."""
+    request = _request(messages)
+    try:
+        raw = llm_client.chat(cache=True, **request)
+    except Exception as e:
+        logger.error(f"❌ GPT analysis failed: {e}")
+        return dict(ANALYSIS_ERROR)
+    return _finish(request, raw)
+
+
+async def analyze_reply_async(client, scheduler, messages) -> ReplyAnalysis:
+    """analyze_reply() through an AsyncOpenAI client and the rate-limited scheduler."""
+    request = _request(messages)
+    try:
+        raw = await llm_client.achat(client, scheduler, cache=True, **request)
+    except Exception as e:
+        logger.error(f"❌ GPT analysis failed: {e}")
+        return dict(ANALYSIS_ERROR)
+    return _finish(request, raw)
+
+
+def failure_rate() -> float:
+    total = sum(stats.values())
+    return stats["failed"] / total if total else 0.0
+
+
+def log_stats() -> None:
+    if sum(stats.values()):
+        logger.info(f"🧾 Reply analysis parsing: {stats} (failure rate {failure_rate():.1%})")